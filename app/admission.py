@@ -0,0 +1,202 @@
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Optional
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import ADMISSION_LIMIT, ADMISSION_REJECTIONS
+
+# AIMD tuning: a sample counts as congested when it is TOLERANCE x slower than
+# the no-load baseline (and slower than LATENCY_FLOOR, so sub-millisecond
+# jitter on cheap routes doesn't shrink the limit).
+TOLERANCE = 2.0
+LATENCY_FLOOR = 0.05
+BACKOFF = 0.9
+# The baseline is a low percentile of the last BASELINE_WINDOW successful
+# latencies, so one unusually fast response can't pin it near zero
+BASELINE_WINDOW = 200
+BASELINE_PERCENTILE = 0.05
+# No backing off until the window holds enough samples for that percentile
+BASELINE_MIN_SAMPLES = 20
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for one route that adapts to observed latency (AIMD).
+
+    Each uncongested completion while the limit is in use adds 1/limit (about
+    +1 per round trip); a congested one multiplies the limit by BACKOFF, at most
+    once per round trip. Only 2xx latencies are fed in: fast 4xx rejections
+    say nothing about how loaded the route's dependencies are. Requests over
+    the limit wait in a bounded FIFO queue.
+    """
+
+    def __init__(self, initial_limit: int, min_limit: int, max_limit: int, max_queue: int):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self._window: Deque[float] = deque(maxlen=BASELINE_WINDOW)
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: float) -> bool:
+        """Take a slot, waiting up to ``timeout`` in the queue. Returns False if shed."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            return True
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we gave up: keep the slot on timeout, hand it back otherwise
+                if isinstance(e, asyncio.TimeoutError):
+                    return True
+                self.release(None)
+                raise
+            waiter.cancel()
+            self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                return False
+            raise
+
+    def release(self, latency: Optional[float]) -> None:
+        """Free a slot; ``latency`` feeds the limit (None for aborted or unsuccessful requests)."""
+        saturated = self.in_flight >= int(self.limit)
+        self.in_flight -= 1
+        if latency is not None:
+            self._adjust(latency, saturated)
+
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            waiter.set_result(None)
+            self.in_flight += 1
+
+    def _adjust(self, latency: float, saturated: bool) -> None:
+        self._window.append(latency)
+        self.baseline = sorted(self._window)[int(len(self._window) * BASELINE_PERCENTILE)]
+
+        now = time.monotonic()
+        if latency > LATENCY_FLOOR and latency > self.baseline * TOLERANCE:
+            if len(self._window) >= BASELINE_MIN_SAMPLES and now - self._last_decrease >= latency:
+                self.limit = max(float(self.min_limit), self.limit * BACKOFF)
+                self._last_decrease = now
+        elif saturated:
+            # Only grow when the limit is actually what's holding requests back
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+
+class AdmissionControlMiddleware:
+    """
+    Pure ASGI per-route admission control.
+
+    Runs before routing, so a shed request never opens a DB session or makes a
+    Temporal/S3 call. Each route template gets its own AdaptiveLimiter, which
+    keeps a slow /jobs/from-upload from starving /uploads/init. Over capacity
+    (queue full or queue wait timed out) returns 503 with Retry-After.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        initial_limit: int = 16,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        max_queue: int = 32,
+        queue_timeout: float = 1.0,
+        retry_after: int = 1,
+        exempt_routes: Iterable[str] = (),
+        route_max_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.app = app
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.exempt_routes = frozenset(exempt_routes)
+        self.route_max_limits = route_max_limits or {}
+        self.limiters: Dict[str, AdaptiveLimiter] = {}
+
+    def _match_route(self, scope: Scope) -> Optional[Any]:
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route
+        return None
+
+    def _limiter(self, path: str) -> AdaptiveLimiter:
+        limiter = self.limiters.get(path)
+        if limiter is None:
+            max_limit = self.route_max_limits.get(path, self.max_limit)
+            limiter = AdaptiveLimiter(
+                min(self.initial_limit, max_limit), self.min_limit, max_limit, self.max_queue
+            )
+            self.limiters[path] = limiter
+        return limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._match_route(scope)
+        path = getattr(route, "path", None)
+        if path is None or path in self.exempt_routes:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self._limiter(path)
+        if not await limiter.acquire(self.queue_timeout):
+            ADMISSION_REJECTIONS.labels(path).inc()
+            # Let the metrics middleware label the 503 by route
+            scope["route"] = route
+            await self._reject(send)
+            return
+
+        status_code = 0
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        latency: Optional[float] = None
+        try:
+            await self.app(scope, receive, send_with_status)
+            if 200 <= status_code < 300:
+                latency = time.perf_counter() - start
+        finally:
+            limiter.release(latency)
+            ADMISSION_LIMIT.labels(path).set(limiter.limit)
+
+    async def _reject(self, send: Send) -> None:
+        body = json.dumps({"detail": "Server is over capacity, retry later"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(self.retry_after).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,34 +1,93 @@
+import hashlib
+import hmac
+import math
+from functools import lru_cache
 from typing import Optional, Dict, Any
-from fastapi import HTTPException, Security, Depends
+from fastapi import HTTPException, Security, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from .settings import get_settings, Settings
+from .deps import get_rate_limiter
 
 security: HTTPBearer = HTTPBearer()
 
-def verify_api_key(credentials: HTTPAuthorizationCredentials = Security(security)) -> bool:
+# Client name for the legacy single API_KEY
+DEFAULT_CLIENT = "admin"
+
+class ApiClient:
+    """An authenticated API client and its effective limits."""
+    __slots__ = ("name", "key_sha256", "rate_per_second", "burst", "max_concurrent_jobs")
+
+    def __init__(self, name: str, key_sha256: str, rate_per_second: float, burst: int, max_concurrent_jobs: int):
+        self.name = name
+        self.key_sha256 = key_sha256
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_concurrent_jobs = max_concurrent_jobs
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+@lru_cache
+def get_api_clients() -> Dict[str, ApiClient]:
+    """Configured clients indexed by key digest, so lookup cost doesn't grow with the number of keys."""
+    s: Settings = get_settings()
+    clients = {hash_api_key(s.api_key): ApiClient(
+        DEFAULT_CLIENT, hash_api_key(s.api_key), s.rate_limit_per_second, s.rate_limit_burst, s.max_concurrent_jobs
+    )}
+    for name, config in s.api_keys.items():
+        digest = config.key_sha256.lower()
+        clients[digest] = ApiClient(
+            name,
+            digest,
+            config.rate_per_second if config.rate_per_second is not None else s.rate_limit_per_second,
+            config.burst if config.burst is not None else s.rate_limit_burst,
+            config.max_concurrent_jobs if config.max_concurrent_jobs is not None else s.max_concurrent_jobs,
+        )
+    return clients
+
+def is_admin_key(api_key: str) -> bool:
+    """Whether ``api_key`` belongs to the admin client (no rate limit charged)."""
+    digest = hash_api_key(api_key)
+    client: Optional[ApiClient] = get_api_clients().get(digest)
+    return client is not None and client.name == DEFAULT_CLIENT and hmac.compare_digest(digest, client.key_sha256)
+
+def verify_api_key(credentials: HTTPAuthorizationCredentials = Security(security)) -> ApiClient:
     """
-    Verify API key from Authorization header.
+    Verify API key from Authorization header and charge the client's rate limit.
     Expected format: Authorization: Bearer <api_key>
     """
-    settings: Settings = get_settings()
-
     if not credentials:
         raise HTTPException(
             status_code=401,
             detail="Authorization header missing"
         )
 
-    if credentials.credentials != settings.api_key:
+    # Keys are looked up by digest, so response timing depends only on a hash of
+    # the presented key; the final comparison is constant-time.
+    digest = hash_api_key(credentials.credentials)
+    client: Optional[ApiClient] = get_api_clients().get(digest)
+    if client is None or not hmac.compare_digest(digest, client.key_sha256):
         raise HTTPException(
             status_code=401,
             detail="Invalid API key"
         )
 
-    return True
+    retry_after = get_rate_limiter().acquire(client.name, client.rate_per_second, client.burst)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
 
-def get_current_user(auth: bool = Depends(verify_api_key)) -> Dict[str, Any]:
-    """
-    Simple user context for authenticated requests.
-    Since this is single-user, we just return a basic user object.
-    """
-    return {"user_id": "admin", "authenticated": True}
\ No newline at end of file
+    return client
+
+def get_current_user(client: ApiClient = Depends(verify_api_key)) -> Dict[str, Any]:
+    """User context for authenticated requests: one user per API client."""
+    return {"user_id": client.name, "authenticated": True, "client": client}
+
+def require_admin(client: ApiClient = Depends(verify_api_key)) -> Dict[str, Any]:
+    """Like get_current_user, but only for the admin client (API_KEY)."""
+    if client.name != DEFAULT_CLIENT:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Admin API key required")
+    return {"user_id": client.name, "authenticated": True, "client": client}
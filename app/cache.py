@@ -0,0 +1,83 @@
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Type
+
+from .models import JobStatus
+
+# Temporal workflow states that can never change again
+TERMINAL_STATUSES = frozenset({"completed", "failed", "canceled", "terminated", "timed_out"})
+
+class ResultCache(ABC):
+    """
+    Cache of terminal job states and results, keyed by job_id.
+    Implement this to plug in a shared backend (e.g. Redis).
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        ...
+
+    @abstractmethod
+    def put(self, job: JobStatus) -> None:
+        ...
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+class InMemoryResultCache(ResultCache):
+    """Process-local LRU cache bounded by entry count and serialized size."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._bytes = 0
+        self._entries: "OrderedDict[str, Tuple[JobStatus, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(job_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, job: JobStatus) -> None:
+        if job.status not in TERMINAL_STATUSES:
+            return
+        size = len(job.model_dump_json())
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(job.job_id, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[job.job_id] = (job, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **super().stats(),
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+        }
+
+RESULT_CACHE_BACKENDS: Dict[str, Type[ResultCache]] = {
+    "memory": InMemoryResultCache,
+}
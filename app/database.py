@@ -1,12 +1,13 @@
 from typing import AsyncGenerator, Optional
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import Column, String, DateTime, Text, Integer
+from sqlalchemy import Column, String, DateTime, Text, Integer, Index
 from datetime import datetime
 import uuid
 import logging
 
 from .settings import get_settings
+from .metrics import instrument_engine
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +30,15 @@ class JobLog(Base):
     s3_key = Column(String, nullable=True)    # S3 key for uploads
     source_url = Column(String, nullable=True)  # Source URL for url jobs
     content_type = Column(String, nullable=True)
+    content_hash = Column(String, nullable=True, index=True)  # "<client>:etag:..." or "<client>:sha256:..." for dedup
+
+    # API client that submitted the job; only it (and the admin client) may read its status.
+    # NULL for jobs started by the ingest worker, which only the admin client can read.
+    client = Column(String, nullable=True)
+
+    # Idempotency-Key support: "<client>:<key>" and a hash of the request body
+    idempotency_key = Column(String, nullable=True)
+    request_hash = Column(String, nullable=True)
 
     # Metadata
     job_metadata = Column(Text, nullable=True)  # JSON string of additional metadata
@@ -46,6 +56,31 @@ class JobLog(Base):
     status = Column(String, default="submitted", nullable=False)
     error_message = Column(Text, nullable=True)
 
+    # Composite indexes backing keyset pagination on (created_at, id),
+    # optionally filtered by status or job_type
+    __table_args__ = (
+        Index("ix_job_logs_created_at_id", "created_at", "id"),
+        Index("ix_job_logs_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_job_logs_job_type_created_at_id", "job_type", "created_at", "id"),
+        # One live job per Idempotency-Key, across instances; expired and failed
+        # attempts give the key up (set it to NULL) before it is claimed again
+        Index("ux_job_logs_client_idempotency_key", "client", "idempotency_key", unique=True),
+    )
+
+class JobStatsRollup(Base):
+    """
+    Hourly counters of job status transitions, updated incrementally as they happen.
+    Terminal transitions also record a processing-latency histogram bin
+    (see app/stats.py); other transitions use latency_bin = -1.
+    """
+    __tablename__ = "job_stats_rollups"
+
+    bucket_start = Column(DateTime, primary_key=True)
+    job_type = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)
+    latency_bin = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
 # Database connection
 settings = get_settings()
 
@@ -66,6 +101,7 @@ def init_database():
             pool_size=5,
             max_overflow=10,
         )
+        instrument_engine(engine)
 
         # Create session factory
         AsyncSessionLocal = async_sessionmaker(
@@ -98,6 +134,13 @@ async def get_db() -> AsyncGenerator[Optional[AsyncSession], None]:
         finally:
             await session.close()
 
+def get_session_factory() -> Optional[async_sessionmaker]:
+    """
+    Dependency returning the session factory itself (None without a database).
+    For streaming responses, which must own a session that outlives the request handler.
+    """
+    return AsyncSessionLocal if database_enabled else None
+
 async def create_tables():
     """Create all database tables."""
     if not database_enabled or not engine:
@@ -118,4 +161,15 @@ async def close_db():
             await engine.dispose()
             logger.info("Database connections closed")
         except Exception as e:
-            logger.error(f"Error closing database: {e}")
\ No newline at end of file
+            logger.error(f"Error closing database: {e}")
+
+async def _create_tables_and_exit() -> None:
+    init_database()
+    await create_tables()
+    await close_db()
+
+if __name__ == "__main__":
+    # Create missing tables out of band: python -m app.database
+    import asyncio
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_create_tables_and_exit())
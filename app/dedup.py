@@ -0,0 +1,48 @@
+import hashlib
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import JobLog
+
+# Job states a duplicate upload can reuse: finished results, or jobs still running
+REUSABLE_STATUSES = ("completed", "submitted", "started", "running")
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+async def content_hash(s3: Any, bucket: str, key: str, obj_info: Dict[str, Any], source: str, client: str) -> Optional[str]:
+    """
+    Identify an object's content, as seen by one API client.
+
+    ``etag`` uses the ETag from head_object (free, but multipart uploads of the
+    same bytes with different part sizes get different ETags). ``sha256``
+    streams the object once on the S3 worker pool. Values are prefixed with
+    the client name, so one client never gets another's job or result, and
+    with their source, so hashes from different modes never match each other.
+    """
+    if source == "etag":
+        etag = (obj_info.get("ETag") or "").strip('"')
+        return f"{client}:etag:{etag}" if etag else None
+
+    if source == "sha256":
+        def digest() -> str:
+            body = s3.client.get_object(Bucket=bucket, Key=key)["Body"]
+            h = hashlib.sha256()
+            for chunk in body.iter_chunks(HASH_CHUNK_SIZE):
+                h.update(chunk)
+            return h.hexdigest()
+
+        return f"{client}:sha256:{await s3.run(digest)}"
+
+    raise ValueError(f"Unknown dedup hash source: {source}")
+
+async def find_reusable_job(db: AsyncSession, digest: str) -> Optional[JobLog]:
+    """Job for identical content (same client) to reuse: the newest completed one, else the newest in-flight one."""
+    query = (
+        select(JobLog)
+        .where(JobLog.content_hash == digest, JobLog.status.in_(REUSABLE_STATUSES))
+        .order_by((JobLog.status == "completed").desc(), JobLog.created_at.desc())
+        .limit(1)
+    )
+    return (await db.execute(query)).scalar_one_or_none()
@@ -1,17 +1,29 @@
-from functools import lru_cache
-from typing import Any
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Awaitable, Callable
 
-import boto3
-from botocore.exceptions import ProfileNotFound
+import httpx
 
 from .settings import get_settings, Settings
+from .signing import SigV4Signer
+from .cache import ResultCache, RESULT_CACHE_BACKENDS
+from .ratelimit import RateLimiter, RATE_LIMITER_BACKENDS
+from .idempotency import IdempotencyStore
+from .profiling import ProfileStore
+from .url_ingest import PublicOnlyTransport
+from .metrics import observe
 
 @lru_cache
-def get_s3_client() -> Any:
+def get_boto_session() -> Any:
     """
-    Get cached S3 client instance.
-    Returns boto3 S3 client configured with the current AWS region.
+    Get cached boto3 session.
+    Shared by the S3 client and the presign signer so both see the same credentials.
     """
+    # boto3 is imported on first use; it is one of the slowest imports at boot
+    import boto3
+    from botocore.exceptions import ProfileNotFound
+
     s: Settings = get_settings()
 
     session_kwargs = {}
@@ -19,14 +31,132 @@ def get_s3_client() -> Any:
         session_kwargs["profile_name"] = s.aws_profile
 
     try:
-        session = boto3.Session(**session_kwargs)
+        return boto3.Session(**session_kwargs)
     except ProfileNotFound as exc:
         raise RuntimeError(
             f"AWS profile '{s.aws_profile}' was configured but not found. Update your AWS credentials or unset AWS_PROFILE."
         ) from exc
 
-    client_kwargs = {}
+@lru_cache
+def get_s3_client() -> Any:
+    """
+    Get cached S3 client instance.
+    Returns boto3 S3 client configured with the current AWS region.
+    """
+    from botocore.config import Config
+
+    s: Settings = get_settings()
+    session = get_boto_session()
+
+    client_kwargs: dict = {"config": Config(max_pool_connections=s.s3_max_pool_connections)}
     if s.aws_region:
         client_kwargs["region_name"] = s.aws_region
 
     return session.client("s3", **client_kwargs)
+
+class AsyncS3Client:
+    """
+    Non-blocking facade over the boto3 S3 client.
+    Every call runs on a dedicated, bounded thread pool, so a slow S3 request
+    only ties up one pool thread instead of the event loop. Methods mirror
+    boto3's: ``await s3.head_object(Bucket=..., Key=...)``.
+    """
+
+    def __init__(self, client: Any, max_workers: int, dependency: str = "s3"):
+        self.client = client
+        # Also wraps other boto3 clients (e.g. SQS); ``dependency`` labels their metrics
+        self.dependency = dependency
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=dependency)
+
+    async def call(self, method: str, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        with observe(self.dependency, method):
+            return await loop.run_in_executor(self._executor, partial(getattr(self.client, method), **kwargs))
+
+    async def run(self, fn: Callable[[], Any]) -> Any:
+        """Run a blocking function that uses ``self.client`` on the worker pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn)
+
+    async def get_object_bytes(self, **kwargs: Any) -> bytes:
+        """``get_object`` plus reading its body, both on the worker pool (the read is blocking I/O too)."""
+        loop = asyncio.get_running_loop()
+
+        def fetch() -> bytes:
+            return self.client.get_object(**kwargs)["Body"].read()
+
+        with observe(self.dependency, "get_object"):
+            return await loop.run_in_executor(self._executor, fetch)
+
+    def __getattr__(self, method: str) -> Callable[..., Awaitable[Any]]:
+        if method.startswith("_"):
+            raise AttributeError(method)
+        return partial(self.call, method)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+@lru_cache
+def get_async_s3_client() -> AsyncS3Client:
+    """Get cached non-blocking S3 client. Use this from async routes."""
+    s: Settings = get_settings()
+    return AsyncS3Client(get_s3_client(), max_workers=s.s3_executor_workers)
+
+@lru_cache
+def get_s3_signer() -> SigV4Signer:
+    """
+    Get cached SigV4 signer for presigned S3 requests.
+    Reuses the derived signing key across presigns on the same day.
+    """
+    s: Settings = get_settings()
+    credentials = get_boto_session().get_credentials()
+    if credentials is None:
+        raise RuntimeError("No AWS credentials available for presigning")
+    return SigV4Signer(credentials, region=s.aws_region)
+
+@lru_cache
+def get_result_cache() -> ResultCache:
+    """Get the process-wide cache of terminal job states."""
+    s: Settings = get_settings()
+    try:
+        backend = RESULT_CACHE_BACKENDS[s.result_cache_backend]
+    except KeyError:
+        raise RuntimeError(f"Unknown result cache backend: {s.result_cache_backend}")
+    return backend(max_entries=s.result_cache_max_entries, max_bytes=s.result_cache_max_bytes)
+
+
+@lru_cache
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide per-API-key rate limiter and job quota store."""
+    s: Settings = get_settings()
+    try:
+        backend = RATE_LIMITER_BACKENDS[s.rate_limiter_backend]
+    except KeyError:
+        raise RuntimeError(f"Unknown rate limiter backend: {s.rate_limiter_backend}")
+    return backend(job_ttl=s.job_quota_ttl_seconds)
+
+@lru_cache
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client used to fetch remote images (pooled connections)."""
+    s: Settings = get_settings()
+    # Redirects are followed (and re-validated) by stream_url_to_s3
+    if s.url_ingest_allow_private_networks:
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(s.url_ingest_timeout),
+            limits=httpx.Limits(max_connections=s.url_ingest_concurrency),
+        )
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(s.url_ingest_timeout),
+        transport=PublicOnlyTransport(s.url_ingest_concurrency),
+    )
+
+@lru_cache
+def get_idempotency_store() -> IdempotencyStore:
+    """Get the in-memory front cache for Idempotency-Key replays."""
+    s: Settings = get_settings()
+    return IdempotencyStore(ttl=s.idempotency_ttl_seconds, max_entries=s.idempotency_cache_max_entries)
+
+@lru_cache
+def get_profile_store() -> ProfileStore:
+    """Get the ring buffer of recent request profiles."""
+    return ProfileStore(max_profiles=get_settings().profiling_buffer_size)
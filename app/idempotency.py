@@ -0,0 +1,70 @@
+import asyncio
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from .models import JobStatus
+
+# Namespace for workflow IDs derived from idempotency keys
+IDEMPOTENCY_NAMESPACE = uuid.UUID("6f0b7a52-58c4-4a53-9b3e-2f61c1d0a9e4")
+
+def idempotency_scope(client: str, key: str) -> str:
+    """Keys are per client, so two clients can't collide on (or probe) each other's keys."""
+    return f"{client}:{key}"
+
+def request_fingerprint(body: str) -> str:
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+def derived_job_id(scope: str) -> str:
+    """Job/workflow ID for a scoped key: concurrent duplicates map to the same workflow."""
+    return f"img-{uuid.uuid5(IDEMPOTENCY_NAMESPACE, scope)}"
+
+class IdempotencyStore:
+    """
+    Process-local front cache of responses by idempotency scope, with TTL expiry
+    and an LRU bound. The job log table is the durable copy; this only saves
+    the database round trip on retries. ``lock`` serializes concurrent
+    duplicates within the process, so the second one replays the first's result.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str, JobStatus]]" = OrderedDict()
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    def get(self, scope: str) -> Optional[Tuple[str, JobStatus]]:
+        """(request fingerprint, response) for ``scope``, if stored and not expired."""
+        entry = self._entries.get(scope)
+        if entry is None:
+            return None
+        expires, fingerprint, job = entry
+        if expires <= time.monotonic():
+            del self._entries[scope]
+            return None
+        return fingerprint, job
+
+    def put(self, scope: str, fingerprint: str, job: JobStatus) -> None:
+        self._entries[scope] = (time.monotonic() + self.ttl, fingerprint, job)
+        self._entries.move_to_end(scope)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @asynccontextmanager
+    async def lock(self, scope: str) -> AsyncIterator[None]:
+        lock, holders = self._locks.get(scope, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[scope] = (lock, holders + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, holders = self._locks[scope]
+            if holders == 1:
+                del self._locks[scope]
+            else:
+                self._locks[scope] = (lock, holders - 1)
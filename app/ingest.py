@@ -0,0 +1,351 @@
+"""
+Event-driven ingestion worker: starts processing jobs from S3 object-created
+notifications, so clients don't have to call /jobs/from-upload after uploading.
+
+Run it next to the API with ``python -m app.ingest``. Configure the bucket to
+send ObjectCreated events (directly or through SNS) to the queue named by
+INGEST_QUEUE_URL, or set INGEST_QUEUE_BACKEND=file to read notification JSON
+files from INGEST_SPOOL_DIR locally.
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import unquote_plus
+
+from .settings import get_settings, Settings
+
+logger = logging.getLogger(__name__)
+
+class QueueMessage(NamedTuple):
+    id: str
+    receipt: str
+    body: str
+
+class EventQueue(ABC):
+    """
+    Source of S3 notification messages with at-least-once delivery: a received
+    message comes back later unless it is acked.
+    """
+
+    @abstractmethod
+    async def receive(self, max_messages: int, wait_seconds: float) -> List[QueueMessage]:
+        ...
+
+    @abstractmethod
+    async def ack(self, messages: List[QueueMessage]) -> None:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+class SQSEventQueue(EventQueue):
+    """SQS queue, called through an AsyncS3Client-style executor facade."""
+
+    MAX_BATCH = 10  # SQS limit for receive_message and delete_message_batch
+
+    def __init__(self, sqs: Any, queue_url: str):
+        self.sqs = sqs
+        self.queue_url = queue_url
+
+    async def receive(self, max_messages: int, wait_seconds: float) -> List[QueueMessage]:
+        response = await self.sqs.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=min(max_messages, self.MAX_BATCH),
+            WaitTimeSeconds=int(wait_seconds),
+        )
+        return [
+            QueueMessage(m["MessageId"], m["ReceiptHandle"], m["Body"])
+            for m in response.get("Messages", [])
+        ]
+
+    async def ack(self, messages: List[QueueMessage]) -> None:
+        for i in range(0, len(messages), self.MAX_BATCH):
+            chunk = messages[i:i + self.MAX_BATCH]
+            await self.sqs.delete_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[{"Id": str(n), "ReceiptHandle": m.receipt} for n, m in enumerate(chunk)],
+            )
+
+    async def close(self) -> None:
+        self.sqs.shutdown()
+
+class InMemoryEventQueue(EventQueue):
+    """Process-local queue with SQS-like visibility timeouts, for tests."""
+
+    def __init__(self, visibility_timeout: float):
+        self.visibility_timeout = visibility_timeout
+        self._ready: Deque[Tuple[str, str]] = deque()
+        self._in_flight: Dict[str, Tuple[float, str]] = {}
+        self._next_id = 0
+
+    def put(self, body: str) -> None:
+        self._next_id += 1
+        self._ready.append((str(self._next_id), body))
+
+    def __len__(self) -> int:
+        return len(self._ready) + len(self._in_flight)
+
+    def _requeue_expired(self) -> None:
+        now = time.monotonic()
+        for message_id, (deadline, body) in list(self._in_flight.items()):
+            if deadline <= now:
+                del self._in_flight[message_id]
+                self._ready.append((message_id, body))
+
+    async def receive(self, max_messages: int, wait_seconds: float) -> List[QueueMessage]:
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            self._requeue_expired()
+            if self._ready or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(min(0.05, wait_seconds))
+
+        messages: List[QueueMessage] = []
+        while self._ready and len(messages) < max_messages:
+            message_id, body = self._ready.popleft()
+            self._in_flight[message_id] = (time.monotonic() + self.visibility_timeout, body)
+            messages.append(QueueMessage(message_id, message_id, body))
+        return messages
+
+    async def ack(self, messages: List[QueueMessage]) -> None:
+        for message in messages:
+            self._in_flight.pop(message.receipt, None)
+
+class FileEventQueue(InMemoryEventQueue):
+    """
+    Spool directory stand-in for local runs: every ``*.json`` file is one
+    message and acking deletes it. Unacked files are picked up again after the
+    visibility timeout (or on restart).
+    """
+
+    def __init__(self, directory: str, visibility_timeout: float):
+        super().__init__(visibility_timeout)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _scan(self) -> None:
+        known = {message_id for message_id, _ in self._ready} | set(self._in_flight)
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(".json") and name not in known:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    self._ready.append((name, f.read()))
+
+    async def receive(self, max_messages: int, wait_seconds: float) -> List[QueueMessage]:
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            self._scan()
+            messages = await super().receive(max_messages, 0)
+            if messages or time.monotonic() >= deadline:
+                return messages
+            await asyncio.sleep(min(0.5, wait_seconds))
+
+    async def ack(self, messages: List[QueueMessage]) -> None:
+        await super().ack(messages)
+        for message in messages:
+            try:
+                os.remove(os.path.join(self.directory, message.receipt))
+            except FileNotFoundError:
+                pass
+
+class ObjectCreated(NamedTuple):
+    bucket: str
+    key: str
+    etag: Optional[str]
+
+def parse_notification(body: str) -> List[ObjectCreated]:
+    """ObjectCreated records in an S3 notification, optionally wrapped in an SNS envelope."""
+    payload = json.loads(body)
+    if "Records" not in payload and isinstance(payload.get("Message"), str):
+        payload = json.loads(payload["Message"])
+
+    events: List[ObjectCreated] = []
+    for record in payload.get("Records", []):  # s3:TestEvent messages have none
+        if not record.get("eventName", "").startswith("ObjectCreated:"):
+            continue
+        s3 = record["s3"]
+        events.append(ObjectCreated(
+            bucket=s3["bucket"]["name"],
+            # Keys arrive URL-encoded, with spaces as '+'
+            key=unquote_plus(s3["object"]["key"]),
+            etag=s3["object"].get("eTag"),
+        ))
+    return events
+
+def event_job_id(event: ObjectCreated) -> str:
+    """Stable job ID per object version, so redelivered events map to the same job."""
+    from .idempotency import derived_job_id
+    return derived_job_id(f"s3:{event.bucket}/{event.key}@{event.etag or ''}")
+
+class IngestWorker:
+    """
+    Pulls notification batches, dedupes them and submits them through the same
+    batch path as POST /jobs/from-upload/batch (bounded HEAD/start concurrency,
+    one multi-row INSERT). Messages are acked only after every job they carry
+    was started or permanently rejected; the rest are redelivered, and derived
+    job IDs make the retry idempotent.
+    """
+
+    def __init__(
+        self,
+        queue: EventQueue,
+        bucket: str,
+        batch_size: int,
+        wait_seconds: float,
+        session_factory: Optional[Callable[[], Any]] = None,
+        recent_max: int = 10_000,
+        skip_prefixes: Tuple[str, ...] = (),
+    ):
+        self.queue = queue
+        self.bucket = bucket
+        # Keys the API writes itself (and already started a job for) are acked untouched
+        self.skip_prefixes = tuple(prefix.rstrip("/") + "/" for prefix in skip_prefixes)
+        self.batch_size = batch_size
+        self.wait_seconds = wait_seconds
+        self.session_factory = session_factory
+        self._stopping = False
+        # Objects already submitted, to skip duplicate notifications cheaply
+        self._recent: "OrderedDict[ObjectCreated, None]" = OrderedDict()
+        self._recent_max = recent_max
+
+    def stop(self) -> None:
+        self._stopping = True
+
+    async def _collect(self) -> List[QueueMessage]:
+        messages = await self.queue.receive(self.batch_size, self.wait_seconds)
+        while messages and len(messages) < self.batch_size:
+            more = await self.queue.receive(self.batch_size - len(messages), 0)
+            if not more:
+                break
+            messages.extend(more)
+        return messages
+
+    def _remember(self, event: ObjectCreated) -> None:
+        self._recent[event] = None
+        self._recent.move_to_end(event)
+        if len(self._recent) > self._recent_max:
+            self._recent.popitem(last=False)
+
+    async def run_once(self) -> int:
+        """Process one batch. Returns the number of jobs started (including ones an earlier delivery started)."""
+        from .models import FromUploadRequest
+        from .routers.jobs import submit_upload_batch
+
+        messages = await self._collect()
+        if not messages:
+            return 0
+
+        done: List[QueueMessage] = []
+        by_message: List[Tuple[QueueMessage, List[ObjectCreated]]] = []
+        pending: "OrderedDict[ObjectCreated, None]" = OrderedDict()
+        for message in messages:
+            try:
+                events = parse_notification(message.body)
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"Dropping malformed notification {message.id}: {e}")
+                done.append(message)
+                continue
+            events = [
+                e for e in events
+                if e.bucket == self.bucket and not e.key.startswith(self.skip_prefixes) and e not in self._recent
+            ]
+            by_message.append((message, events))
+            pending.update((event, None) for event in events)
+
+        events = list(pending)
+        failed: set = set()
+        started = 0
+        if events:
+            items = [FromUploadRequest(key=event.key) for event in events]
+            job_ids = [event_job_id(event) for event in events]
+            if self.session_factory:
+                async with self.session_factory() as db:
+                    results = await submit_upload_batch(items, db, job_ids=job_ids)
+            else:
+                results = await submit_upload_batch(items, None, job_ids=job_ids)
+
+            for event, result in zip(events, results):
+                if result.status == "failed":
+                    failed.add(event)
+                    logger.warning(f"Will retry {event.key}: {result.error}")
+                else:
+                    if result.status == "rejected":
+                        logger.warning(f"Rejected {event.key}: {result.error}")
+                    else:
+                        started += 1
+                    self._remember(event)
+
+        done.extend(message for message, message_events in by_message if not failed.intersection(message_events))
+        if done:
+            await self.queue.ack(done)
+        return started
+
+    async def run(self) -> None:
+        while not self._stopping:
+            try:
+                await self.run_once()
+            except Exception as e:
+                # Unacked messages are redelivered; back off so a dead dependency isn't hammered
+                logger.error(f"Ingest batch failed: {e}")
+                await asyncio.sleep(1.0)
+
+def build_queue(s: Settings) -> EventQueue:
+    if s.ingest_queue_backend == "sqs":
+        from .deps import AsyncS3Client, get_boto_session
+        if not s.ingest_queue_url:
+            raise RuntimeError("INGEST_QUEUE_URL is required for the sqs ingest backend")
+        sqs = get_boto_session().client("sqs", region_name=s.aws_region)
+        return SQSEventQueue(AsyncS3Client(sqs, max_workers=2, dependency="sqs"), s.ingest_queue_url)
+    if s.ingest_queue_backend == "file":
+        return FileEventQueue(s.ingest_spool_dir, visibility_timeout=s.ingest_visibility_timeout)
+    raise RuntimeError(f"Unknown ingest queue backend: {s.ingest_queue_backend}")
+
+async def main() -> None:
+    from . import database
+    from .routers import jobs
+    from .temporal import TemporalConnection
+
+    s: Settings = get_settings()
+    logging.basicConfig(level=s.log_level)
+
+    database.init_database()
+    temporal = TemporalConnection(
+        s.temporal_target,
+        s.temporal_namespace,
+        on_connect=jobs.set_temporal_client,
+        connect_timeout=s.temporal_connect_timeout,
+        initial_backoff=s.temporal_reconnect_initial_backoff,
+        max_backoff=s.temporal_reconnect_max_backoff,
+    )
+    temporal.start()
+    # Nothing can be submitted without Temporal; messages wait in the queue meanwhile
+    await temporal.wait_connected()
+
+    queue = build_queue(s)
+    worker = IngestWorker(
+        queue,
+        bucket=s.s3_bucket_raw,
+        batch_size=s.ingest_batch_size,
+        wait_seconds=s.ingest_wait_seconds,
+        session_factory=database.AsyncSessionLocal if database.database_enabled else None,
+        skip_prefixes=(s.url_ingest_key_prefix,),
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+
+    logger.info(f"Ingest worker consuming {s.ingest_queue_backend} events for bucket {s.s3_bucket_raw}")
+    try:
+        await worker.run()
+    finally:
+        await queue.close()
+        await temporal.close()
+        await database.close_db()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import random
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .database import JobLog
+from .stats import ROLLUP_STATUSES, RollupKey, apply_rollups, transition_key
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+def _insert_new_jobs(dialect: str) -> Any:
+    """
+    INSERT that skips job_ids already present, so a row another instance wrote
+    for the same idempotent request doesn't fail the whole batch.
+    """
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        return dialect_insert(JobLog).on_conflict_do_nothing(index_elements=["job_id"])
+    return insert(JobLog)
+
+class JobLogWriter:
+    """
+    Write-behind queue for JobLog inserts and status transitions.
+
+    Request handlers enqueue and return; a background task drains the queue and
+    flushes once ``batch_size`` operations are waiting or ``flush_interval``
+    seconds have passed. Each flush is a multi-row INSERT plus an executemany
+    UPDATE (one of each per column set) in a single transaction. The queue is bounded, so a
+    stalled database applies backpressure instead of growing memory.
+
+    A failed flush is retried with capped exponential backoff (the queue keeps
+    filling meanwhile, so callers block once it is full). After ``max_retries``
+    failures, or ``CLOSE_RETRIES`` once shutting down, the batch is dropped and
+    logged, and its jobs are forgotten so their next update is written again.
+    """
+
+    CLOSE_RETRIES = 3
+
+    def __init__(
+        self,
+        session_factory: Any,
+        batch_size: int,
+        flush_interval: float,
+        max_queue: int,
+        max_retries: int = 10,
+        initial_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ):
+        self._session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.dropped = 0
+        self._closing = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        # Last status written per job, so repeated polls don't enqueue no-op updates
+        self._recorded: "OrderedDict[str, str]" = OrderedDict()
+        self._recorded_max = max_queue
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def insert(self, values: Dict[str, Any]) -> None:
+        self._remember(values["job_id"], values.get("status"))
+        await self._queue.put(("insert", values["job_id"], values))
+
+    async def update(self, job_id: str, values: Dict[str, Any]) -> None:
+        status = values.get("status")
+        if status is not None and self._recorded.get(job_id) == status:
+            return
+        self._remember(job_id, status)
+        await self._queue.put(("update", job_id, values))
+
+    def _remember(self, job_id: str, status: Optional[str]) -> None:
+        if status is None:
+            return
+        self._recorded[job_id] = status
+        self._recorded.move_to_end(job_id)
+        if len(self._recorded) > self._recorded_max:
+            self._recorded.popitem(last=False)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            op = await self._queue.get()
+            if op is _STOP:
+                break
+            batch: List[Tuple[str, str, Dict[str, Any]]] = [op]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    op = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if op is _STOP:
+                    stopping = True
+                    break
+                batch.append(op)
+
+            await self._flush_with_retries(batch)
+
+    async def _flush_with_retries(self, batch: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        delay = self.initial_backoff
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await self._flush(batch)
+                return
+            except Exception as e:
+                limit = min(self.max_retries, self.CLOSE_RETRIES) if self._closing else self.max_retries
+                if attempt > limit:
+                    self._drop(batch, e)
+                    return
+                logger.warning(
+                    f"JobLog flush of {len(batch)} operations failed (attempt {attempt}), retrying in {delay:.1f}s: {e}"
+                )
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+                delay = min(delay * 2, self.max_backoff)
+
+    def _drop(self, batch: List[Tuple[str, str, Dict[str, Any]]], error: Exception) -> None:
+        job_ids = {job_id for _, job_id, _ in batch}
+        for job_id in job_ids:
+            self._recorded.pop(job_id, None)
+        self.dropped += len(batch)
+        logger.error(f"Dropped JobLog batch of {len(batch)} operations for {len(job_ids)} jobs after retries: {error}")
+
+    async def _flush(self, batch: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        inserts: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        updates: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Every status transition in the batch, for the stats rollups
+        transitions: List[Tuple[str, Dict[str, Any]]] = []
+        for kind, job_id, values in batch:
+            if values.get("status") in ROLLUP_STATUSES:
+                transitions.append((job_id, values))
+            if kind == "insert":
+                inserts[job_id] = dict(values)
+            elif job_id in inserts:
+                # Row hasn't been written yet: fold the transition into the INSERT
+                inserts[job_id].update(values)
+            else:
+                updates.setdefault(job_id, {}).update(values)
+
+        # Multi-row VALUES and executemany both need the same columns on every row
+        insert_groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for values in inserts.values():
+            insert_groups.setdefault(tuple(sorted(values)), []).append(values)
+
+        update_groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for job_id, values in updates.items():
+            params = {"b_job_id": job_id, **{f"v_{column}": value for column, value in values.items()}}
+            update_groups.setdefault(tuple(sorted(values)), []).append(params)
+
+        # One transaction: on failure nothing (rollups included) is applied, so a retry can't double count
+        async with self._session_factory() as db:
+            for rows in insert_groups.values():
+                await db.execute(_insert_new_jobs(db.bind.dialect.name).values(rows))
+            for columns, rows in update_groups.items():
+                stmt = (
+                    update(JobLog.__table__)
+                    .where(JobLog.__table__.c.job_id == bindparam("b_job_id"))
+                    .values({column: bindparam(f"v_{column}") for column in columns})
+                )
+                await db.execute(stmt, rows)
+            await apply_rollups(db, await self._rollup_keys(db, inserts, transitions))
+            await db.commit()
+
+    async def _rollup_keys(
+        self,
+        db: Any,
+        inserts: Dict[str, Dict[str, Any]],
+        transitions: List[Tuple[str, Dict[str, Any]]],
+    ) -> List[RollupKey]:
+        """Resolve job_type/started_at for each transition, with one SELECT for rows written earlier."""
+        known = {job_id: (values["job_type"], values.get("started_at")) for job_id, values in inserts.items()}
+        missing = {job_id for job_id, _ in transitions if job_id not in known}
+        if missing:
+            rows = await db.execute(
+                select(JobLog.job_id, JobLog.job_type, JobLog.started_at).where(JobLog.job_id.in_(missing))
+            )
+            known.update({job_id: (job_type, started_at) for job_id, job_type, started_at in rows.all()})
+
+        return [
+            transition_key(known[job_id][0], values["status"], known[job_id][1], values.get("completed_at"))
+            for job_id, values in transitions
+            if job_id in known
+        ]
+
+    async def close(self) -> None:
+        """Flush everything still queued and stop the background task."""
+        if self._task is None:
+            return
+        self._closing = True
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+# Set during app startup when write-behind mode is enabled
+writer: Optional[JobLogWriter] = None
+
+def start_writer(session_factory: Any, batch_size: int, flush_interval: float, max_queue: int, **retry: Any) -> JobLogWriter:
+    global writer
+    writer = JobLogWriter(session_factory, batch_size, flush_interval, max_queue, **retry)
+    writer.start()
+    logger.info("JobLog write-behind writer started")
+    return writer
+
+async def stop_writer() -> None:
+    global writer
+    if writer:
+        await writer.close()
+        logger.info("JobLog write-behind writer flushed and stopped")
+        writer = None
@@ -1,19 +1,44 @@
+import asyncio
 from typing import Optional
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from temporalio.client import Client
-
 from app.settings import get_settings, Settings
 from app.middleware import SecurityHeadersMiddleware
-from app.routers import health, uploads, jobs, admin
+from app.metrics import MetricsMiddleware
+from app.admission import AdmissionControlMiddleware
+from app.serialization import ResponseEncodingMiddleware
+from app.profiling import ProfilingMiddleware
+from app.auth import is_admin_key
+from app.routers import health, uploads, jobs, admin, metrics
+from app import database, joblog_writer, multipart, readiness
 from app.database import init_database, create_tables, close_db
+from app.deps import get_async_s3_client, get_http_client, get_profile_store
+from app.temporal import TemporalConnection
 
 settings: Settings = get_settings()
 
-# Global variable for temporal client
-temporal_client: Optional[Client] = None
+# Owns the Temporal client; connects (and retries) in the background
+temporal_connection: Optional[TemporalConnection] = None
+
+async def _start_database(s: Settings) -> None:
+    init_database()
+
+    # DDL is off the boot path unless explicitly enabled (see `python -m app.database`)
+    if s.database_create_tables:
+        await create_tables()
+
+    # Optionally move JobLog writes off the request path
+    if s.joblog_write_behind and database.database_enabled:
+        joblog_writer.start_writer(
+            database.AsyncSessionLocal,
+            batch_size=s.joblog_flush_batch_size,
+            flush_interval=s.joblog_flush_interval,
+            max_queue=s.joblog_queue_size,
+            max_retries=s.joblog_flush_max_retries,
+            max_backoff=s.joblog_flush_max_backoff,
+        )
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -21,29 +46,51 @@ async def lifespan(app: FastAPI):
     Lifespan context manager for FastAPI application.
     Handles startup and shutdown logic.
     """
-    global temporal_client
+    global temporal_connection
     s: Settings = get_settings()
 
     # Startup
     print("Starting up photo-api...")
 
-    # Initialize database connection
-    init_database()
-
-    # Create database tables
-    await create_tables()
-
-    # Initialize Temporal client
-    try:
-        temporal_client = await Client.connect(
-            target_host=s.temporal_target, namespace=s.temporal_namespace
-        )
-        # Pass the temporal client to the jobs router
-        jobs.set_temporal_client(temporal_client)
+    # Temporal connects in the background and keeps retrying if it is down;
+    # jobs routes answer 503 until the client is set
+    temporal_connection = TemporalConnection(
+        s.temporal_target,
+        s.temporal_namespace,
+        on_connect=jobs.set_temporal_client,
+        connect_timeout=s.temporal_connect_timeout,
+        initial_backoff=s.temporal_reconnect_initial_backoff,
+        max_backoff=s.temporal_reconnect_max_backoff,
+    )
+    temporal_connection.start()
+
+    # Independent dependencies start concurrently; boot waits for Temporal's
+    # first attempt only up to TEMPORAL_STARTUP_WAIT_SECONDS
+    _, temporal_ready = await asyncio.gather(
+        _start_database(s),
+        temporal_connection.wait_first_attempt(s.temporal_startup_wait_seconds),
+    )
+    if temporal_ready:
         print("✅ Temporal client connected")
-    except Exception as e:
-        print(f"⚠️  Warning: Could not connect to Temporal: {e}")
-        print("API will run without Temporal workflows")
+    else:
+        print(f"⚠️  Warning: Temporal not connected yet ({temporal_connection.last_error or 'still connecting'}); retrying in the background")
+
+    # Abort abandoned presigned multipart uploads in the raw bucket
+    if s.multipart_janitor_interval > 0:
+        multipart.start_janitor(
+            get_async_s3_client,
+            s.s3_bucket_raw,
+            interval=s.multipart_janitor_interval,
+            max_age=s.multipart_max_age_seconds,
+        )
+
+    # Probe dependencies in the background for /readyz
+    readiness.start_checker(
+        readiness.DEPENDENCY_CHECKS,
+        required=s.readiness_required_list,
+        interval=s.readiness_check_interval,
+        timeout=s.readiness_check_timeout,
+    )
 
     print("✅ Photo-api startup complete")
 
@@ -52,13 +99,23 @@ async def lifespan(app: FastAPI):
     # Shutdown
     print("Shutting down photo-api...")
 
-    # Close Temporal client
-    if temporal_client:
-        try:
-            await temporal_client.close()
-            print("✅ Temporal client closed")
-        except Exception as e:
-            print(f"Error closing Temporal client: {e}")
+    await readiness.stop_checker()
+
+    # Stop reconnecting and close the Temporal client
+    await temporal_connection.close()
+
+    await multipart.stop_janitor()
+
+    # Flush queued JobLog writes before the database goes away
+    await joblog_writer.stop_writer()
+
+    # Close pooled connections used for URL ingestion
+    if get_http_client.cache_info().currsize:
+        await get_http_client().aclose()
+
+    # Stop the S3 worker pool (only if it was ever created)
+    if get_async_s3_client.cache_info().currsize:
+        get_async_s3_client().shutdown()
 
     # Close database connections
     await close_db()
@@ -70,6 +127,44 @@ app: FastAPI = FastAPI(
     lifespan=lifespan
 )
 
+# On-demand request profiling (see GET /admin/profiles). Innermost, so profiles
+# cover the route's own work and not admission queueing.
+if settings.profiling_enabled:
+    app.add_middleware(
+        ProfilingMiddleware,
+        get_store=get_profile_store,
+        is_admin_key=is_admin_key,
+        interval=settings.profiling_sample_interval,
+        route_sample_rates=settings.profiling_route_sample_rates,
+        max_concurrent=settings.profiling_max_concurrent,
+    )
+
+# Shed load per route before any dependency (DB session, S3, Temporal) runs.
+# Added before the header middlewares: shed 503s still get CORS and security headers.
+if settings.admission_enabled:
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        initial_limit=settings.admission_initial_limit,
+        min_limit=settings.admission_min_limit,
+        max_limit=settings.admission_max_limit,
+        max_queue=settings.admission_queue_size,
+        queue_timeout=settings.admission_queue_timeout,
+        retry_after=settings.admission_retry_after_seconds,
+        exempt_routes=settings.admission_exempt_routes_list,
+        route_max_limits=settings.admission_route_max_limits,
+    )
+
+# Compression and MessagePack negotiation. Must sit inside SecurityHeadersMiddleware,
+# whose BaseHTTPMiddleware re-chunks every body as if it were streamed.
+app.add_middleware(
+    ResponseEncodingMiddleware,
+    minimum_size=settings.response_compression_min_bytes,
+    gzip_level=settings.response_gzip_level,
+    brotli_quality=settings.response_brotli_quality,
+    compress=settings.response_compression_enabled,
+    msgpack_enabled=settings.response_msgpack_enabled,
+)
+
 # Add security headers middleware
 app.add_middleware(SecurityHeadersMiddleware)
 
@@ -82,8 +177,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency histograms (pure ASGI, outermost so it times everything)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(health.router)
+app.include_router(metrics.router)
 app.include_router(uploads.router)
 app.include_router(jobs.router)
 app.include_router(admin.router)
\ No newline at end of file
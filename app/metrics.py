@@ -0,0 +1,177 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Dedicated registry so tests and reloads don't trip over duplicate default registrations
+REGISTRY = CollectorRegistry()
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    registry=REGISTRY,
+)
+DEPENDENCY_LATENCY = Histogram(
+    "dependency_call_duration_seconds",
+    "Latency of calls to S3, the database and Temporal",
+    ["dependency", "operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    registry=REGISTRY,
+)
+DEPENDENCY_ERRORS = Counter(
+    "dependency_errors_total",
+    "Failed calls to S3, the database and Temporal",
+    ["dependency", "operation"],
+    registry=REGISTRY,
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_acquire_seconds",
+    "Time to check a connection out of the SQLAlchemy pool (including connects)",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+    registry=REGISTRY,
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejected_total",
+    "Requests shed with 503 by admission control",
+    ["route"],
+    registry=REGISTRY,
+)
+DEPENDENCY_UP = Gauge(
+    "dependency_up",
+    "1 if the last readiness check of a dependency passed, else 0",
+    ["dependency"],
+    registry=REGISTRY,
+)
+ADMISSION_LIMIT = Gauge(
+    "admission_concurrency_limit",
+    "Current adaptive concurrency limit per route",
+    ["route"],
+    registry=REGISTRY,
+)
+
+UNMATCHED_ROUTE = "__unmatched__"
+
+@contextmanager
+def observe(dependency: str, operation: str) -> Iterator[None]:
+    """Time a dependency call and count it as an error if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        DEPENDENCY_ERRORS.labels(dependency, operation).inc()
+        raise
+    finally:
+        DEPENDENCY_LATENCY.labels(dependency, operation).observe(time.perf_counter() - start)
+
+class MetricsMiddleware:
+    """
+    Pure ASGI request-latency middleware.
+    Unlike BaseHTTPMiddleware it doesn't wrap the response in a new task and
+    stream, so the cost is one histogram observation per request. Requests are
+    labelled by route template (``/jobs/{job_id}``), not by raw path.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"], getattr(route, "path", UNMATCHED_ROUTE), str(status_code)
+            ).observe(time.perf_counter() - start)
+
+class _PoolCollector:
+    """Reads SQLAlchemy pool occupancy at scrape time."""
+
+    def __init__(self) -> None:
+        self.engine: Optional[Any] = None
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        if self.engine is None:
+            return
+        pool = self.engine.sync_engine.pool
+        for name, doc, method in (
+            ("db_pool_size", "Configured pool size", "size"),
+            ("db_pool_checked_out", "Connections currently checked out", "checkedout"),
+            ("db_pool_checked_in", "Idle connections in the pool", "checkedin"),
+            ("db_pool_overflow", "Connections open beyond pool_size", "overflow"),
+        ):
+            # Only QueuePool implements all of these
+            reader = getattr(pool, method, None)
+            if reader is not None:
+                yield GaugeMetricFamily(name, doc, value=reader())
+
+_pool_collector = _PoolCollector()
+REGISTRY.register(_pool_collector)
+
+def _statement_operation(statement: str) -> str:
+    return statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "unknown"
+
+def instrument_engine(engine: Any) -> None:
+    """Hook pool gauges, checkout wait time and statement latency onto an async engine."""
+    _pool_collector.engine = engine
+    sync_engine = engine.sync_engine
+
+    pool = sync_engine.pool
+    pool_connect = pool.connect
+
+    def timed_connect() -> Any:
+        start = time.perf_counter()
+        try:
+            return pool_connect()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+    pool.connect = timed_connect
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["metrics_start"].pop()
+        DEPENDENCY_LATENCY.labels("db", _statement_operation(statement)).observe(time.perf_counter() - start)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        if context.connection is not None and context.connection.info.get("metrics_start"):
+            context.connection.info["metrics_start"].pop()
+        operation = _statement_operation(context.statement) if context.statement else "connect"
+        DEPENDENCY_ERRORS.labels("db", operation).inc()
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session: Session) -> None:
+    session.info["metrics_commit_start"] = time.perf_counter()
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    start = session.info.pop("metrics_commit_start", None)
+    if start is not None:
+        DEPENDENCY_LATENCY.labels("db", "commit").observe(time.perf_counter() - start)
+
+def render_metrics() -> tuple:
+    """Return (body, content type) for the Prometheus exposition format."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
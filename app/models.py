@@ -1,5 +1,9 @@
-from typing import Optional, Dict, Any
-from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Annotated
+from pydantic import BaseModel, Field, StringConstraints, computed_field
+
+# Job IDs end up inside Temporal visibility queries, so keep them to a safe charset
+JobId = Annotated[str, StringConstraints(pattern=r"^[A-Za-z0-9._:-]+$", max_length=200)]
 
 class InitUploadRequest(BaseModel):
     content_type: str = Field(..., description="MIME type, e.g. image/jpeg")
@@ -11,16 +15,135 @@ class InitUploadResponse(BaseModel):
     fields: Dict[str, Any]
     key: str
 
+class InitUploadBatchRequest(BaseModel):
+    files: List[InitUploadRequest] = Field(..., min_length=1, max_length=200, description="One entry per file to upload")
+
+class InitUploadBatchResponse(BaseModel):
+    uploads: List[InitUploadResponse]
+
+class MultipartInitRequest(BaseModel):
+    content_type: str = Field(..., description="MIME type, e.g. image/heic")
+    size: int = Field(..., gt=0, description="Total object size in bytes")
+    part_size: Optional[int] = Field(
+        None, le=5 * 1024**3,
+        description="Preferred part size in bytes, at most 5 GiB; raised if the object would need more than 10,000 parts",
+    )
+    key_prefix: Optional[str] = Field(None, description="Optional S3 key prefix")
+
+class MultipartInitResponse(BaseModel):
+    key: str
+    upload_id: str
+    part_size: int
+    part_count: int
+
+class MultipartPartsRequest(BaseModel):
+    key: str
+    upload_id: str
+    part_numbers: List[Annotated[int, Field(ge=1, le=10_000)]] = Field(..., min_length=1, max_length=1000, description="Part numbers to presign")
+
+class MultipartPartURL(BaseModel):
+    part_number: int
+    url: str
+
+class MultipartPartsResponse(BaseModel):
+    parts: List[MultipartPartURL]
+    expires_in: int
+
+class MultipartPart(BaseModel):
+    part_number: int = Field(..., ge=1, le=10_000)
+    etag: str
+
+class MultipartCompleteRequest(BaseModel):
+    key: str
+    upload_id: str
+    parts: List[MultipartPart] = Field(..., min_length=1, max_length=10_000)
+
+class MultipartCompleteResponse(BaseModel):
+    key: str
+    etag: str
+    size: int
+
+class MultipartAbortRequest(BaseModel):
+    key: str
+    upload_id: str
+
 class FromUploadRequest(BaseModel):
     key: str
     job_metadata: Optional[Dict[str, Any]] = None
 
+class BatchFromUploadRequest(BaseModel):
+    items: List[FromUploadRequest] = Field(..., min_length=1, max_length=500)
+
+class BatchJobResult(BaseModel):
+    key: str
+    job_id: Optional[str] = None
+    status: str = Field(..., description="started, failed (workflow not started or S3 unavailable; safe to retry) or rejected (S3 object not accessible, not a valid image, or over quota)")
+    error: Optional[str] = None
+
+class BatchFromUploadResponse(BaseModel):
+    results: List[BatchJobResult]
+
 class FromURLRequest(BaseModel):
     url: str
     filename: Optional[str] = None
     job_metadata: Optional[Dict[str, Any]] = None
 
+def _is_none(value: Any) -> bool:
+    return value is None
+
 class JobStatus(BaseModel):
     job_id: str
     status: str
-    result: Optional[Dict[str, Any]] = None
\ No newline at end of file
+    result: Optional[Dict[str, Any]] = None
+    # Large results live in the processed bucket instead of ``result``. These fields
+    # are left out of responses unless set (exclude_if keeps pydantic-core's fast path).
+    # Only the S3 key is kept (result_key, never serialized); result_url is presigned
+    # from it on every dump, so cached statuses never hand out expired URLs. A status
+    # parsed back from a response keeps the URL it was given, untouched.
+    result_key: Optional[str] = Field(None, exclude=True)
+    given_result_url: Optional[str] = Field(None, alias="result_url", exclude=True)
+    result_size: Optional[int] = Field(None, exclude_if=_is_none, description="Size in bytes of the offloaded result")
+    result_summary: Optional[Dict[str, Any]] = Field(
+        None, exclude_if=_is_none, description="Top-level preview of the offloaded result"
+    )
+
+    @computed_field(exclude_if=_is_none, description="Short-lived presigned GET URL of the full result, if offloaded")
+    @property
+    def result_url(self) -> Optional[str]:
+        if self.result_key is None:
+            return self.given_result_url
+        from .results import presign_result
+        return presign_result(self.result_key)
+
+class BatchJobStatusRequest(BaseModel):
+    job_ids: List[JobId] = Field(..., min_length=1, max_length=1000)
+    include_results: bool = Field(False, description="Also fetch results of completed jobs not already cached")
+
+class BatchJobStatusResponse(BaseModel):
+    jobs: List[JobStatus]
+
+class DependencyHealth(BaseModel):
+    ok: bool
+    required: bool = Field(..., description="Whether this dependency failing makes the instance not ready")
+    latency_ms: Optional[float] = None
+    error: Optional[str] = None
+    checked_at: Optional[datetime] = None
+
+class ReadinessResponse(BaseModel):
+    ready: bool
+    dependencies: Dict[str, DependencyHealth]
+
+class ProfileSummary(BaseModel):
+    id: str
+    method: str
+    path: str
+    route: Optional[str] = None
+    status_code: int
+    trigger: str = Field(description="header (X-Profile from an admin) or sampled")
+    started_at: datetime
+    duration_ms: float
+    samples: int
+
+class ProfileListResponse(BaseModel):
+    enabled: bool
+    profiles: List[ProfileSummary]
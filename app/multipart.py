@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# S3 limits for multipart uploads
+MAX_PARTS = 10_000
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PART_SIZE = 5 * 1024 * 1024 * 1024
+
+def plan_parts(size: int, part_size: int) -> Tuple[int, int]:
+    """
+    (part size, part count) for an object, growing the part size to stay within
+    S3's part limit. Raises ValueError if no part size within S3's limits fits.
+    """
+    part_size = min(max(part_size, MIN_PART_SIZE, math.ceil(size / MAX_PARTS)), MAX_PART_SIZE)
+    part_count = max(1, math.ceil(size / part_size))
+    if part_count > MAX_PARTS:
+        raise ValueError(f"{size} bytes need more than {MAX_PARTS} parts of at most {MAX_PART_SIZE} bytes")
+    return part_size, part_count
+
+async def abort_stale_uploads(s3: Any, bucket: str, max_age: float, now: Optional[datetime] = None) -> int:
+    """Abort incomplete multipart uploads started more than ``max_age`` seconds ago. Returns how many."""
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(seconds=max_age)
+    aborted = 0
+    markers: dict = {}
+    while True:
+        page = await s3.list_multipart_uploads(Bucket=bucket, **markers)
+        for upload in page.get("Uploads", []):
+            if upload["Initiated"] >= cutoff:
+                continue
+            try:
+                await s3.abort_multipart_upload(Bucket=bucket, Key=upload["Key"], UploadId=upload["UploadId"])
+                aborted += 1
+            except Exception as e:
+                # Completed or aborted concurrently (e.g. by another replica's janitor)
+                logger.warning(f"Could not abort multipart upload {upload['Key']}: {e}")
+        if not page.get("IsTruncated"):
+            return aborted
+        markers = {"KeyMarker": page["NextKeyMarker"], "UploadIdMarker": page["NextUploadIdMarker"]}
+
+class MultipartJanitor:
+    """
+    Periodically aborts abandoned presigned multipart uploads, whose parts are
+    otherwise billed until an S3 lifecycle rule removes them. The first sweep
+    runs after a random fraction of the interval, which keeps it off the boot
+    path and stops replicas from sweeping in lockstep.
+    """
+
+    def __init__(self, get_s3: Callable[[], Any], bucket: str, interval: float, max_age: float):
+        self.get_s3 = get_s3
+        self.bucket = bucket
+        self.interval = interval
+        self.max_age = max_age
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        await asyncio.sleep(random.uniform(0, self.interval))
+        while True:
+            try:
+                aborted = await abort_stale_uploads(self.get_s3(), self.bucket, self.max_age)
+                if aborted:
+                    logger.info(f"Aborted {aborted} stale multipart uploads in {self.bucket}")
+            except Exception as e:
+                logger.error(f"Multipart janitor failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+janitor: Optional[MultipartJanitor] = None
+
+def start_janitor(get_s3: Callable[[], Any], bucket: str, interval: float, max_age: float) -> MultipartJanitor:
+    global janitor
+    janitor = MultipartJanitor(get_s3, bucket, interval, max_age)
+    janitor.start()
+    logger.info("Multipart upload janitor started")
+    return janitor
+
+async def stop_janitor() -> None:
+    global janitor
+    if janitor:
+        await janitor.close()
+        janitor = None
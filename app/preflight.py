@@ -0,0 +1,116 @@
+import io
+import warnings
+from typing import Any, Dict, Optional
+
+# Leading bytes of each accepted format
+_MAGIC = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+)
+# ISO-BMFF brands (bytes 8..12 of the "ftyp" box) used by HEIC/HEIF files
+_HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis", b"mif1", b"msf1"}
+# Content types that describe the same container
+_EQUIVALENT_TYPES = {"image/heif": "image/heic"}
+
+# S3 error codes for an object that is gone or off-limits; anything else may be transient
+_MISSING_OBJECT_CODES = {"403", "404", "AccessDenied", "Forbidden", "NoSuchBucket", "NoSuchKey", "NotFound"}
+
+def is_missing_object_error(e: Exception) -> bool:
+    """True if an S3 call failed because the object doesn't exist or can't be read (not worth retrying)."""
+    # botocore ClientErrors carry the S3 error code and HTTP status in ``response``
+    response = getattr(e, "response", None) or {}
+    code = response.get("Error", {}).get("Code")
+    http_status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return code in _MISSING_OBJECT_CODES or http_status in (403, 404)
+
+class PreflightError(Exception):
+    """An object failed pre-flight validation; ``status_code`` is the HTTP status to report."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def sniff_mime(head: bytes) -> Optional[str]:
+    """Identify the image type from its first bytes, ignoring any declared Content-Type."""
+    for magic, mime in _MAGIC:
+        if head.startswith(magic):
+            return mime
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp" and head[8:12] in _HEIF_BRANDS:
+        return "image/heic"
+    return None
+
+def probe_header(head: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Parse format and dimensions from the start of an image with Pillow.
+    ``Image.open`` is lazy: it reads the header only and decodes no pixels.
+    Returns None if ``head`` is too short or not parseable.
+    """
+    # Imported on first use to keep Pillow off the startup path
+    from PIL import Image
+
+    try:
+        with warnings.catch_warnings():
+            # Oversized images warn here; the caller applies its own pixel limit
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            with Image.open(io.BytesIO(head)) as image:
+                width, height = image.size
+                return {"format": image.format, "width": width, "height": height}
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        return None
+
+async def preflight_image(
+    s3: Any,
+    bucket: str,
+    key: str,
+    obj_info: Dict[str, Any],
+    head_bytes: int,
+    max_head_bytes: int,
+    max_pixels: int,
+) -> Dict[str, Any]:
+    """
+    Validate an uploaded object from a ranged GET of its first ``head_bytes``
+    (retried once up to ``max_head_bytes`` for headers behind large EXIF blocks).
+    Returns the verified ``mime``/``format``/``width``/``height``. S3 failures
+    other than a missing or forbidden object are re-raised, so callers can retry.
+    """
+    declared = (obj_info.get("ContentType") or "").split(";")[0].strip().lower()
+    declared = _EQUIVALENT_TYPES.get(declared, declared)
+    size = obj_info.get("ContentLength") or 0
+
+    try:
+        head = await s3.get_object_bytes(Bucket=bucket, Key=key, Range=f"bytes=0-{head_bytes - 1}")
+    except Exception as e:
+        if not is_missing_object_error(e):
+            raise
+        raise PreflightError(400, f"S3 object not found or not accessible: {key}")
+
+    mime = sniff_mime(head)
+    if mime is None:
+        raise PreflightError(415, f"Object is not a supported image: {key}")
+    if declared and declared != mime:
+        raise PreflightError(415, f"Object content is {mime} but is labeled {declared}: {key}")
+
+    info: Dict[str, Any] = {"mime": mime, "format": None, "width": None, "height": None}
+    if mime == "image/heic":
+        # Pillow has no HEIF decoder here; the magic bytes are all we can check
+        return info
+
+    header = probe_header(head)
+    if header is None and size > len(head) and max_head_bytes > head_bytes:
+        try:
+            head = await s3.get_object_bytes(Bucket=bucket, Key=key, Range=f"bytes=0-{max_head_bytes - 1}")
+        except Exception as e:
+            if not is_missing_object_error(e):
+                raise
+            raise PreflightError(400, f"S3 object not found or not accessible: {key}")
+        header = probe_header(head)
+    if header is None:
+        raise PreflightError(422, f"Image header is corrupt or truncated: {key}")
+    if header["width"] * header["height"] > max_pixels:
+        raise PreflightError(422, f"Image is {header['width']}x{header['height']}, over the {max_pixels} pixel limit: {key}")
+
+    info.update(header)
+    return info
@@ -0,0 +1,233 @@
+import asyncio
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from types import FrameType
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .models import ProfileSummary
+
+PROFILE_HEADER = "x-profile"
+WAIT_FRAME = "<await>"
+
+Stack = Tuple[str, ...]
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+def _await_chain(awaitable: Any) -> Iterable[Any]:
+    """Frames of a suspended coroutine and everything it awaits, outermost first; None for a non-coroutine leaf."""
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "ag_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            yield None
+            return
+        yield frame
+        awaitable = (
+            getattr(awaitable, "cr_await", None)
+            or getattr(awaitable, "ag_await", None)
+            or getattr(awaitable, "gi_yieldfrom", None)
+        )
+
+class StackSampler:
+    """
+    Wall-clock sampling profiler for one request. A thread wakes every
+    ``interval`` seconds and records where the request's task is: the loop
+    thread's live stack if the task is running, else the chain of coroutines
+    it is suspended in, ending in ``<await>`` (time spent waiting on S3, the
+    database or Temporal). Stacks are trimmed to frames below ``root_code``,
+    the profiling middleware's own frame.
+    """
+
+    def __init__(self, task: asyncio.Task, root_code: Any, interval: float, start: Optional[float] = None):
+        self.task = task
+        # perf_counter() when the request started; the first sample covers the time since then
+        self.start_time = start
+        self.loop = task.get_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.root_code = root_code
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter = Counter()  # stack -> microseconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        last = self.start_time if self.start_time is not None else time.perf_counter()
+        while not self._stop.wait(self.interval):
+            # Weight each sample by the time since the previous one: while the loop
+            # runs Python code, the GIL only lets this thread in every
+            # sys.getswitchinterval() (5 ms), not every ``interval``
+            now = time.perf_counter()
+            elapsed_us, last = int((now - last) * 1e6), now
+            try:
+                stack = self._sample()
+            except Exception:
+                # The loop mutated the frames mid-walk; drop this sample
+                continue
+            if stack:
+                self.samples += 1
+                self.stacks[stack] += elapsed_us
+
+    def _sample(self) -> Optional[Stack]:
+        if asyncio.current_task(self.loop) is self.task:
+            frame = sys._current_frames().get(self.loop_thread_id)
+            labels: List[str] = []
+            while frame is not None and frame.f_code is not self.root_code:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            return tuple(reversed(labels)) if frame is not None else None
+
+        labels = []
+        below_root = False
+        for frame in _await_chain(self.task.get_coro()):
+            if frame is None:
+                labels.append(WAIT_FRAME)
+            elif below_root:
+                labels.append(_frame_label(frame))
+            elif frame.f_code is self.root_code:
+                below_root = True
+        return tuple(labels) if below_root else None
+
+class Profile:
+    """A finished request profile: its summary and wall-clock microseconds per stack."""
+    __slots__ = ("summary", "stacks")
+
+    def __init__(self, summary: ProfileSummary, stacks: Counter):
+        self.summary = summary
+        self.stacks = stacks
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format (counts in microseconds), for flamegraph.pl, speedscope or inferno."""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+class ProfileStore:
+    """Bounded ring buffer of recent profiles; the oldest is dropped when full."""
+
+    def __init__(self, max_profiles: int):
+        self._profiles: deque = deque(maxlen=max_profiles)
+        self._ids = itertools.count(1)
+
+    def next_id(self) -> str:
+        return f"p{next(self._ids)}"
+
+    def add(self, profile: Profile) -> None:
+        self._profiles.append(profile)
+
+    def list(self) -> List[ProfileSummary]:
+        """Newest first."""
+        return [profile.summary for profile in reversed(self._profiles)]
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return next((p for p in self._profiles if p.summary.id == profile_id), None)
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI on-demand request profiling. Profiles a request when an admin
+    sends ``X-Profile: 1`` or, per route template, for a random
+    ``route_sample_rates`` fraction of requests; the profile id is returned in
+    ``X-Profile-Id`` and the report lands in the store. At most
+    ``max_concurrent`` requests are profiled at once. Only installed when
+    PROFILING_ENABLED is set; unprofiled requests then cost one header lookup
+    (plus route matching if sample rates are configured).
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        get_store: Any,
+        is_admin_key: Any,
+        interval: float = 0.005,
+        route_sample_rates: Optional[Dict[str, float]] = None,
+        max_concurrent: int = 2,
+    ):
+        self.app = app
+        self.get_store = get_store
+        self.is_admin_key = is_admin_key
+        self.interval = interval
+        self.route_sample_rates = route_sample_rates or {}
+        self.max_concurrent = max_concurrent
+        self.active = 0
+
+    def _match_route(self, scope: Scope) -> Optional[Any]:
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route
+        return None
+
+    def _trigger(self, scope: Scope) -> Optional[str]:
+        headers = Headers(scope=scope)
+        if headers.get(PROFILE_HEADER):
+            scheme, _, key = headers.get("authorization", "").partition(" ")
+            if scheme.lower() == "bearer" and self.is_admin_key(key):
+                return "header"
+        if self.route_sample_rates:
+            path = getattr(self._match_route(scope), "path", None)
+            rate = self.route_sample_rates.get(path)
+            if rate and random.random() < rate:
+                return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = self._trigger(scope)
+        if trigger is None or self.active >= self.max_concurrent:
+            await self.app(scope, receive, send)
+            return
+        await self._profiled(scope, receive, send, trigger)
+
+    async def _profiled(self, scope: Scope, receive: Receive, send: Send, trigger: str) -> None:
+        store = self.get_store()
+        profile_id = store.next_id()
+        status_code = 500
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-Id", profile_id)
+            await send(message)
+
+        started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        sampler = StackSampler(asyncio.current_task(), ProfilingMiddleware._profiled.__code__, self.interval, start)
+        self.active += 1
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            stacks = sampler.stop()
+            self.active -= 1
+            route = scope.get("route")
+            store.add(Profile(ProfileSummary(
+                id=profile_id,
+                method=scope["method"],
+                path=scope["path"],
+                route=getattr(route, "path", None),
+                status_code=status_code,
+                trigger=trigger,
+                started_at=started_at,
+                duration_ms=round((time.perf_counter() - start) * 1000, 2),
+                samples=sampler.samples,
+            ), stacks))
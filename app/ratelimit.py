@@ -0,0 +1,89 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Type
+
+class RateLimiter(ABC):
+    """
+    Per-API-key request rate limits and concurrent-job quotas.
+    Implement this to share limiter state between instances (e.g. Redis).
+    """
+
+    @abstractmethod
+    def acquire(self, key: str, rate: float, burst: int, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens from ``key``'s bucket. Returns 0 if allowed, else seconds until it would be."""
+        ...
+
+    @abstractmethod
+    def start_job(self, key: str, job_id: str, max_concurrent: int) -> bool:
+        """Reserve a job slot for ``key``. Returns False when the quota is used up."""
+        ...
+
+    @abstractmethod
+    def finish_job(self, job_id: str) -> None:
+        """Release the slot held by ``job_id`` (no-op if it holds none)."""
+        ...
+
+    @abstractmethod
+    def active_jobs(self, key: str) -> int:
+        ...
+
+class InMemoryRateLimiter(RateLimiter):
+    """
+    Process-local token buckets and job slots.
+
+    A bucket is two floats, refilled lazily on access, so cost per check is
+    O(1) regardless of how many keys exist. Job slots expire after
+    ``job_ttl`` seconds in case a job's terminal state is never observed.
+    """
+
+    def __init__(self, job_ttl: float):
+        self.job_ttl = job_ttl
+        self._buckets: Dict[str, List[float]] = {}  # key -> [tokens, last refill]
+        self._jobs: Dict[str, Dict[str, float]] = {}  # key -> {job_id: expires at}
+        self._job_owner: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, rate: float, burst: int, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(burst), now]
+            tokens = min(float(burst), bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens >= cost:
+                bucket[0] = tokens - cost
+                return 0.0
+            bucket[0] = tokens
+            return (cost - tokens) / rate
+
+    def start_job(self, key: str, job_id: str, max_concurrent: int) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            jobs = self._jobs.setdefault(key, {})
+            if len(jobs) >= max_concurrent:
+                # Only scan for expired slots when the quota looks full
+                for expired in [j for j, expires in jobs.items() if expires <= now]:
+                    del jobs[expired]
+                    self._job_owner.pop(expired, None)
+                if len(jobs) >= max_concurrent:
+                    return False
+            jobs[job_id] = now + self.job_ttl
+            self._job_owner[job_id] = key
+            return True
+
+    def finish_job(self, job_id: str) -> None:
+        with self._lock:
+            key = self._job_owner.pop(job_id, None)
+            if key is not None:
+                self._jobs[key].pop(job_id, None)
+
+    def active_jobs(self, key: str) -> int:
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for expires in self._jobs.get(key, {}).values() if expires > now)
+
+RATE_LIMITER_BACKENDS: Dict[str, Type[RateLimiter]] = {
+    "memory": InMemoryRateLimiter,
+}
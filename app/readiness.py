@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Collection, Dict, Optional, Tuple
+
+from .metrics import DEPENDENCY_UP
+from .models import DependencyHealth
+
+logger = logging.getLogger(__name__)
+
+Check = Callable[[], Awaitable[None]]
+
+class ReadinessChecker:
+    """
+    Probes dependencies from a background task every ``interval`` seconds and
+    keeps the latest result per dependency, so /readyz only reads memory and
+    probe traffic stays constant however often the load balancer polls.
+
+    A check passes if it returns within ``timeout`` without raising. A check
+    that times out keeps running and later rounds wait on it rather than start
+    another, so a hung dependency holds at most one probe (and S3 worker thread).
+    Results older than ``max_age`` (e.g. the checker itself stalled) count as failed.
+    The instance is ready when every dependency in ``required`` passed; the
+    others are reported but only degrade the service.
+    """
+
+    def __init__(self, checks: Dict[str, Check], required: Collection[str], interval: float, timeout: float):
+        self.checks = checks
+        self.required = set(required)
+        self.interval = interval
+        self.timeout = timeout
+        self.max_age = 3 * interval + timeout
+        self._results: Dict[str, Tuple[float, DependencyHealth]] = {}
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.interval)
+
+    async def _check(self, name: str, check: Check) -> None:
+        probe = self._in_flight.get(name)
+        if probe is None or probe.done():
+            probe = self._in_flight[name] = asyncio.ensure_future(check())
+        start = time.perf_counter()
+        error: Optional[str] = None
+        try:
+            await asyncio.wait_for(asyncio.shield(probe), self.timeout)
+        except asyncio.TimeoutError:
+            error = f"timed out after {self.timeout}s"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        previous = self._results.get(name)
+        if error and (previous is None or previous[1].ok):
+            logger.warning(f"Dependency {name} is unhealthy: {error}")
+
+        DEPENDENCY_UP.labels(name).set(0 if error else 1)
+        self._results[name] = (time.monotonic(), DependencyHealth(
+            ok=error is None,
+            required=name in self.required,
+            latency_ms=round((time.perf_counter() - start) * 1000, 1),
+            error=error,
+            checked_at=datetime.now(timezone.utc),
+        ))
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self._check(name, check) for name, check in self.checks.items()))
+
+    def snapshot(self) -> Tuple[bool, Dict[str, DependencyHealth]]:
+        """(ready, per-dependency health). Never touches a dependency."""
+        now = time.monotonic()
+        report: Dict[str, DependencyHealth] = {}
+        for name in self.checks:
+            checked, health = self._results.get(name, (None, None))
+            if health is None:
+                health = DependencyHealth(ok=False, required=name in self.required, error="not checked yet")
+            elif now - checked > self.max_age:
+                health = health.model_copy(update={"ok": False, "error": "last check is stale"})
+            report[name] = health
+        ready = all(health.ok for health in report.values() if health.required)
+        return ready, report
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for probe in self._in_flight.values():
+            probe.cancel()
+        await asyncio.gather(*self._in_flight.values(), return_exceptions=True)
+        self._in_flight.clear()
+
+async def check_s3() -> None:
+    from .deps import get_async_s3_client
+    from .settings import get_settings
+    await get_async_s3_client().head_bucket(Bucket=get_settings().s3_bucket_raw)
+
+async def check_database() -> None:
+    from sqlalchemy import text
+    from . import database
+    if not database.database_enabled or not database.engine:
+        raise RuntimeError("database not initialized")
+    async with database.engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+async def check_temporal() -> None:
+    from .routers import jobs
+    if not jobs.temporal_client:
+        raise RuntimeError("client not connected")
+    if not await jobs.temporal_client.service_client.check_health():
+        raise RuntimeError("health check returned not serving")
+
+# Dependencies /readyz knows how to probe, by the names READINESS_REQUIRED uses
+DEPENDENCY_CHECKS: Dict[str, Check] = {
+    "database": check_database,
+    "s3": check_s3,
+    "temporal": check_temporal,
+}
+
+checker: Optional[ReadinessChecker] = None
+
+def start_checker(checks: Dict[str, Check], required: Collection[str], interval: float, timeout: float) -> ReadinessChecker:
+    global checker
+    unknown = set(required) - set(checks)
+    if unknown:
+        raise ValueError(f"Unknown required dependencies: {sorted(unknown)} (known: {sorted(checks)})")
+    checker = ReadinessChecker(checks, required, interval, timeout)
+    checker.start()
+    logger.info(f"Readiness checker started (required: {sorted(required) or 'none'})")
+    return checker
+
+async def stop_checker() -> None:
+    global checker
+    if checker:
+        await checker.close()
+        checker = None
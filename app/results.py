@@ -0,0 +1,45 @@
+import json
+from typing import Any, Dict, Optional
+
+from .settings import get_settings, Settings
+
+def result_key(job_id: str) -> str:
+    return f"{get_settings().result_offload_prefix.rstrip('/')}/{job_id}.json"
+
+def summarize_result(result: Any, max_keys: int = 20, max_chars: int = 200) -> Dict[str, Any]:
+    """
+    Small preview of a result: top-level scalars (long strings truncated) and
+    the size of each list or object, e.g. ``{"text": "First line…", "labels": {"items": 12}}``.
+    """
+    if not isinstance(result, dict):
+        return {"type": type(result).__name__}
+    summary: Dict[str, Any] = {}
+    for key, value in list(result.items())[:max_keys]:
+        if isinstance(value, str):
+            summary[key] = value if len(value) <= max_chars else value[:max_chars] + "…"
+        elif isinstance(value, (list, dict)):
+            summary[key] = {"items": len(value)}
+        else:
+            summary[key] = value
+    return summary
+
+async def offload_result(s3: Any, job_id: str, result: Any) -> Optional[Dict[str, Any]]:
+    """
+    Store a completed result in the processed bucket if it is over the offload
+    threshold. Returns the JobStatus fields that replace ``result``, or None
+    to keep it inline. The key is derived from the job, so repeated stores
+    (e.g. from several replicas) overwrite the same object.
+    """
+    s: Settings = get_settings()
+    body = json.dumps(result, separators=(",", ":")).encode("utf-8")
+    if len(body) < s.result_offload_min_bytes:
+        return None
+
+    key = result_key(job_id)
+    await s3.put_object(Bucket=s.s3_bucket_processed, Key=key, Body=body, ContentType="application/json")
+    return {"result_key": key, "result_size": len(body), "result_summary": summarize_result(result)}
+
+def presign_result(key: str) -> str:
+    from .deps import get_s3_signer
+    s: Settings = get_settings()
+    return get_s3_signer().presigned_url("GET", s.s3_bucket_processed, key, expires_in=s.result_url_expires_seconds)
@@ -1,58 +1,117 @@
-from typing import List, Dict, Any, Optional
+import base64
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 from fastapi import APIRouter, Depends, Query, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select, desc, func, text, tuple_
 
-from ..database import get_db, JobLog
-from ..auth import get_current_user
+from ..database import get_db, get_session_factory, JobLog
+from ..auth import require_admin
+from ..deps import get_profile_store, get_result_cache
+from ..models import ProfileListResponse
+from ..settings import get_settings
+from ..stats import query_stats
+from ..serialization import ORJSONResponse
 
 router: APIRouter = APIRouter()
 
+def _encode_cursor(job: JobLog) -> str:
+    raw = json.dumps([job.created_at.isoformat(), job.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), row_id
+    except Exception:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid cursor")
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Query timestamps may carry an offset (e.g. ``Z``); the DateTime columns hold naive UTC."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _filter_jobs(query, status_filter: Optional[str], job_type: Optional[str]):
+    if status_filter:
+        query = query.where(JobLog.status == status_filter)
+    if job_type:
+        query = query.where(JobLog.job_type == job_type)
+    return query
+
+async def _count_jobs(db: AsyncSession, status_filter: Optional[str], job_type: Optional[str], estimate: bool) -> int:
+    """
+    Total rows matching the filters.
+    With ``estimate`` on PostgreSQL, reads the planner's row estimate instead of
+    scanning, which stays O(1) on very large tables.
+    """
+    count_query = _filter_jobs(select(func.count()).select_from(JobLog), status_filter, job_type)
+    if estimate and db.bind.dialect.name == "postgresql":
+        rows_query = _filter_jobs(select(JobLog.id), status_filter, job_type)
+        compiled = rows_query.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+        plan = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))).scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    return (await db.execute(count_query)).scalar_one()
+
 @router.get(
     "/admin/jobs",
     status_code=status.HTTP_200_OK,
+    response_class=ORJSONResponse,
     responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "Invalid cursor"},
         status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
+        status.HTTP_403_FORBIDDEN: {"description": "Not the admin API key"},
         status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Database not available"},
     },
 )
 async def list_jobs(
     limit: int = Query(10, ge=1, le=100),
-    offset: int = Query(0, ge=0),
-    status: Optional[str] = Query(None),
+    offset: int = Query(0, ge=0, description="Deprecated: prefer cursor, which stays fast on deep pages"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    status_filter: Optional[str] = Query(None, alias="status"),
     job_type: Optional[str] = Query(None),
-    current_user: Dict[str, Any] = Depends(get_current_user),
+    include_total: bool = Query(True),
+    estimate_total: bool = Query(False, description="Use the planner's row estimate (PostgreSQL only)"),
+    current_user: Dict[str, Any] = Depends(require_admin),
     db: Optional[AsyncSession] = Depends(get_db)
-) -> Dict[str, Any]:
+) -> ORJSONResponse:
     """
     List job logs with optional filtering.
     Admin endpoint for viewing job history and status.
+    Pages are ordered newest first on (created_at, id); pass ``next_cursor``
+    back as ``cursor`` to fetch the next page with an index seek.
     """
     if not db:
         raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Database not available")
 
-    query = select(JobLog)
+    query = _filter_jobs(select(JobLog), status_filter, job_type)
 
-    # Apply filters
-    if status:
-        query = query.where(JobLog.status == status)
-    if job_type:
-        query = query.where(JobLog.job_type == job_type)
-
-    # Order by creation date (newest first)
-    query = query.order_by(desc(JobLog.created_at))
+    # Order by creation date (newest first), id breaks ties
+    query = query.order_by(desc(JobLog.created_at), desc(JobLog.id))
 
     # Apply pagination
-    query = query.offset(offset).limit(limit)
+    if cursor:
+        created_at, row_id = _decode_cursor(cursor)
+        query = query.where(tuple_(JobLog.created_at, JobLog.id) < tuple_(created_at, row_id))
+    else:
+        query = query.offset(offset)
+    query = query.limit(limit + 1)
 
     # Execute query
     result = await db.execute(query)
     jobs = result.scalars().all()
+    has_more = len(jobs) > limit
+    jobs = jobs[:limit]
 
-    # Convert to dict format
-    job_list = []
-    for job in jobs:
-        job_dict = {
+    # Rows go straight to orjson (datetimes included), skipping response_model validation
+    job_list = [
+        {
             "job_id": job.job_id,
             "job_type": job.job_type,
             "filename": job.filename,
@@ -60,16 +119,185 @@ async def list_jobs(
             "source_url": job.source_url,
             "content_type": job.content_type,
             "status": job.status,
-            "created_at": job.created_at.isoformat() if job.created_at else None,
-            "started_at": job.started_at.isoformat() if job.started_at else None,
-            "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "completed_at": job.completed_at,
             "error_message": job.error_message
         }
-        job_list.append(job_dict)
+        for job in jobs
+    ]
 
-    return {
+    total: Optional[int] = None
+    if include_total:
+        total = await _count_jobs(db, status_filter, job_type, estimate_total)
+
+    return ORJSONResponse({
         "jobs": job_list,
-        "total": len(job_list),
+        "total": total,
+        "total_estimated": include_total and estimate_total and db.bind.dialect.name == "postgresql",
         "offset": offset,
-        "limit": limit
-    }
+        "limit": limit,
+        "next_cursor": _encode_cursor(jobs[-1]) if has_more else None,
+    })
+
+EXPORT_COLUMNS = (
+    JobLog.job_id, JobLog.job_type, JobLog.filename, JobLog.s3_key, JobLog.source_url,
+    JobLog.content_type, JobLog.status, JobLog.created_at, JobLog.started_at,
+    JobLog.completed_at, JobLog.error_message,
+)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def _export_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+@router.get(
+    "/admin/jobs/export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {"content": {"application/x-ndjson": {}, "text/csv": {}}},
+        status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
+        status.HTTP_403_FORBIDDEN: {"description": "Not the admin API key"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Database not available"},
+    },
+)
+async def export_jobs(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    job_type: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None, description="created_at >= since"),
+    until: Optional[datetime] = Query(None, description="created_at < until"),
+    current_user: Dict[str, Any] = Depends(require_admin),
+    session_factory: Optional[async_sessionmaker] = Depends(get_session_factory)
+) -> StreamingResponse:
+    """
+    Stream every matching job log as NDJSON or CSV, oldest first.
+    Rows come from a server-side cursor as plain tuples (no ORM objects), so
+    memory stays flat regardless of how many rows are exported.
+    """
+    if not session_factory:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Database not available")
+
+    query = _filter_jobs(select(*EXPORT_COLUMNS), status_filter, job_type)
+    since, until = _naive_utc(since), _naive_utc(until)
+    if since:
+        query = query.where(JobLog.created_at >= since)
+    if until:
+        query = query.where(JobLog.created_at < until)
+    query = query.order_by(JobLog.created_at, JobLog.id).execution_options(yield_per=1000)
+
+    async def stream() -> AsyncIterator[str]:
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_FIELDS)
+            yield buffer.getvalue()
+
+        async with session_factory() as db:
+            result = await db.stream(query)
+            async for rows in result.partitions():
+                if format == "csv":
+                    buffer = io.StringIO()
+                    writer = csv.writer(buffer)
+                    writer.writerows([_export_value(v) for v in row] for row in rows)
+                    yield buffer.getvalue()
+                else:
+                    yield "".join(
+                        json.dumps(dict(zip(EXPORT_FIELDS, map(_export_value, row)))) + "\n"
+                        for row in rows
+                    )
+
+    filename = f"job_logs.{format}"
+    return StreamingResponse(
+        stream(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.get(
+    "/admin/stats",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
+        status.HTTP_403_FORBIDDEN: {"description": "Not the admin API key"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Database not available"},
+    },
+)
+async def job_stats(
+    since: Optional[datetime] = Query(None, description="Defaults to 24 hours before until"),
+    until: Optional[datetime] = Query(None, description="Defaults to now (UTC)"),
+    bucket: str = Query("hour", pattern="^(hour|day)$"),
+    job_type: Optional[str] = Query(None),
+    current_user: Dict[str, Any] = Depends(require_admin),
+    db: Optional[AsyncSession] = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Job counts per status and job type, plus processing-time percentiles
+    (completed_at - started_at), per time bucket.
+    Served from the incrementally maintained job_stats_rollups table, not job_logs.
+    Percentiles are histogram upper bounds, accurate to within 25%.
+    """
+    if not db:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Database not available")
+
+    until = _naive_utc(until) or datetime.utcnow()
+    since = _naive_utc(since) or until - timedelta(hours=24)
+    return await query_stats(db, since, until, bucket, job_type)
+
+@router.get(
+    "/admin/cache",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
+        status.HTTP_403_FORBIDDEN: {"description": "Not the admin API key"},
+    },
+)
+async def cache_stats(
+    current_user: Dict[str, Any] = Depends(require_admin)
+) -> Dict[str, Any]:
+    """Hit/miss counters and size of the terminal job result cache."""
+    return get_result_cache().stats()
+
+@router.get(
+    "/admin/profiles",
+    status_code=status.HTTP_200_OK,
+    response_model=ProfileListResponse,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
+        status.HTTP_403_FORBIDDEN: {"description": "Not the admin API key"},
+    },
+)
+async def list_profiles(
+    current_user: Dict[str, Any] = Depends(require_admin)
+) -> ProfileListResponse:
+    """
+    Recent request profiles, newest first (a bounded ring buffer).
+    Profile a request by sending it with the admin key and ``X-Profile: 1``;
+    its id comes back in the ``X-Profile-Id`` response header.
+    """
+    return ProfileListResponse(enabled=get_settings().profiling_enabled, profiles=get_profile_store().list())
+
+@router.get(
+    "/admin/profiles/{profile_id}",
+    status_code=status.HTTP_200_OK,
+    response_class=PlainTextResponse,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
+        status.HTTP_403_FORBIDDEN: {"description": "Not the admin API key"},
+        status.HTTP_404_NOT_FOUND: {"description": "Unknown profile, or already evicted"},
+    },
+)
+async def get_profile(
+    profile_id: str,
+    current_user: Dict[str, Any] = Depends(require_admin)
+) -> PlainTextResponse:
+    """
+    Collapsed stacks of one profile (``frame;frame;frame count`` per line), for
+    flamegraph.pl, inferno or speedscope. Leaves named ``<await>`` are time the
+    request spent waiting, e.g. on S3, the database or Temporal.
+    """
+    profile = get_profile_store().get(profile_id)
+    if profile is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Profile not found")
+    return PlainTextResponse(profile.collapsed())
@@ -1,8 +1,37 @@
 from typing import Dict
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Response, status
+
+from .. import readiness
+from ..models import ReadinessResponse
+
 router: APIRouter = APIRouter()
 
 @router.get("/healthz", status_code=status.HTTP_200_OK)
 async def health() -> Dict[str, bool]:
     """Health check endpoint - no authentication required."""
     return {"ok": True}
+
+@router.get(
+    "/readyz",
+    response_model=ReadinessResponse,
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "model": ReadinessResponse,
+            "description": "A required dependency is unhealthy, or no check has completed yet",
+        },
+    },
+)
+async def ready(response: Response) -> ReadinessResponse:
+    """
+    Readiness probe for load balancers - no authentication required.
+    Serves the latest background check results; never calls a dependency itself.
+    """
+    if readiness.checker is None:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return ReadinessResponse(ready=False, dependencies={})
+
+    is_ready, dependencies = readiness.checker.snapshot()
+    if not is_ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return ReadinessResponse(ready=is_ready, dependencies=dependencies)
@@ -1,29 +1,230 @@
+import asyncio
+import logging
 import uuid
 import json
 from datetime import timedelta, datetime
-from typing import Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, Depends, status
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator, TYPE_CHECKING
+from urllib.parse import urlsplit
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from temporalio.client import Client
-from temporalio.common import RetryPolicy
+from temporalio.common import RetryPolicy, WorkflowIDReusePolicy
+from temporalio.exceptions import WorkflowAlreadyStartedError
 
-from ..models import FromUploadRequest, FromURLRequest, JobStatus
+from ..models import (
+    FromUploadRequest, FromURLRequest, JobStatus,
+    BatchFromUploadRequest, BatchFromUploadResponse, BatchJobResult,
+    BatchJobStatusRequest, BatchJobStatusResponse,
+)
 from ..settings import get_settings, Settings
-from ..deps import get_s3_client
-from ..auth import get_current_user
+from ..deps import get_async_s3_client, get_http_client, get_idempotency_store, get_rate_limiter, get_result_cache
+from ..cache import TERMINAL_STATUSES
+from ..auth import DEFAULT_CLIENT, get_current_user
+from .. import database, joblog_writer
 from ..database import get_db, JobLog
+from ..watchers import JobWatchRegistry
+from ..stats import apply_rollups, transition_key
+from ..metrics import observe
+from ..url_ingest import URLIngestError, stream_url_to_s3
+from ..preflight import PreflightError, is_missing_object_error, preflight_image
+from ..dedup import content_hash, find_reusable_job
+from ..results import offload_result
+from ..idempotency import IdempotencyStore, derived_job_id, idempotency_scope, request_fingerprint
+from .uploads import EXT_MAP, _new_s3_key
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from temporalio.client import Client
 
 router: APIRouter = APIRouter()
 
+MAX_WAIT_TIMEOUT = 60.0
+
 # This will be set by the main app during startup
-temporal_client: Optional[Client] = None
+temporal_client: Optional["Client"] = None
 
-def set_temporal_client(client: Client) -> None:
+def set_temporal_client(client: "Client") -> None:
     """Set the temporal client instance"""
     global temporal_client
     temporal_client = client
 
+WORKFLOW_RETRY_POLICY = RetryPolicy(
+    initial_interval=timedelta(seconds=1),
+    backoff_coefficient=2.0,
+    maximum_attempts=3,
+)
+
+def _new_job_id() -> str:
+    return f"img-{uuid.uuid4()}"
+
+def _upload_job_values(job_id: str, req: FromUploadRequest, obj_info: Dict[str, Any], s: Settings) -> Dict[str, Any]:
+    """Column values for a JobLog row created from an uploaded S3 object."""
+    return {
+        "job_id": job_id,
+        "job_type": "upload",
+        "filename": req.key.split('/')[-1],
+        "s3_key": req.key,
+        "content_type": obj_info.get('ContentType'),
+        "job_metadata": json.dumps(req.job_metadata) if req.job_metadata else None,
+        "temporal_workflow_id": job_id,
+        "temporal_task_queue": s.temporal_task_queue,
+        "started_at": datetime.utcnow(),
+        "status": "submitted",
+    }
+
+def _upload_workflow_input(
+    job_id: str, key: str, obj_info: Dict[str, Any], s: Settings, image: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    workflow_input = {
+        "job_id": job_id,
+        "bucket": s.s3_bucket_raw,
+        "key": key,
+        "expected_content_type": obj_info.get('ContentType')
+    }
+    if image:
+        # Verified by pre-flight, so workers can skip re-probing the object
+        workflow_input["image"] = image
+    return workflow_input
+
+async def _preflight(s3: Any, key: str, obj_info: Dict[str, Any], s: Settings) -> Optional[Dict[str, Any]]:
+    """Check an uploaded object really is a valid image (None when pre-flight is disabled)."""
+    if not s.image_preflight_enabled:
+        return None
+    return await preflight_image(
+        s3, s.s3_bucket_raw, key, obj_info,
+        head_bytes=s.image_preflight_bytes,
+        max_head_bytes=s.image_preflight_max_bytes,
+        max_pixels=s.image_max_pixels,
+    )
+
+# Returned for idempotent starts whose workflow already exists
+ALREADY_STARTED = object()
+
+IDEMPOTENCY_KEY_REUSED = "Idempotency-Key was already used with a different request body"
+
+async def _start_workflow(job_id: str, workflow_input: Dict[str, Any], s: Settings, idempotent: bool = False) -> None:
+    """
+    Start the processing workflow. Idempotent starts (derived job IDs) may only
+    reuse the ID of a failed run, so a repeat never reprocesses a completed job.
+    """
+    reuse_policy = (
+        WorkflowIDReusePolicy.ALLOW_DUPLICATE_FAILED_ONLY if idempotent else WorkflowIDReusePolicy.ALLOW_DUPLICATE
+    )
+    with observe("temporal", "start_workflow"):
+        await temporal_client.start_workflow(
+            "image_processing_workflow",
+            workflow_input,
+            id=job_id,
+            task_queue=s.temporal_task_queue,
+            retry_policy=WORKFLOW_RETRY_POLICY,
+            id_reuse_policy=reuse_policy,
+        )
+
+async def _reusable_job_status(job_log: JobLog) -> Optional[JobStatus]:
+    """Status to hand back for a duplicate upload, or None if the earlier job can't be reused."""
+    if job_log.status != "completed":
+        # Still in flight: the caller attaches to it and polls its job_id
+        return JobStatus(job_id=job_log.job_id, status=job_log.status)
+    cache = get_result_cache()
+    cached = cache.get(job_log.job_id)
+    if cached is not None:
+        return cached
+    if not temporal_client:
+        return None
+    try:
+        job, _ = await _fetch_job_status(job_log.job_id)
+    except Exception:
+        return None  # Workflow history is gone; process the upload again
+    if job.status != "completed":
+        return None
+    cache.put(job)
+    return job
+
+def _reserve_job_slot(current_user: Dict[str, Any], job_id: str) -> None:
+    """Count ``job_id`` against the client's concurrent-job quota, or fail with 429."""
+    client = current_user["client"]
+    if not get_rate_limiter().start_job(client.name, job_id, client.max_concurrent_jobs):
+        raise HTTPException(
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            f"Concurrent job quota exceeded ({client.max_concurrent_jobs} active jobs)",
+        )
+
+async def _submit_job(
+    db: Optional[AsyncSession], job_values: Dict[str, Any], workflow_input: Dict[str, Any], s: Settings
+) -> JobStatus:
+    """
+    Record the job log row, start the workflow and record the outcome.
+    The caller's concurrent-job slot is released on every path where this
+    request did not start the workflow (failed start, replayed duplicate, DB errors).
+    """
+    job_id: str = job_values["job_id"]
+    job_type: str = job_values["job_type"]
+    idempotent = job_values.get("idempotency_key") is not None
+    writer = joblog_writer.writer
+    started = False
+
+    try:
+        # Create job log entry (if database is available)
+        job_log = None
+        if writer:
+            await writer.insert(job_values)
+        elif db:
+            job_log = JobLog(**job_values)
+
+            db.add(job_log)
+            try:
+                await apply_rollups(db, [transition_key(job_type, "submitted")])
+                await db.commit()
+            except IntegrityError:
+                if not idempotent:
+                    raise
+                # A concurrent duplicate (another instance) already claimed this key and holds its slot
+                await db.rollback()
+                job_log = await _idempotent_job_log(db, job_values["client"], job_values["idempotency_key"])
+                if job_log is None:
+                    raise
+                if job_log.request_hash != job_values["request_hash"]:
+                    raise HTTPException(status.HTTP_422_UNPROCESSABLE_CONTENT, IDEMPOTENCY_KEY_REUSED)
+                return JobStatus(job_id=job_log.job_id, status="started")
+            await db.refresh(job_log)
+
+        try:
+            try:
+                await _start_workflow(job_id, workflow_input, s, idempotent)
+            except WorkflowAlreadyStartedError:
+                # Derived IDs make concurrent duplicates collapse onto one workflow
+                if not idempotent:
+                    raise
+            started = True
+
+            # Update status to started (if database is available)
+            if writer:
+                await writer.update(job_id, {"status": "started"})
+            elif db and job_log:
+                job_log.status = "started"
+                await apply_rollups(db, [transition_key(job_type, "started")])
+                await db.commit()
+
+        except Exception as e:
+            # Update status to failed (if database is available)
+            if writer:
+                await writer.update(job_id, {"status": "failed", "error_message": str(e)})
+            elif db and job_log:
+                job_log.status = "failed"
+                job_log.error_message = str(e)
+                await apply_rollups(db, [transition_key(job_type, "failed")])
+                await db.commit()
+            raise HTTPException(status.HTTP_502_BAD_GATEWAY, f"Failed to start workflow: {str(e)}")
+
+        return JobStatus(job_id=job_id, status="started")
+    finally:
+        if not started:
+            get_rate_limiter().finish_job(job_id)
+
 @router.post(
     "/jobs/from-upload",
     response_model=JobStatus,
@@ -31,105 +232,479 @@ def set_temporal_client(client: Client) -> None:
     responses={
         status.HTTP_400_BAD_REQUEST: {"description": "S3 object not accessible"},
         status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
-        status.HTTP_502_BAD_GATEWAY: {"description": "Temporal workflow could not be started"},
+        status.HTTP_415_UNSUPPORTED_MEDIA_TYPE: {"description": "Object is not a supported image or is mislabeled"},
+        status.HTTP_422_UNPROCESSABLE_CONTENT: {
+            "description": "Image header corrupt or image too large, or Idempotency-Key reused with a different body"
+        },
+        status.HTTP_429_TOO_MANY_REQUESTS: {"description": "Rate limit or concurrent job quota exceeded"},
+        status.HTTP_502_BAD_GATEWAY: {"description": "S3 unavailable or Temporal workflow could not be started"},
         status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Temporal client not initialized"},
     },
 )
 async def start_from_upload(
     req: FromUploadRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=200),
     current_user: Dict[str, Any] = Depends(get_current_user),
     db: Optional[AsyncSession] = Depends(get_db)
 ) -> JobStatus:
-    """Start an image processing job from an uploaded S3 object."""
+    """
+    Start an image processing job from an uploaded S3 object.
+    With dedup enabled, identical content returns the earlier job (its result
+    once completed) instead of starting another workflow.
+
+    Retries that send the same ``Idempotency-Key`` and body get the original
+    response back without touching S3 or Temporal again.
+    """
+    if not idempotency_key:
+        return await _start_upload_job(req, current_user, db, _new_job_id())
+
+    scope = idempotency_scope(current_user["user_id"], idempotency_key)
+    fingerprint = request_fingerprint(req.model_dump_json())
+    store = get_idempotency_store()
+    async with store.lock(scope):
+        job = await _replay_idempotent(store, db, current_user["user_id"], scope, fingerprint)
+        if job is None:
+            job = await _start_upload_job(
+                req, current_user, db, await _idempotent_job_id(db, current_user["user_id"], scope, store.ttl),
+                {"idempotency_key": scope, "request_hash": fingerprint},
+            )
+            store.put(scope, fingerprint, job)
+        return job
+
+async def _replay_idempotent(
+    store: IdempotencyStore, db: Optional[AsyncSession], client: str, scope: str, fingerprint: str
+) -> Optional[JobStatus]:
+    """Original response for a retried request: front cache first, then the job log."""
+    stored = store.get(scope)
+    if stored is None and db is not None:
+        since = datetime.utcnow() - timedelta(seconds=store.ttl)
+        job_log = await _idempotent_job_log(db, client, scope)
+        if job_log is not None and job_log.created_at >= since and job_log.status != "failed":
+            stored = (job_log.request_hash, JobStatus(job_id=job_log.job_id, status="started"))
+            store.put(scope, *stored)
+    if stored is None:
+        return None
+    if stored[0] != fingerprint:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_CONTENT, IDEMPOTENCY_KEY_REUSED)
+    return stored[1]
+
+async def _idempotent_job_log(db: AsyncSession, client: str, scope: str) -> Optional[JobLog]:
+    """The job currently holding an idempotency key (unique per client)."""
+    return (await db.execute(
+        select(JobLog).where(JobLog.client == client, JobLog.idempotency_key == scope)
+    )).scalar_one_or_none()
+
+async def _idempotent_job_id(db: Optional[AsyncSession], client: str, scope: str, ttl: float) -> str:
+    """
+    The key's derived ID for a first attempt. Expired or failed attempts give
+    the key up so it can be claimed again, under a fresh ID since theirs is taken.
+    """
+    job_id = derived_job_id(scope)
+    if db is None:
+        return job_id
+    since = datetime.utcnow() - timedelta(seconds=ttl)
+    await db.execute(
+        update(JobLog)
+        .where(JobLog.client == client, JobLog.idempotency_key == scope)
+        .where(or_(JobLog.created_at < since, JobLog.status == "failed"))
+        .values(idempotency_key=None)
+    )
+    await db.commit()
+    if await _get_job_log(db, job_id) is not None:
+        return _new_job_id()
+    return job_id
+
+async def _start_upload_job(
+    req: FromUploadRequest,
+    current_user: Dict[str, Any],
+    db: Optional[AsyncSession],
+    job_id: str,
+    extra_values: Optional[Dict[str, Any]] = None,
+) -> JobStatus:
     s: Settings = get_settings()
-    s3: Any = get_s3_client()
+    s3 = get_async_s3_client()
 
     # Verify S3 object exists
     try:
-        obj_info = s3.head_object(Bucket=s.s3_bucket_raw, Key=req.key)
-    except Exception:
+        obj_info = await s3.head_object(Bucket=s.s3_bucket_raw, Key=req.key)
+    except Exception as e:
+        if not is_missing_object_error(e):
+            raise HTTPException(status.HTTP_502_BAD_GATEWAY, f"S3 request failed, retry later: {req.key}")
         raise HTTPException(status.HTTP_400_BAD_REQUEST, f"S3 object not found or not accessible: {req.key}")
 
+    # Identical content that was already processed (or is in flight) is not processed again
+    digest: Optional[str] = None
+    if s.dedup_enabled and db is not None:
+        try:
+            digest = await content_hash(
+                s3, s.s3_bucket_raw, req.key, obj_info, s.dedup_hash_source, current_user["user_id"]
+            )
+        except Exception:
+            digest = None
+        if digest:
+            existing = await find_reusable_job(db, digest)
+            reused = await _reusable_job_status(existing) if existing else None
+            if reused is not None:
+                return reused
+
+    # Reject corrupt or mislabeled files before a workflow is spent on them
+    try:
+        image = await _preflight(s3, req.key, obj_info, s)
+    except PreflightError as e:
+        raise HTTPException(e.status_code, e.detail)
+    except Exception:
+        raise HTTPException(status.HTTP_502_BAD_GATEWAY, f"S3 request failed, retry later: {req.key}")
+
     if not temporal_client:
         raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Temporal client not initialized")
 
-    job_id: str = f"img-{uuid.uuid4()}"
+    _reserve_job_slot(current_user, job_id)
 
-    # Extract filename from S3 key
-    filename: str = req.key.split('/')[-1]
+    job_values = _upload_job_values(job_id, req, obj_info, s)
+    job_values["client"] = current_user["user_id"]
+    job_values.update(extra_values or {})
+    if digest:
+        job_values["content_hash"] = digest
+    workflow_input = _upload_workflow_input(job_id, req.key, obj_info, s, image)
+    return await _submit_job(db, job_values, workflow_input, s)
 
-    # Create job log entry (if database is available)
-    job_log = None
-    if db:
-        job_log = JobLog(
-            job_id=job_id,
-            job_type="upload",
-            filename=filename,
-            s3_key=req.key,
-            content_type=obj_info.get('ContentType'),
-            job_metadata=json.dumps(req.job_metadata) if req.job_metadata else None,
-            temporal_workflow_id=job_id,
-            temporal_task_queue=s.temporal_task_queue,
-            started_at=datetime.utcnow(),
-            status="submitted"
-        )
+@router.post(
+    "/jobs/from-upload/batch",
+    response_model=BatchFromUploadResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Temporal client not initialized"},
+    },
+)
+async def start_from_upload_batch(
+    req: BatchFromUploadRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: Optional[AsyncSession] = Depends(get_db)
+) -> BatchFromUploadResponse:
+    """
+    Start image processing jobs for many uploaded S3 objects.
+    HEADs and workflow starts run with bounded concurrency; job logs are written
+    with one multi-row INSERT and one bulk UPDATE. Failures are reported per item.
+    """
+    if not temporal_client:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Temporal client not initialized")
 
-        db.add(job_log)
-        await db.commit()
-        await db.refresh(job_log)
+    results = await submit_upload_batch(req.items, db, current_user["client"])
+    return BatchFromUploadResponse(results=results)
 
-    # Start Temporal workflow
-    workflow_input = {
-        "job_id": job_id,
-        "bucket": s.s3_bucket_raw,
-        "key": req.key,
-        "expected_content_type": obj_info.get('ContentType')
-    }
+async def submit_upload_batch(
+    items: List[FromUploadRequest],
+    db: Optional[AsyncSession],
+    client: Optional[Any] = None,
+    job_ids: Optional[List[str]] = None,
+) -> List[BatchJobResult]:
+    """
+    Shared by the batch endpoint and the ingestion worker. ``client`` is the
+    API client charged for quota (None skips the quota). Pass ``job_ids`` to
+    make resubmission idempotent: rows that already exist are kept and
+    workflows that already started count as started.
+    """
+    s: Settings = get_settings()
+    s3 = get_async_s3_client()
+    writer = joblog_writer.writer
+    quota = get_rate_limiter()
+    idempotent = job_ids is not None
 
-    try:
-        await temporal_client.start_workflow(
-            "image_processing_workflow",
-            workflow_input,
-            id=job_id,
-            task_queue=s.temporal_task_queue,
-            retry_policy=RetryPolicy(
-                initial_interval=timedelta(seconds=1),
-                backoff_coefficient=2.0,
-                maximum_attempts=3,
-            ),
-        )
+    head_limit = asyncio.Semaphore(s.s3_head_concurrency)
+    start_limit = asyncio.Semaphore(s.temporal_start_concurrency)
 
-        # Update status to started (if database is available)
-        if db and job_log:
-            job_log.status = "started"
-            await db.commit()
+    async def inspect(key: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[BatchJobResult]]:
+        """
+        HEAD and pre-flight one object: (obj_info, image, outcome if it can't be submitted).
+        Only a missing/forbidden object or a failed pre-flight is "rejected"; other
+        S3 errors (throttling, timeouts, 5xx) are "failed" so the caller can retry.
+        """
+        async with head_limit:
+            try:
+                obj_info = await s3.head_object(Bucket=s.s3_bucket_raw, Key=key)
+                return obj_info, await _preflight(s3, key, obj_info, s), None
+            except PreflightError as e:
+                return None, None, BatchJobResult(key=key, status="rejected", error=e.detail)
+            except Exception as e:
+                if is_missing_object_error(e):
+                    return None, None, BatchJobResult(
+                        key=key, status="rejected", error=f"S3 object not found or not accessible: {key}"
+                    )
+                return None, None, BatchJobResult(key=key, status="failed", error=f"S3 request failed: {e}")
 
-    except Exception as e:
-        # Update status to failed (if database is available)
-        if db and job_log:
-            job_log.status = "failed"
-            job_log.error_message = str(e)
+    inspected = await asyncio.gather(*(inspect(item.key) for item in items))
+
+    results: List[BatchJobResult] = []
+    accepted: List[tuple] = []  # (result index, item, obj_info, image, row id)
+    rows: List[Dict[str, Any]] = []
+    for index, (item, (obj_info, image, outcome)) in enumerate(zip(items, inspected)):
+        if outcome is not None:
+            results.append(outcome)
+            continue
+        job_id = job_ids[index] if idempotent else _new_job_id()
+        if client is not None and not quota.start_job(client.name, job_id, client.max_concurrent_jobs):
+            results.append(BatchJobResult(
+                key=item.key, status="rejected",
+                error=f"Concurrent job quota exceeded ({client.max_concurrent_jobs} active jobs)",
+            ))
+            continue
+        row_id = str(uuid.uuid4())
+        rows.append({
+            "id": row_id, **_upload_job_values(job_id, item, obj_info, s), "client": client.name if client else None,
+        })
+        accepted.append((len(results), item, obj_info, image, row_id))
+        results.append(BatchJobResult(key=item.key, job_id=job_id, status="submitted"))
+
+    if writer:
+        for row in rows:
+            await writer.insert(row)
+    elif db and rows:
+        if idempotent:
+            # Rows from an earlier delivery of the same items are kept and updated in place
+            existing = dict((await db.execute(
+                select(JobLog.job_id, JobLog.id).where(JobLog.job_id.in_([row["job_id"] for row in rows]))
+            )).all())
+            accepted = [
+                (index, item, obj_info, image, existing.get(results[index].job_id, row_id))
+                for index, item, obj_info, image, row_id in accepted
+            ]
+            rows = [row for row in rows if row["job_id"] not in existing]
+        if rows:
+            await db.execute(insert(JobLog).values(rows))
+            await apply_rollups(db, [transition_key("upload", "submitted") for _ in rows])
             await db.commit()
-        raise HTTPException(status.HTTP_502_BAD_GATEWAY, f"Failed to start workflow: {str(e)}")
 
-    return JobStatus(job_id=job_id, status="started")
+    async def start(
+        index: int, item: FromUploadRequest, obj_info: Dict[str, Any], image: Optional[Dict[str, Any]]
+    ) -> Any:
+        """None on success, ALREADY_STARTED, or the error message."""
+        job_id = results[index].job_id
+        workflow_input = _upload_workflow_input(job_id, item.key, obj_info, s, image)
+        async with start_limit:
+            try:
+                await _start_workflow(job_id, workflow_input, s, idempotent)
+                return None
+            except WorkflowAlreadyStartedError as e:
+                if idempotent:
+                    return ALREADY_STARTED
+                quota.finish_job(job_id)
+                return str(e)
+            except Exception as e:
+                quota.finish_job(job_id)
+                return str(e)
+
+    errors = await asyncio.gather(*(
+        start(index, item, obj_info, image) for index, item, obj_info, image, _ in accepted
+    ))
+
+    status_updates: List[Dict[str, Any]] = []
+    updated_job_ids: List[str] = []
+    for (index, _, _, _, row_id), error in zip(accepted, errors):
+        if error is ALREADY_STARTED:
+            # Started by an earlier delivery; its row already tracks the workflow
+            results[index].status = "started"
+            continue
+        if error is None:
+            results[index].status = "started"
+            status_updates.append({"id": row_id, "status": "started", "error_message": None})
+        else:
+            results[index].status = "failed"
+            results[index].error = f"Failed to start workflow: {error}"
+            status_updates.append({"id": row_id, "status": "failed", "error_message": error})
+        updated_job_ids.append(results[index].job_id)
+
+    if writer:
+        for job_id, update_values in zip(updated_job_ids, status_updates):
+            await writer.update(job_id, {k: v for k, v in update_values.items() if k != "id"})
+    elif db and status_updates:
+        # ORM bulk UPDATE by primary key: one executemany round trip
+        await db.execute(update(JobLog), status_updates)
+        await apply_rollups(db, [transition_key("upload", row["status"]) for row in status_updates])
+        await db.commit()
+
+    return results
+
+# Global cap on concurrent URL downloads, shared by every request
+_url_downloads = asyncio.Semaphore(get_settings().url_ingest_concurrency)
+
+def _url_job_values(job_id: str, req: FromURLRequest, obj_info: Dict[str, Any], s: Settings) -> Dict[str, Any]:
+    """Column values for a JobLog row created by ingesting a URL."""
+    return {
+        "job_id": job_id,
+        "job_type": "url",
+        "filename": req.filename or urlsplit(req.url).path.rsplit('/', 1)[-1] or None,
+        "s3_key": obj_info["Key"],
+        "source_url": req.url,
+        "content_type": obj_info.get('ContentType'),
+        "job_metadata": json.dumps(req.job_metadata) if req.job_metadata else None,
+        "temporal_workflow_id": job_id,
+        "temporal_task_queue": s.temporal_task_queue,
+        "started_at": datetime.utcnow(),
+        "status": "submitted",
+    }
 
 @router.post(
     "/jobs/from-url",
     response_model=JobStatus,
-    status_code=status.HTTP_501_NOT_IMPLEMENTED,
-    responses={status.HTTP_501_NOT_IMPLEMENTED: {"description": "URL ingestion not yet implemented"}},
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "Invalid URL or the source returned an error"},
+        status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
+        status.HTTP_413_CONTENT_TOO_LARGE: {"description": "Image larger than max_upload_size"},
+        status.HTTP_415_UNSUPPORTED_MEDIA_TYPE: {"description": "Source is not an allowed image type"},
+        status.HTTP_429_TOO_MANY_REQUESTS: {"description": "Rate limit or concurrent job quota exceeded"},
+        status.HTTP_502_BAD_GATEWAY: {"description": "Source unreachable or workflow could not be started"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Temporal client not initialized"},
+    },
 )
 async def start_from_url(
     req: FromURLRequest,
     current_user: Dict[str, Any] = Depends(get_current_user),
     db: Optional[AsyncSession] = Depends(get_db)
 ) -> JobStatus:
-    """Start an image processing job from a URL."""
-    raise HTTPException(
-        status_code=501,
-        detail="URL ingestion is not implemented. Use the /jobs/from-upload endpoint instead."
-    )
+    """
+    Start an image processing job from a URL.
+    The image is streamed straight into the raw bucket (multipart for large
+    bodies, bounded memory per download), then processed like an upload.
+    """
+    s: Settings = get_settings()
+
+    if not temporal_client:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Temporal client not initialized")
+
+    job_id: str = _new_job_id()
+    _reserve_job_slot(current_user, job_id)
+
+    try:
+        async with _url_downloads:
+            obj_info = await stream_url_to_s3(
+                get_http_client(),
+                get_async_s3_client(),
+                req.url,
+                bucket=s.s3_bucket_raw,
+                make_key=lambda content_type: _new_s3_key(s.url_ingest_key_prefix, EXT_MAP[content_type]),
+                allowed_types=EXT_MAP,
+                max_bytes=s.max_upload_size,
+                part_size=s.url_ingest_part_size,
+                max_redirects=s.url_ingest_max_redirects,
+            )
+    except URLIngestError as e:
+        get_rate_limiter().finish_job(job_id)
+        raise HTTPException(e.status_code, e.detail)
+    except Exception as e:
+        get_rate_limiter().finish_job(job_id)
+        raise HTTPException(status.HTTP_502_BAD_GATEWAY, f"Failed to store image: {str(e)}")
+
+    job_values = _url_job_values(job_id, req, obj_info, s)
+    job_values["client"] = current_user["user_id"]
+    workflow_input = _upload_workflow_input(job_id, obj_info["Key"], obj_info, s)
+    return await _submit_job(db, job_values, workflow_input, s)
+
+async def _fetch_job_status(job_id: str) -> Tuple[JobStatus, Optional[str]]:
+    """Ask Temporal for a job's state. Returns the status and, for failures, the error message."""
+    handle = temporal_client.get_workflow_handle(job_id)
+    with observe("temporal", "describe"):
+        info = await handle.describe()
+    wf_status: str = info.status.name.lower()
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    offloaded: Dict[str, Any] = {}
+    if wf_status == "completed":
+        with observe("temporal", "result"):
+            result = await handle.result()
+        if get_settings().result_offload_enabled and result is not None:
+            try:
+                offloaded = await offload_result(get_async_s3_client(), job_id, result) or {}
+            except Exception as e:
+                logger.warning(f"Could not offload result of {job_id}, returning it inline: {e}")
+            if offloaded:
+                result = None
+    elif wf_status == "failed":
+        try:
+            # Try to get the failure reason (raising here is expected, not a dependency error)
+            result = await handle.result()
+        except Exception as e:
+            error = str(e)
+
+    if wf_status in TERMINAL_STATUSES:
+        # Frees the owning client's concurrent-job slot
+        get_rate_limiter().finish_job(job_id)
+    return JobStatus(job_id=job_id, status=wf_status, result=result, **offloaded), error
+
+def _status_transition(job: JobStatus, error: Optional[str]) -> Optional[Dict[str, Any]]:
+    """JobLog column changes implied by a Temporal status, or None if nothing to record."""
+    if job.status == "completed":
+        return {"status": "completed", "completed_at": datetime.utcnow()}
+    if job.status == "failed":
+        changes: Dict[str, Any] = {"status": "failed", "completed_at": datetime.utcnow()}
+        if error:
+            changes["error_message"] = error
+        return changes
+    if job.status in ["running", "continued_as_new"]:
+        return {"status": "running"}
+    return None
+
+async def _record_job_status(db: Optional[AsyncSession], job_log: Optional[JobLog], job: JobStatus, error: Optional[str]) -> None:
+    """Mirror a Temporal state change onto the job log row, directly or via the write-behind queue."""
+    changes = _status_transition(job, error)
+    if not changes:
+        return
+    writer = joblog_writer.writer
+    if writer:
+        await writer.update(job.job_id, changes)
+    elif db and job_log and job_log.status != changes["status"]:
+        for column, value in changes.items():
+            setattr(job_log, column, value)
+        await apply_rollups(db, [
+            transition_key(job_log.job_type, job_log.status, job_log.started_at, job_log.completed_at)
+        ])
+        await db.commit()
+
+async def _get_job_log(db: AsyncSession, job_id: str) -> Optional[JobLog]:
+    return (await db.execute(select(JobLog).where(JobLog.job_id == job_id))).scalar_one_or_none()
+
+async def _watch_job_status(job_id: str) -> JobStatus:
+    """Fetch callback for the shared watchers: query Temporal, then update cache and job log."""
+    job, error = await _fetch_job_status(job_id)
+    get_result_cache().put(job)
+
+    if joblog_writer.writer:
+        await _record_job_status(None, None, job, error)
+    elif database.database_enabled and database.AsyncSessionLocal:
+        async with database.AsyncSessionLocal() as db:
+            job_log = await _get_job_log(db, job_id)
+            if job_log:
+                await _record_job_status(db, job_log, job, error)
+    return job
+
+# Long-poll and SSE connections on the same job share one Temporal poller
+watchers = JobWatchRegistry(_watch_job_status, interval=get_settings().job_watch_interval)
+
+def _can_read(current_user: Dict[str, Any], owner: Optional[str]) -> bool:
+    """Jobs are readable by the client that submitted them; the admin client reads every job."""
+    return current_user["user_id"] in (DEFAULT_CLIENT, owner)
+
+async def _check_job_access(job_id: str, current_user: Dict[str, Any], db: Optional[AsyncSession]) -> None:
+    """
+    404 (not 403, so job IDs can't be probed) unless the caller may read the job.
+    Needs the database; a row not flushed yet in write-behind mode is let through.
+    """
+    if db is None or current_user["user_id"] == DEFAULT_CLIENT:
+        return
+    row = (await db.execute(select(JobLog.client).where(JobLog.job_id == job_id))).first()
+    if row is None and joblog_writer.writer:
+        return
+    if row is None or not _can_read(current_user, row.client):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Job not found: {job_id}")
+
+async def _ensure_job_exists(job_id: str, db: Optional[AsyncSession]) -> None:
+    if not temporal_client:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Temporal client not initialized")
+    # In write-behind mode the row may not be flushed yet, so Temporal is the source of truth
+    if db and not joblog_writer.writer and not await _get_job_log(db, job_id):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Job not found: {job_id}")
 
 @router.get(
     "/jobs/{job_id}",
@@ -147,54 +722,241 @@ async def job_status(
     db: Optional[AsyncSession] = Depends(get_db)
 ) -> JobStatus:
     """Get the status and result of a job."""
+    await _check_job_access(job_id, current_user, db)
+    # Terminal states never change, so finished jobs are served from the cache
+    cache = get_result_cache()
+    cached = cache.get(job_id)
+    if cached is not None:
+        return cached
+
     if not temporal_client:
         raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Temporal client not initialized")
 
     # Get job log from database (if available)
     job_log = None
-    if db:
-        job_log = await db.get(JobLog, job_id)
+    if db and not joblog_writer.writer:
+        job_log = await _get_job_log(db, job_id)
         if not job_log:
             raise HTTPException(status.HTTP_404_NOT_FOUND, f"Job not found: {job_id}")
 
     try:
-        handle = temporal_client.get_workflow_handle(job_id)
-        info = await handle.describe()
-        status: str = info.status.name.lower()
-        result: Optional[Dict[str, Any]] = None
-
-        if status == "completed":
-            result = await handle.result()
-            # Update database with completion (if available)
-            if db and job_log and job_log.status != "completed":
-                job_log.status = "completed"
-                job_log.completed_at = datetime.utcnow()
-                await db.commit()
-
-        elif status == "failed":
-            # Update database with failure (if available)
-            if db and job_log and job_log.status != "failed":
-                job_log.status = "failed"
-                job_log.completed_at = datetime.utcnow()
-                try:
-                    # Try to get the failure reason
-                    result = await handle.result()
-                except Exception as e:
-                    job_log.error_message = str(e)
-                await db.commit()
-
-        elif status in ["running", "continued_as_new"]:
-            # Update status if it changed (if database available)
-            if db and job_log and job_log.status != "running":
-                job_log.status = "running"
-                await db.commit()
-
-        return JobStatus(job_id=job_id, status=status, result=result)
+        job, error = await _fetch_job_status(job_id)
+        await _record_job_status(db, job_log, job, error)
+        cache.put(job)
+        return job
 
     except Exception as e:
         # Job might be deleted from Temporal but still in our DB
-        if db and job_log:
+        if joblog_writer.writer:
+            await joblog_writer.writer.update(job_id, {"status": "unknown", "error_message": f"Temporal query failed: {str(e)}"})
+        elif db and job_log:
             job_log.status = "unknown"
             job_log.error_message = f"Temporal query failed: {str(e)}"
             await db.commit()
         raise HTTPException(status.HTTP_404_NOT_FOUND, f"Job not found in Temporal: {job_id}")
+
+async def _visibility_statuses(job_ids: List[str]) -> Dict[str, str]:
+    """Resolve many workflow statuses with a single visibility query."""
+    quoted = ", ".join(f"'{job_id}'" for job_id in job_ids)
+    latest: Dict[str, Any] = {}
+    with observe("temporal", "list_workflows"):
+        async for execution in temporal_client.list_workflows(f"WorkflowId IN ({quoted})", page_size=len(job_ids)):
+            # Reused workflow IDs show up once per run; keep the newest run
+            current = latest.get(execution.id)
+            if current is None or (execution.start_time and current.start_time and execution.start_time > current.start_time):
+                latest[execution.id] = execution
+    return {job_id: execution.status.name.lower() for job_id, execution in latest.items() if execution.status}
+
+@router.post(
+    "/jobs/status:batch",
+    response_model=BatchJobStatusResponse,
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Temporal client not initialized"},
+    },
+)
+async def batch_job_status(
+    req: BatchJobStatusRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: Optional[AsyncSession] = Depends(get_db)
+) -> BatchJobStatusResponse:
+    """
+    Get the status of many jobs at once.
+    Finished jobs come from the result cache, the rest from chunked
+    ``WorkflowId IN (...)`` visibility queries. IDs that visibility does not
+    know about yet (it is eventually consistent) fall back to ``describe``.
+    Unknown jobs, and other clients' jobs, are reported with status ``not_found``.
+    """
+    s: Settings = get_settings()
+    cache = get_result_cache()
+
+    found: Dict[str, JobStatus] = {}
+    job_ids = list(dict.fromkeys(req.job_ids))
+    if db is not None and current_user["user_id"] != DEFAULT_CLIENT:
+        owners = dict((await db.execute(
+            select(JobLog.job_id, JobLog.client).where(JobLog.job_id.in_(job_ids))
+        )).all())
+        for job_id in job_ids:
+            # Rows not flushed yet in write-behind mode are let through, as for single reads
+            missing = job_id not in owners and not joblog_writer.writer
+            if missing or (job_id in owners and not _can_read(current_user, owners[job_id])):
+                found[job_id] = JobStatus(job_id=job_id, status="not_found")
+
+    pending: List[str] = []
+    for job_id in job_ids:
+        if job_id in found:
+            continue
+        cached = cache.get(job_id)
+        if cached is not None:
+            found[job_id] = cached
+        else:
+            pending.append(job_id)
+
+    if pending and not temporal_client:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Temporal client not initialized")
+
+    chunk_size = s.visibility_query_chunk_size
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+
+    async def query(chunk: List[str]) -> Dict[str, str]:
+        try:
+            return await _visibility_statuses(chunk)
+        except Exception:
+            return {}
+
+    visible: Dict[str, str] = {}
+    for statuses in await asyncio.gather(*(query(chunk) for chunk in chunks)):
+        visible.update(statuses)
+
+    describe_limit = asyncio.Semaphore(s.temporal_describe_concurrency)
+
+    async def describe(job_id: str) -> JobStatus:
+        async with describe_limit:
+            try:
+                job, _ = await _fetch_job_status(job_id)
+            except Exception:
+                return JobStatus(job_id=job_id, status="not_found")
+            cache.put(job)
+            return job
+
+    fallback: List[str] = []
+    for job_id in pending:
+        wf_status = visible.get(job_id)
+        if wf_status is None or (req.include_results and wf_status == "completed"):
+            fallback.append(job_id)
+        else:
+            found[job_id] = JobStatus(job_id=job_id, status=wf_status)
+            if wf_status in TERMINAL_STATUSES:
+                get_rate_limiter().finish_job(job_id)
+
+    for job in await asyncio.gather(*(describe(job_id) for job_id in fallback)):
+        found[job.job_id] = job
+
+    return BatchJobStatusResponse(jobs=[found[job_id] for job_id in req.job_ids])
+
+@router.get(
+    "/jobs/{job_id}/wait",
+    response_model=JobStatus,
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
+        status.HTTP_404_NOT_FOUND: {"description": "Job not found"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Temporal client not initialized"},
+    },
+)
+async def wait_for_job(
+    job_id: str,
+    timeout: float = Query(30.0, gt=0, le=MAX_WAIT_TIMEOUT),
+    known_status: Optional[str] = Query(None, alias="status", description="Last status the client saw"),
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: Optional[AsyncSession] = Depends(get_db)
+) -> JobStatus:
+    """
+    Long-poll for a job's status.
+    Returns as soon as the status differs from ``status`` (or from the first
+    observed status if omitted), when the job finishes, or after ``timeout`` seconds.
+    """
+    await _check_job_access(job_id, current_user, db)
+    cached = get_result_cache().get(job_id)
+    if cached is not None:
+        return cached
+    await _ensure_job_exists(job_id, db)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    async with watchers.subscribe(job_id) as watcher:
+        # A freshly started watcher has not polled Temporal yet
+        if watcher.version == 0:
+            await watcher.wait_for_change(0, timeout)
+        if known_status is None and watcher.latest is not None:
+            known_status = watcher.latest.status
+
+        while watcher.latest is not None and watcher.latest.status == known_status and not watcher.done:
+            remaining = deadline - loop.time()
+            if remaining <= 0 or not await watcher.wait_for_change(watcher.version, remaining):
+                break
+
+        if watcher.error is not None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, f"Job not found in Temporal: {job_id}")
+        if watcher.latest is not None:
+            return watcher.latest
+
+    # Timed out before the watcher's first poll finished: ask Temporal once directly
+    try:
+        return await _watch_job_status(job_id)
+    except Exception:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Job not found in Temporal: {job_id}")
+
+@router.get(
+    "/jobs/{job_id}/events",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {"content": {"text/event-stream": {}}, "description": "Stream of JobStatus events"},
+        status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
+        status.HTTP_404_NOT_FOUND: {"description": "Job not found"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Temporal client not initialized"},
+    },
+)
+async def job_events(
+    job_id: str,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: Optional[AsyncSession] = Depends(get_db)
+) -> StreamingResponse:
+    """
+    Server-Sent Events stream of a job's status.
+    Emits a ``status`` event on every change and closes once the job finishes.
+    """
+    await _check_job_access(job_id, current_user, db)
+    cached = get_result_cache().get(job_id)
+    if cached is None:
+        await _ensure_job_exists(job_id, db)
+    keepalive = get_settings().job_events_keepalive_seconds
+
+    async def stream() -> AsyncIterator[str]:
+        if cached is not None:
+            yield f"event: status\ndata: {cached.model_dump_json()}\n\n"
+            return
+
+        async with watchers.subscribe(job_id) as watcher:
+            seen = 0
+            while True:
+                if not await watcher.wait_for_change(seen, keepalive):
+                    yield ": keepalive\n\n"
+                    continue
+                seen = watcher.version
+                if watcher.error is not None:
+                    yield f"event: error\ndata: {json.dumps({'detail': f'Job not found in Temporal: {job_id}'})}\n\n"
+                    return
+                if watcher.latest is not None:
+                    yield f"event: status\ndata: {watcher.latest.model_dump_json()}\n\n"
+                if watcher.done:
+                    return
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
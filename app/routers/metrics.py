@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response, status
+
+from ..metrics import render_metrics
+
+router: APIRouter = APIRouter()
+
+@router.get("/metrics", status_code=status.HTTP_200_OK, include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus scrape endpoint - no authentication required, like /healthz."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -1,21 +1,44 @@
 import time
 import uuid
-from typing import Optional, Dict, Any
-from fastapi import APIRouter, Depends, status
+from typing import Optional, Dict, Any, List
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 
-from ..models import InitUploadRequest, InitUploadResponse
+from ..models import (
+    InitUploadRequest, InitUploadResponse, InitUploadBatchRequest, InitUploadBatchResponse,
+    MultipartInitRequest, MultipartInitResponse, MultipartPartsRequest, MultipartPartsResponse, MultipartPartURL,
+    MultipartCompleteRequest, MultipartCompleteResponse, MultipartAbortRequest,
+)
+from ..multipart import plan_parts
 from ..settings import get_settings, Settings
-from ..deps import get_s3_client
+from ..deps import get_async_s3_client, get_s3_signer
 from ..auth import get_current_user
 
 router: APIRouter = APIRouter()
 
+EXT_MAP: Dict[str, str] = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/heic": ".heic",
+    "image/heif": ".heic",
+}
+
 def _new_s3_key(prefix: Optional[str], ext: str) -> str:
     base = f"{time.strftime('%Y/%m/%d')}/{uuid.uuid4()}"
     if prefix:
         base = f"{prefix.rstrip('/')}/{base}"
     return f"{base}{ext}"
 
+def _post_policy(req: InitUploadRequest) -> tuple:
+    """Return the (fields, conditions) pair for a presigned POST."""
+    conditions: List[Any] = [
+        {"content-type": req.content_type},
+        ["content-length-range", 1, req.max_bytes],
+        {"x-amz-meta-origin": "presigned"},
+    ]
+    fields = {"Content-Type": req.content_type, "x-amz-meta-origin": "presigned"}
+    return fields, conditions
+
 @router.post(
     "/uploads/init",
     response_model=InitUploadResponse,
@@ -25,32 +48,19 @@ def _new_s3_key(prefix: Optional[str], ext: str) -> str:
         status.HTTP_500_INTERNAL_SERVER_ERROR: {"description": "Failed to generate presign URL"},
     },
 )
-def init_upload(
+async def init_upload(
     req: InitUploadRequest,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> InitUploadResponse:
     """Initialize a presigned upload URL for S3."""
     s: Settings = get_settings()
-    s3 = get_s3_client()
-
-    ext_map: Dict[str, str] = {
-        "image/jpeg": ".jpg",
-        "image/png": ".png",
-        "image/webp": ".webp",
-        "image/heic": ".heic",
-        "image/heif": ".heic",
-    }
-    ext: str = ext_map.get(req.content_type, ".bin")
-    key: str = _new_s3_key(req.key_prefix, ext)
+    s3 = get_async_s3_client()
 
-    conditions = [
-        {"content-type": req.content_type},
-        ["content-length-range", 1, req.max_bytes],
-        {"x-amz-meta-origin": "presigned"},
-    ]
-    fields = {"Content-Type": req.content_type, "x-amz-meta-origin": "presigned"}
+    ext: str = EXT_MAP.get(req.content_type, ".bin")
+    key: str = _new_s3_key(req.key_prefix, ext)
+    fields, conditions = _post_policy(req)
 
-    presign = s3.generate_presigned_post(
+    presign = await s3.generate_presigned_post(
         Bucket=s.s3_bucket_raw,
         Key=key,
         Fields=fields,
@@ -58,3 +68,182 @@ def init_upload(
         ExpiresIn=s.presign_expires_seconds,
     )
     return InitUploadResponse(url=presign["url"], fields=presign["fields"], key=key)
+
+@router.post(
+    "/uploads/init-batch",
+    response_model=InitUploadBatchResponse,
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"description": "Failed to generate presign URL"},
+    },
+)
+def init_upload_batch(
+    req: InitUploadBatchRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> InitUploadBatchResponse:
+    """
+    Initialize presigned upload URLs for many files in one round trip.
+    Signs locally with a cached SigV4 signing key instead of going through boto3 per file.
+    """
+    s: Settings = get_settings()
+    signer = get_s3_signer()
+
+    uploads: List[InitUploadResponse] = []
+    for item in req.files:
+        key: str = _new_s3_key(item.key_prefix, EXT_MAP.get(item.content_type, ".bin"))
+        fields, conditions = _post_policy(item)
+        presign = signer.presigned_post(
+            bucket=s.s3_bucket_raw,
+            key=key,
+            fields=fields,
+            conditions=conditions,
+            expires_in=s.presign_expires_seconds,
+        )
+        uploads.append(InitUploadResponse(url=presign["url"], fields=presign["fields"], key=key))
+
+    return InitUploadBatchResponse(uploads=uploads)
+
+def _s3_error(e: Exception, upload_id: str) -> HTTPException:
+    # botocore ClientErrors carry the S3 error code in ``response``
+    code = getattr(e, "response", {}).get("Error", {}).get("Code")
+    if code == "NoSuchUpload":
+        return HTTPException(status.HTTP_404_NOT_FOUND, f"Multipart upload not found: {upload_id}")
+    if code in ("InvalidPart", "InvalidPartOrder", "EntityTooSmall"):
+        return HTTPException(status.HTTP_400_BAD_REQUEST, f"Invalid parts: {e}")
+    return HTTPException(status.HTTP_502_BAD_GATEWAY, f"S3 multipart request failed: {e}")
+
+@router.post(
+    "/uploads/multipart/init",
+    response_model=MultipartInitResponse,
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
+        status.HTTP_413_CONTENT_TOO_LARGE: {"description": "Declared size exceeds the multipart upload limit"},
+        status.HTTP_415_UNSUPPORTED_MEDIA_TYPE: {"description": "Content type is not an allowed image type"},
+        status.HTTP_502_BAD_GATEWAY: {"description": "Failed to create the multipart upload"},
+    },
+)
+async def init_multipart_upload(
+    req: MultipartInitRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> MultipartInitResponse:
+    """
+    Start a multipart upload for a large image. Request part URLs from
+    /uploads/multipart/parts, PUT the parts (in parallel, retrying any that
+    fail), then call /uploads/multipart/complete with each part's ETag.
+    """
+    s: Settings = get_settings()
+    if req.content_type not in EXT_MAP:
+        raise HTTPException(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, f"Unsupported content type: {req.content_type}")
+    if req.size > s.multipart_max_upload_size:
+        raise HTTPException(
+            status.HTTP_413_CONTENT_TOO_LARGE, f"Image exceeds the {s.multipart_max_upload_size} byte limit"
+        )
+
+    key: str = _new_s3_key(req.key_prefix, EXT_MAP[req.content_type])
+    try:
+        part_size, part_count = plan_parts(req.size, req.part_size or s.multipart_part_size)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_413_CONTENT_TOO_LARGE, str(e))
+    try:
+        created = await get_async_s3_client().create_multipart_upload(
+            Bucket=s.s3_bucket_raw, Key=key, ContentType=req.content_type, Metadata={"origin": "presigned"}
+        )
+    except Exception as e:
+        raise HTTPException(status.HTTP_502_BAD_GATEWAY, f"Failed to create multipart upload: {e}")
+    return MultipartInitResponse(key=key, upload_id=created["UploadId"], part_size=part_size, part_count=part_count)
+
+@router.post(
+    "/uploads/multipart/parts",
+    response_model=MultipartPartsResponse,
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
+    },
+)
+def presign_multipart_parts(
+    req: MultipartPartsRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> MultipartPartsResponse:
+    """
+    Presign PUT URLs for a batch of parts. Signed locally with the cached
+    SigV4 key, so this makes no S3 call; ask again for fresh URLs when resuming.
+    """
+    s: Settings = get_settings()
+    signer = get_s3_signer()
+    parts = [
+        MultipartPartURL(
+            part_number=number,
+            url=signer.presigned_url(
+                "PUT", s.s3_bucket_raw, req.key,
+                params={"partNumber": number, "uploadId": req.upload_id},
+                expires_in=s.multipart_part_url_expires_seconds,
+            ),
+        )
+        for number in req.part_numbers
+    ]
+    return MultipartPartsResponse(parts=parts, expires_in=s.multipart_part_url_expires_seconds)
+
+@router.post(
+    "/uploads/multipart/complete",
+    response_model=MultipartCompleteResponse,
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "Parts missing, too small or with mismatched ETags"},
+        status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
+        status.HTTP_404_NOT_FOUND: {"description": "Unknown or already finished upload"},
+        status.HTTP_413_CONTENT_TOO_LARGE: {"description": "Assembled object exceeds the multipart upload limit"},
+        status.HTTP_502_BAD_GATEWAY: {"description": "S3 request failed"},
+    },
+)
+async def complete_multipart_upload(
+    req: MultipartCompleteRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> MultipartCompleteResponse:
+    """Assemble the uploaded parts into the final object, ready for /jobs/from-upload."""
+    s: Settings = get_settings()
+    s3 = get_async_s3_client()
+
+    parts = sorted(req.parts, key=lambda part: part.part_number)
+    if len({part.part_number for part in parts}) != len(parts):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Duplicate part numbers")
+    try:
+        completed = await s3.complete_multipart_upload(
+            Bucket=s.s3_bucket_raw,
+            Key=req.key,
+            UploadId=req.upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": p.part_number, "ETag": p.etag} for p in parts]},
+        )
+        obj_info = await s3.head_object(Bucket=s.s3_bucket_raw, Key=req.key)
+    except Exception as e:
+        raise _s3_error(e, req.upload_id)
+
+    # Part URLs can't bound the body size, so the limit is enforced on the assembled object
+    if obj_info["ContentLength"] > s.multipart_max_upload_size:
+        await s3.delete_object(Bucket=s.s3_bucket_raw, Key=req.key)
+        raise HTTPException(
+            status.HTTP_413_CONTENT_TOO_LARGE, f"Image exceeds the {s.multipart_max_upload_size} byte limit"
+        )
+    return MultipartCompleteResponse(key=req.key, etag=completed["ETag"], size=obj_info["ContentLength"])
+
+@router.post(
+    "/uploads/multipart/abort",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"description": "Missing or invalid API key"},
+        status.HTTP_404_NOT_FOUND: {"description": "Unknown or already finished upload"},
+        status.HTTP_502_BAD_GATEWAY: {"description": "S3 request failed"},
+    },
+)
+async def abort_multipart_upload(
+    req: MultipartAbortRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+) -> Response:
+    """Abandon a multipart upload and free its stored parts."""
+    s: Settings = get_settings()
+    try:
+        await get_async_s3_client().abort_multipart_upload(Bucket=s.s3_bucket_raw, Key=req.key, UploadId=req.upload_id)
+    except Exception as e:
+        raise _s3_error(e, req.upload_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,147 @@
+import gzip
+from typing import Any, Optional, Tuple
+
+import orjson
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # optional: JSON only
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+COMPRESSIBLE_MEDIA_TYPES = ("application/json", "application/x-ndjson", "text/plain", "text/csv") + MSGPACK_MEDIA_TYPES
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, which serializes datetimes, UUIDs and
+    dataclasses natively. For handlers that build plain dicts (routes with a
+    ``response_model`` are already dumped to bytes by pydantic-core).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+def _quality(header: str, token: str) -> float:
+    """q-value the client gave ``token`` in an Accept or Accept-Encoding header (0 if absent)."""
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() != token:
+            continue
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    return float(value)
+                except ValueError:
+                    return 0.0
+        return 1.0
+    return 0.0
+
+class ResponseEncodingMiddleware:
+    """
+    Transcodes complete JSON responses to MessagePack when the client prefers
+    it (``Accept: application/msgpack``) and compresses bodies of at least
+    ``minimum_size`` bytes with brotli or gzip per Accept-Encoding. Streaming
+    responses (SSE, exports) pass through untouched, so they keep flushing
+    per chunk. Pure ASGI, and requests asking for neither cost one header lookup.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 5,
+        brotli_quality: int = 4,
+        compress: bool = True,
+        msgpack_enabled: bool = True,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.compress = compress
+        self.msgpack_enabled = msgpack_enabled and msgpack is not None
+
+    def _encoding(self, accept_encoding: str) -> Optional[str]:
+        if not self.compress or not accept_encoding:
+            return None
+        if brotli is not None and _quality(accept_encoding, "br") > 0:
+            return "br"
+        if _quality(accept_encoding, "gzip") > 0:
+            return "gzip"
+        return None
+
+    def _wants_msgpack(self, accept: str) -> bool:
+        if not self.msgpack_enabled or "msgpack" not in accept:
+            return False
+        preferred = max(_quality(accept, media_type) for media_type in MSGPACK_MEDIA_TYPES)
+        return preferred > 0 and preferred >= _quality(accept, "application/json")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = self._encoding(request_headers.get("accept-encoding", ""))
+        to_msgpack = self._wants_msgpack(request_headers.get("accept", ""))
+        if not encoding and not to_msgpack:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_encoded(message: Message) -> None:
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+            elif message["type"] == "http.response.start":
+                start = message
+            elif message.get("more_body", False):
+                # Streaming response: send as is
+                passthrough = True
+                await send(start)
+                await send(message)
+            else:
+                headers, body = self._encode(start, message.get("body", b""), encoding, to_msgpack)
+                await send({**start, "headers": headers.raw})
+                await send({**message, "body": body})
+
+        await self.app(scope, receive, send_encoded)
+
+    def _encode(self, start: Message, body: bytes, encoding: Optional[str], to_msgpack: bool) -> Tuple[MutableHeaders, bytes]:
+        headers = MutableHeaders(raw=list(start["headers"]))
+        original = body
+        if "content-encoding" in headers:
+            return headers, body
+        media_type = headers.get("content-type", "").partition(";")[0].strip()
+
+        if to_msgpack:
+            headers.add_vary_header("Accept")
+            if media_type == "application/json" and body:
+                try:
+                    body = msgpack.packb(orjson.loads(body))
+                    media_type = headers["content-type"] = "application/msgpack"
+                except (orjson.JSONDecodeError, TypeError, ValueError):
+                    pass
+
+        if encoding and media_type in COMPRESSIBLE_MEDIA_TYPES:
+            headers.add_vary_header("Accept-Encoding")
+            if len(body) >= self.minimum_size:
+                if encoding == "br":
+                    body = brotli.compress(body, quality=self.brotli_quality)
+                else:
+                    body = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+                headers["content-encoding"] = encoding
+
+        if body is not original and "content-length" in headers:
+            headers["content-length"] = str(len(body))
+        return headers, body
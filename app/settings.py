@@ -1,8 +1,15 @@
 import os
 from functools import lru_cache
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import BaseModel, Field
+
+class ApiKeyConfig(BaseModel):
+    """One API client: the SHA-256 hex digest of its key plus optional per-client limits."""
+    key_sha256: str
+    rate_per_second: Optional[float] = Field(default=None, gt=0)
+    burst: Optional[int] = Field(default=None, ge=1)
+    max_concurrent_jobs: Optional[int] = Field(default=None, ge=0)
 
 class Settings(BaseSettings):
     aws_region: str = Field(default="us-west-2")
@@ -13,9 +20,91 @@ class Settings(BaseSettings):
     temporal_target: str = Field(default="localhost:7233")
     temporal_namespace: str = Field(default="default")
     temporal_task_queue: str = Field(default="recipe-process")
+    # The API boots without waiting for Temporal: it connects in the background,
+    # retrying with exponential backoff. Startup waits at most this long for the
+    # first attempt so a healthy Temporal is connected before traffic arrives.
+    temporal_startup_wait_seconds: float = Field(default=2.0)
+    temporal_connect_timeout: float = Field(default=10.0)
+    temporal_reconnect_initial_backoff: float = Field(default=0.5)
+    temporal_reconnect_max_backoff: float = Field(default=30.0)
 
     presign_expires_seconds: int = Field(default=300)
 
+    # Presigned multipart uploads (/uploads/multipart/*) for large images.
+    # Part URLs live longer than single POSTs since parts upload over time.
+    multipart_part_size: int = Field(default=8 * 1024 * 1024, ge=5 * 1024 * 1024, le=5 * 1024 * 1024 * 1024)
+    # At most S3's 5 TiB object limit, which 10,000 parts of at most 5 GiB always cover
+    multipart_max_upload_size: int = Field(default=5 * 1024 * 1024 * 1024, le=5 * 1024 * 1024 * 1024 * 1024)
+    multipart_part_url_expires_seconds: int = Field(default=3600)
+    # Janitor that aborts incomplete uploads older than the max age (0 disables it)
+    multipart_janitor_interval: float = Field(default=3600.0)
+    multipart_max_age_seconds: float = Field(default=24 * 3600)
+
+    # S3 client concurrency: boto3 calls run on a dedicated thread pool so they
+    # never block the event loop. Keep the pool <= max_pool_connections.
+    s3_max_pool_connections: int = Field(default=32)
+    s3_executor_workers: int = Field(default=32)
+
+    # Fan-out limits for batch job submission
+    s3_head_concurrency: int = Field(default=16)
+    temporal_start_concurrency: int = Field(default=32)
+
+    # Bulk status lookups: IDs per visibility query and describe() fallback fan-out
+    visibility_query_chunk_size: int = Field(default=100)
+    temporal_describe_concurrency: int = Field(default=32)
+
+    # Per-route adaptive admission control (see app/admission.py). Routes are
+    # keyed by template, e.g. {"/jobs/from-upload": 32} in ADMISSION_ROUTE_MAX_LIMITS.
+    admission_enabled: bool = Field(default=True)
+    admission_initial_limit: int = Field(default=16)
+    admission_min_limit: int = Field(default=1)
+    admission_max_limit: int = Field(default=64)
+    admission_queue_size: int = Field(default=32)
+    admission_queue_timeout: float = Field(default=1.0)
+    admission_retry_after_seconds: int = Field(default=1)
+    admission_route_max_limits: Dict[str, int] = Field(default_factory=dict)
+    # Health checks, scrapes and long-lived streams are never queued or shed
+    admission_exempt_routes: str = Field(
+        default="/healthz,/readyz,/metrics,/jobs/{job_id}/wait,/jobs/{job_id}/events,/admin/jobs/export"
+    )
+
+    # /jobs/from-url: remote bodies are streamed into S3 in parts of this size
+    # (S3 requires >= 5 MiB for every part but the last)
+    url_ingest_concurrency: int = Field(default=16)
+    url_ingest_part_size: int = Field(default=8 * 1024 * 1024, ge=5 * 1024 * 1024)
+    url_ingest_timeout: float = Field(default=30.0)
+    url_ingest_key_prefix: str = Field(default="url-ingest")
+    # Source URLs may only resolve to public addresses (no loopback, private,
+    # link-local or metadata endpoints); redirects are re-checked per hop
+    url_ingest_allow_private_networks: bool = Field(default=False)
+    url_ingest_max_redirects: int = Field(default=3, ge=0)
+
+    # Pre-flight validation of uploads: ranged GET of the first bytes, magic-byte
+    # sniffing and a lazy Pillow header parse before any workflow starts
+    image_preflight_enabled: bool = Field(default=True)
+    image_preflight_bytes: int = Field(default=16 * 1024)
+    image_preflight_max_bytes: int = Field(default=256 * 1024)
+    image_max_pixels: int = Field(default=100_000_000)
+
+    # Content-addressed dedup for /jobs/from-upload: identical content reuses a
+    # completed or in-flight job. Hash source is "etag" (free) or "sha256" (reads the object).
+    dedup_enabled: bool = Field(default=False)
+    dedup_hash_source: str = Field(default="etag")
+
+    # Idempotency-Key on POST /jobs/from-upload: how long a key replays its
+    # original response, and how many keys the in-memory front cache holds
+    idempotency_ttl_seconds: float = Field(default=24 * 3600)
+    idempotency_cache_max_entries: int = Field(default=100_000)
+
+    # Event-driven ingestion worker (python -m app.ingest): S3 ObjectCreated
+    # notifications from SQS ("sqs") or a local spool directory ("file")
+    ingest_queue_backend: str = Field(default="sqs")
+    ingest_queue_url: Optional[str] = Field(default=None)
+    ingest_spool_dir: str = Field(default="./ingest-spool")
+    ingest_batch_size: int = Field(default=50, ge=1)
+    ingest_wait_seconds: float = Field(default=20.0)
+    ingest_visibility_timeout: float = Field(default=60.0)
+
     api_version: str = Field(default="0.1.0")
     debug: bool = Field(default=False)
     log_level: str = Field(default="INFO")
@@ -25,14 +114,90 @@ class Settings(BaseSettings):
 
     health_check_timeout: int = Field(default=30)
 
+    # /readyz: dependencies are probed in the background every interval; the
+    # instance is ready when every dependency listed in READINESS_REQUIRED
+    # (database, s3, temporal) passed. Unlisted ones are reported only.
+    readiness_check_interval: float = Field(default=5.0, gt=0)
+    readiness_check_timeout: float = Field(default=2.0, gt=0)
+    readiness_required: str = Field(default="database,s3,temporal")
+
+    # Cache of terminal job states/results served by GET /jobs/{job_id}
+    result_cache_backend: str = Field(default="memory")
+    result_cache_max_entries: int = Field(default=10_000)
+    result_cache_max_bytes: int = Field(default=64 * 1024 * 1024)
+
+    # Completed results of at least RESULT_OFFLOAD_MIN_BYTES (as JSON) are stored once
+    # in the processed bucket; statuses then carry a presigned result_url and a
+    # result_summary instead of the inline result
+    result_offload_enabled: bool = Field(default=False)
+    result_offload_min_bytes: int = Field(default=64 * 1024)
+    result_offload_prefix: str = Field(default="job-results")
+    result_url_expires_seconds: int = Field(default=300)
+
+    # Complete responses of at least RESPONSE_COMPRESSION_MIN_BYTES are compressed per
+    # Accept-Encoding (brotli if the `brotli` package is installed, else gzip), and
+    # JSON is sent as MessagePack to clients that ask for it (needs `msgpack`)
+    response_compression_enabled: bool = Field(default=True)
+    response_compression_min_bytes: int = Field(default=1024)
+    response_gzip_level: int = Field(default=5)
+    response_brotli_quality: int = Field(default=4)
+    response_msgpack_enabled: bool = Field(default=True)
+
+    # On-demand profiling: requests from the admin key with an X-Profile header, and a
+    # random fraction of requests per route template, e.g.
+    # PROFILING_ROUTE_SAMPLE_RATES='{"/jobs/{job_id}": 0.01}', are sampled every
+    # PROFILING_SAMPLE_INTERVAL seconds; the last PROFILING_BUFFER_SIZE reports are
+    # kept for GET /admin/profiles. Nothing is installed unless enabled.
+    profiling_enabled: bool = Field(default=False)
+    profiling_sample_interval: float = Field(default=0.005, gt=0)
+    profiling_route_sample_rates: Dict[str, float] = Field(default_factory=dict)
+    profiling_buffer_size: int = Field(default=50, ge=1)
+    profiling_max_concurrent: int = Field(default=2, ge=1)
+
+    # Shared watchers behind /jobs/{job_id}/wait and /jobs/{job_id}/events
+    job_watch_interval: float = Field(default=1.0)
+    job_events_keepalive_seconds: float = Field(default=15.0)
+
     # Authentication
     api_key: str = Field(default="your-secret-api-key-here")
+    # Additional clients as JSON, e.g. API_KEYS='{"acme": {"key_sha256": "...", "rate_per_second": 5}}'.
+    # API_KEY above stays valid as the "admin" client.
+    api_keys: Dict[str, ApiKeyConfig] = Field(default_factory=dict)
 
-    # Database
+    # Per-client limits (defaults for clients that don't override them)
+    rate_limiter_backend: str = Field(default="memory")
+    rate_limit_per_second: float = Field(default=50.0, gt=0)
+    rate_limit_burst: int = Field(default=100, ge=1)
+    max_concurrent_jobs: int = Field(default=500)
+    # Job slots are released when a terminal status is seen, or after this long
+    job_quota_ttl_seconds: float = Field(default=3600.0)
+
+    # Write-behind mode: JobLog inserts/updates are queued and flushed in batches
+    # by a background task instead of being committed on the request path.
+    joblog_write_behind: bool = Field(default=False)
+    joblog_queue_size: int = Field(default=10_000)
+    joblog_flush_batch_size: int = Field(default=500)
+    joblog_flush_interval: float = Field(default=0.5)
+    # Failed flushes are retried with backoff, then dropped (and logged)
+    joblog_flush_max_retries: int = Field(default=10)
+    joblog_flush_max_backoff: float = Field(default=30.0)
+
+    # Database. Tables are not created at startup unless DATABASE_CREATE_TABLES
+    # is set; run `python -m app.database` once per new database instead (it
+    # only creates missing tables; column/index changes are manual, see INFRA.md).
+    database_create_tables: bool = Field(default=False)
     database_url: str = Field(
         default="postgresql+asyncpg://appuser:<sensitive>@photo-dev-dev-pg.cr8uowes62h6.us-west-2.rds.amazonaws.com:5432/photo_worker"
     )
 
+    @property
+    def admission_exempt_routes_list(self) -> List[str]:
+        return [route.strip() for route in self.admission_exempt_routes.split(",") if route.strip()]
+
+    @property
+    def readiness_required_list(self) -> List[str]:
+        return [name.strip() for name in self.readiness_required.split(",") if name.strip()]
+
     @property
     def cors_origins_list(self) -> List[str]:
         if self.cors_origins == "*":
@@ -0,0 +1,152 @@
+import base64
+import hashlib
+import hmac
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+SIGV4_ALGORITHM = "AWS4-HMAC-SHA256"
+SIGV4_TIMESTAMP = "%Y%m%dT%H%M%SZ"
+ISO8601 = "%Y-%m-%dT%H:%M:%SZ"
+# Characters SigV4 leaves unescaped in canonical URIs and query strings
+UNRESERVED = "-_.~"
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+class SigV4Signer:
+    """
+    Minimal SigV4 signer for S3 presigned requests.
+
+    boto3 rebuilds the full HMAC chain (date -> region -> service -> request)
+    for every presign. The derived signing key only depends on the secret key
+    and the UTC date, so we derive it once per day/region/service and reuse it.
+    The output is wire-compatible with botocore's ``S3SigV4PostAuth``.
+    """
+
+    def __init__(self, credentials: Any, region: str, service: str = "s3"):
+        self._credentials = credentials
+        self.region = region
+        self.service = service
+        self._cached_key: Optional[Tuple[Tuple[str, str, str], bytes]] = None
+
+    def _frozen_credentials(self) -> Any:
+        # RefreshableCredentials rotate transparently; a plain Credentials
+        # object also exposes get_frozen_credentials().
+        return self._credentials.get_frozen_credentials()
+
+    def signing_key(self, secret_key: str, access_key: str, datestamp: str) -> bytes:
+        """Return the SigV4 signing key, deriving it only when the day or credentials change."""
+        cache_id = (access_key, secret_key, datestamp)
+        cached = self._cached_key
+        if cached is not None and cached[0] == cache_id:
+            return cached[1]
+
+        k_date = _hmac(f"AWS4{secret_key}".encode("utf-8"), datestamp)
+        k_region = _hmac(k_date, self.region)
+        k_service = _hmac(k_region, self.service)
+        k_signing = _hmac(k_service, "aws4_request")
+
+        self._cached_key = (cache_id, k_signing)
+        return k_signing
+
+    def bucket_host(self, bucket: str) -> str:
+        return f"{bucket}.{self.service}.{self.region}.amazonaws.com"
+
+    def bucket_url(self, bucket: str) -> str:
+        return f"https://{self.bucket_host(bucket)}/"
+
+    def presigned_post(
+        self,
+        bucket: str,
+        key: str,
+        fields: Optional[Dict[str, Any]] = None,
+        conditions: Optional[List[Any]] = None,
+        expires_in: int = 3600,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        Build a presigned POST (url + form fields), equivalent to
+        ``s3.generate_presigned_post``.
+        """
+        creds = self._frozen_credentials()
+        now = now or datetime.now(timezone.utc)
+        datestamp = now.strftime("%Y%m%d")
+        timestamp = now.strftime(SIGV4_TIMESTAMP)
+        credential = f"{creds.access_key}/{datestamp}/{self.region}/{self.service}/aws4_request"
+
+        fields = dict(fields or {})
+        policy_conditions: List[Any] = list(conditions or [])
+        policy_conditions.append({"bucket": bucket})
+        policy_conditions.append({"key": key})
+        fields["key"] = key
+
+        fields["x-amz-algorithm"] = SIGV4_ALGORITHM
+        fields["x-amz-credential"] = credential
+        fields["x-amz-date"] = timestamp
+        policy_conditions.append({"x-amz-algorithm": SIGV4_ALGORITHM})
+        policy_conditions.append({"x-amz-credential": credential})
+        policy_conditions.append({"x-amz-date": timestamp})
+
+        if creds.token is not None:
+            fields["x-amz-security-token"] = creds.token
+            policy_conditions.append({"x-amz-security-token": creds.token})
+
+        policy = {
+            "expiration": (now + timedelta(seconds=expires_in)).strftime(ISO8601),
+            "conditions": policy_conditions,
+        }
+        fields["policy"] = base64.b64encode(json.dumps(policy).encode("utf-8")).decode("utf-8")
+
+        k_signing = self.signing_key(creds.secret_key, creds.access_key, datestamp)
+        fields["x-amz-signature"] = hmac.new(
+            k_signing, fields["policy"].encode("utf-8"), hashlib.sha256
+        ).hexdigest()
+
+        return {"url": self.bucket_url(bucket), "fields": fields}
+
+    def presigned_url(
+        self,
+        method: str,
+        bucket: str,
+        key: str,
+        params: Optional[Dict[str, Any]] = None,
+        expires_in: int = 3600,
+        now: Optional[datetime] = None,
+    ) -> str:
+        """
+        Build a query-string presigned URL (e.g. for UploadPart), equivalent to
+        ``s3.generate_presigned_url``. Only the host header is signed and the
+        payload is unsigned, so the client can send any body.
+        """
+        creds = self._frozen_credentials()
+        now = now or datetime.now(timezone.utc)
+        datestamp = now.strftime("%Y%m%d")
+        timestamp = now.strftime(SIGV4_TIMESTAMP)
+        scope = f"{datestamp}/{self.region}/{self.service}/aws4_request"
+        host = self.bucket_host(bucket)
+        path = "/" + quote(key, safe="/" + UNRESERVED)
+
+        query = {name: str(value) for name, value in (params or {}).items()}
+        query["X-Amz-Algorithm"] = SIGV4_ALGORITHM
+        query["X-Amz-Credential"] = f"{creds.access_key}/{scope}"
+        query["X-Amz-Date"] = timestamp
+        query["X-Amz-Expires"] = str(expires_in)
+        query["X-Amz-SignedHeaders"] = "host"
+        if creds.token is not None:
+            query["X-Amz-Security-Token"] = creds.token
+        canonical_query = "&".join(
+            f"{quote(name, safe=UNRESERVED)}={quote(value, safe=UNRESERVED)}"
+            for name, value in sorted(query.items())
+        )
+
+        canonical_request = "\n".join([method, path, canonical_query, f"host:{host}", "", "host", "UNSIGNED-PAYLOAD"])
+        string_to_sign = "\n".join([
+            SIGV4_ALGORITHM, timestamp, scope, hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+        ])
+        k_signing = self.signing_key(creds.secret_key, creds.access_key, datestamp)
+        signature = hmac.new(k_signing, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+        return f"https://{host}{path}?{canonical_query}&X-Amz-Signature={signature}"
@@ -0,0 +1,152 @@
+import math
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import JobStatsRollup
+
+# Latency histogram: geometric bins growing 25% from 50ms; bin i covers
+# (LATENCY_BASE * LATENCY_GROWTH**(i-1), LATENCY_BASE * LATENCY_GROWTH**i]
+LATENCY_BASE = 0.05
+LATENCY_GROWTH = 1.25
+LATENCY_MAX_BIN = 60  # ~3.5 hours; slower jobs land in the last bin
+NO_LATENCY = -1
+
+PERCENTILES = (50, 95, 99)
+
+# Transitions that are counted; bookkeeping states like "unknown" are not
+ROLLUP_STATUSES = frozenset({"submitted", "started", "running", "completed", "failed"})
+
+RollupKey = Tuple[datetime, str, str, int]
+
+def hour_bucket(at: datetime) -> datetime:
+    return at.replace(minute=0, second=0, microsecond=0)
+
+def latency_bin(seconds: float) -> int:
+    if seconds <= LATENCY_BASE:
+        return 0
+    return min(LATENCY_MAX_BIN, math.ceil(math.log(seconds / LATENCY_BASE, LATENCY_GROWTH)))
+
+def latency_bin_upper(bin_index: int) -> float:
+    return LATENCY_BASE * LATENCY_GROWTH ** bin_index
+
+def transition_key(
+    job_type: str,
+    status: str,
+    started_at: Optional[datetime] = None,
+    completed_at: Optional[datetime] = None,
+    at: Optional[datetime] = None,
+) -> RollupKey:
+    """Rollup row that one status transition increments."""
+    at = at or completed_at or datetime.utcnow()
+    bin_index = NO_LATENCY
+    if completed_at and started_at:
+        bin_index = latency_bin(max(0.0, (completed_at - started_at).total_seconds()))
+    return hour_bucket(at), job_type, status, bin_index
+
+async def apply_rollups(db: AsyncSession, keys: Iterable[RollupKey]) -> None:
+    """
+    Increment rollup counters with one upsert (executemany) statement.
+    The caller commits, so counters move in the same transaction as the job log.
+    """
+    counts = Counter(keys)
+    if not counts:
+        return
+    rows = [
+        {"bucket_start": bucket, "job_type": job_type, "status": status, "latency_bin": bin_index, "count": n}
+        for (bucket, job_type, status, bin_index), n in counts.items()
+    ]
+
+    dialect = db.bind.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(JobStatsRollup)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["bucket_start", "job_type", "status", "latency_bin"],
+            set_={"count": JobStatsRollup.count + stmt.excluded["count"]},
+        )
+        await db.execute(stmt, rows)
+        return
+
+    # Generic fallback: read-modify-write through the ORM
+    for row in rows:
+        key = (row["bucket_start"], row["job_type"], row["status"], row["latency_bin"])
+        existing = await db.get(JobStatsRollup, key)
+        if existing:
+            existing.count += row["count"]
+        else:
+            db.add(JobStatsRollup(**row))
+
+def _percentiles(histogram: Counter) -> Dict[str, Any]:
+    total = sum(histogram.values())
+    summary: Dict[str, Any] = {"count": total}
+    if not total:
+        return summary
+    ordered = sorted(histogram.items())
+    for p in PERCENTILES:
+        threshold = total * p / 100
+        running = 0
+        for bin_index, n in ordered:
+            running += n
+            if running >= threshold:
+                summary[f"p{p}"] = round(latency_bin_upper(bin_index), 3)
+                break
+    return summary
+
+class _Bucket:
+    def __init__(self) -> None:
+        self.counts: Counter = Counter()
+        self.by_job_type: Dict[str, Counter] = {}
+        self.latency: Dict[str, Counter] = {}
+
+    def add(self, job_type: str, status: str, bin_index: int, n: int) -> None:
+        self.counts[status] += n
+        self.by_job_type.setdefault(job_type, Counter())[status] += n
+        if bin_index != NO_LATENCY:
+            self.latency.setdefault(status, Counter())[bin_index] += n
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "counts": dict(self.counts),
+            "by_job_type": {job_type: dict(counts) for job_type, counts in self.by_job_type.items()},
+            "latency_seconds": {status: _percentiles(hist) for status, hist in self.latency.items()},
+        }
+
+async def query_stats(
+    db: AsyncSession,
+    since: datetime,
+    until: datetime,
+    bucket: str,
+    job_type: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Aggregate hourly rollup rows into ``bucket``-sized windows over [since, until)."""
+    query = select(
+        JobStatsRollup.bucket_start, JobStatsRollup.job_type, JobStatsRollup.status,
+        JobStatsRollup.latency_bin, JobStatsRollup.count,
+    ).where(JobStatsRollup.bucket_start >= hour_bucket(since), JobStatsRollup.bucket_start < until)
+    if job_type:
+        query = query.where(JobStatsRollup.job_type == job_type)
+
+    buckets: Dict[datetime, _Bucket] = {}
+    totals = _Bucket()
+    for bucket_start, row_job_type, status, bin_index, n in (await db.execute(query)).all():
+        if bucket == "day":
+            bucket_start = bucket_start.replace(hour=0)
+        buckets.setdefault(bucket_start, _Bucket()).add(row_job_type, status, bin_index, n)
+        totals.add(row_job_type, status, bin_index, n)
+
+    width = timedelta(days=1) if bucket == "day" else timedelta(hours=1)
+    return {
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "bucket": bucket,
+        "totals": totals.as_dict(),
+        "buckets": [
+            {"start": start.isoformat(), "end": (start + width).isoformat(), **buckets[start].as_dict()}
+            for start in sorted(buckets)
+        ],
+    }
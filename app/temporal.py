@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import random
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+class TemporalConnection:
+    """
+    Owns the Temporal client. Connects in a background task, retrying with
+    capped exponential backoff (with jitter) until it succeeds, then hands the
+    client to ``on_connect``. Once connected, the SDK re-establishes dropped
+    connections itself, so the API only has to survive Temporal being down at boot.
+    """
+
+    def __init__(
+        self,
+        target: str,
+        namespace: str,
+        on_connect: Callable[[Any], None],
+        connect_timeout: float,
+        initial_backoff: float,
+        max_backoff: float,
+        connect: Optional[Callable[..., Awaitable[Any]]] = None,
+    ):
+        self.target = target
+        self.namespace = namespace
+        self.on_connect = on_connect
+        self.connect_timeout = connect_timeout
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self._connect = connect
+        self.client: Optional[Any] = None
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self._attempted = asyncio.Event()
+        self._connected = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        return self.client is not None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        connect = self._connect
+        if connect is None:
+            # Deferred: temporalio.client is one of the slowest imports at boot
+            from temporalio.client import Client
+            connect = Client.connect
+
+        delay = self.initial_backoff
+        while self.client is None:
+            self.attempts += 1
+            try:
+                self.client = await asyncio.wait_for(
+                    connect(target_host=self.target, namespace=self.namespace), timeout=self.connect_timeout
+                )
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+                logger.warning(f"Temporal connection attempt {self.attempts} failed, retrying in {delay:.1f}s: {self.last_error}")
+                self._attempted.set()
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+                delay = min(delay * 2, self.max_backoff)
+
+        self.last_error = None
+        self.on_connect(self.client)
+        self._attempted.set()
+        self._connected.set()
+        logger.info(f"Temporal client connected to {self.target} after {self.attempts} attempt(s)")
+
+    async def wait_first_attempt(self, timeout: float) -> bool:
+        """Wait (at most ``timeout``) for the first connection attempt to finish. Returns whether it connected."""
+        try:
+            await asyncio.wait_for(self._attempted.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.connected
+
+    async def wait_connected(self) -> Any:
+        await self._connected.wait()
+        return self.client
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        close = getattr(self.client, "close", None)
+        if close:
+            try:
+                await close()
+            except Exception as e:
+                logger.warning(f"Error closing Temporal client: {e}")
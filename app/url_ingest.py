@@ -0,0 +1,318 @@
+import asyncio
+import ipaddress
+import socket
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Collection, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+import httpcore
+import httpx
+
+from .preflight import sniff_mime
+
+# Bytes buffered before the first S3 write so the body's magic bytes can be checked
+SNIFF_BYTES = 16
+FETCH_FAILED = "Could not fetch source URL"
+
+class URLIngestError(Exception):
+    """A URL could not be ingested; ``status_code`` is the HTTP status to report."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def validate_source_url(url: str) -> None:
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise URLIngestError(400, f"Only absolute http(s) URLs can be ingested: {url}")
+
+class BlockedAddressError(httpcore.ConnectError):
+    """The URL's host resolves only to addresses the service must not connect to."""
+
+def is_public_address(address: str) -> bool:
+    """False for loopback, private, link-local, CGNAT, reserved and multicast addresses."""
+    ip = ipaddress.ip_address(address)
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+class PublicOnlyBackend(httpcore.AsyncNetworkBackend):
+    """
+    Resolves each host itself and connects only to public addresses. The
+    check happens at connect time on the address actually dialed, so DNS
+    rebinding between a check and the connection can't reach internal
+    services, and it applies to every redirect hop. TLS still verifies the
+    certificate against the URL's hostname.
+    """
+
+    def __init__(self, backend: Optional[httpcore.AsyncNetworkBackend] = None):
+        self._backend = backend or httpcore.AnyIOBackend()
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options: Any = None,
+    ) -> httpcore.AsyncNetworkStream:
+        try:
+            infos = await asyncio.wait_for(
+                asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM), timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise httpcore.ConnectError(f"Could not resolve {host}: {e}")
+        addresses = [address for address in dict.fromkeys(info[4][0] for info in infos) if is_public_address(address)]
+        if not addresses:
+            raise BlockedAddressError(f"{host} does not resolve to a public address")
+
+        error: Optional[Exception] = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError as e:
+                error = e
+        raise error
+
+    async def connect_unix_socket(self, path: str, timeout: Optional[float] = None, socket_options: Any = None) -> httpcore.AsyncNetworkStream:
+        raise BlockedAddressError("Unix sockets are not allowed")
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+# httpcore errors and the httpx errors callers catch, most specific first
+_HTTPCORE_ERRORS = (
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+)
+
+@contextmanager
+def _httpx_errors() -> Iterator[None]:
+    try:
+        yield
+    except Exception as e:
+        for core_error, httpx_error in _HTTPCORE_ERRORS:
+            if isinstance(e, core_error):
+                raise httpx_error(str(e)) from e
+        raise
+
+class _ResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream: Any):
+        self._stream = stream
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with _httpx_errors():
+            async for part in self._stream:
+                yield part
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+class PublicOnlyTransport(httpx.AsyncBaseTransport):
+    """
+    An httpx transport over an httpcore pool whose connections go through
+    PublicOnlyBackend. Env proxies are never used, since they would dial
+    the target on our behalf.
+    """
+
+    def __init__(self, max_connections: int, backend: Optional[httpcore.AsyncNetworkBackend] = None):
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(trust_env=False),
+            max_connections=max_connections,
+            network_backend=PublicOnlyBackend(backend),
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _httpx_errors():
+            response = await self._pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._pool.aclose()
+
+class _MultipartWriter:
+    """
+    Uploads fixed-size parts as they fill, keeping at most one part in flight,
+    so memory stays around two parts per download. Bodies that fit in a single
+    part skip multipart entirely and are written with one PutObject.
+    """
+
+    def __init__(self, s3: Any, bucket: str, key: str, content_type: str, part_size: int):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.part_size = part_size
+        self.upload_id: Optional[str] = None
+        self.parts: List[Dict[str, Any]] = []
+        self._buffer = bytearray()
+        self._in_flight: Optional[asyncio.Task] = None
+
+    async def write(self, data: bytes) -> None:
+        self._buffer += data
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            await self._send_part(part)
+
+    async def _send_part(self, body: bytes) -> None:
+        if self.upload_id is None:
+            created = await self.s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type, Metadata={"origin": "url"}
+            )
+            self.upload_id = created["UploadId"]
+        # Wait for the previous part before starting the next: one part uploads while the next one downloads
+        await self._drain()
+        number = len(self.parts) + 1
+        self.parts.append({"PartNumber": number})
+        self._in_flight = asyncio.create_task(self._upload_part(number, body))
+
+    async def _upload_part(self, number: int, body: bytes) -> None:
+        response = await self.s3.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, PartNumber=number, Body=body
+        )
+        self.parts[number - 1]["ETag"] = response["ETag"]
+
+    async def _drain(self) -> None:
+        if self._in_flight is not None:
+            task, self._in_flight = self._in_flight, None
+            await task
+
+    async def complete(self) -> str:
+        """Flush the tail and finish the object. Returns its ETag."""
+        if self.upload_id is None:
+            response = await self.s3.put_object(
+                Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer),
+                ContentType=self.content_type, Metadata={"origin": "url"},
+            )
+            return response["ETag"]
+        if self._buffer:
+            await self._send_part(bytes(self._buffer))
+            self._buffer.clear()
+        await self._drain()
+        response = await self.s3.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, MultipartUpload={"Parts": self.parts}
+        )
+        return response["ETag"]
+
+    async def abort(self) -> None:
+        if self._in_flight is not None:
+            self._in_flight.cancel()
+            await asyncio.gather(self._in_flight, return_exceptions=True)
+            self._in_flight = None
+        if self.upload_id is not None:
+            try:
+                await self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+            except Exception:
+                pass  # An S3 lifecycle rule cleans up anything left behind
+
+async def stream_url_to_s3(
+    http: httpx.AsyncClient,
+    s3: Any,
+    url: str,
+    bucket: str,
+    make_key: Callable[[str], str],
+    allowed_types: Collection[str],
+    max_bytes: int,
+    part_size: int,
+    max_redirects: int = 3,
+) -> Dict[str, Any]:
+    """
+    Stream ``url`` into ``bucket`` without buffering the whole body.
+    Redirects are followed by hand, re-validating each hop, up to
+    ``max_redirects``. The MIME type is checked from the response headers and
+    then from the body's magic bytes before any byte is stored, and the size
+    is enforced as bytes arrive. Returns head_object-style info (Key,
+    ContentType, ContentLength, ETag).
+    """
+    try:
+        response = await _open(http, url, max_redirects)
+        try:
+            if response.status_code >= 400:
+                raise URLIngestError(400, f"Source URL returned HTTP {response.status_code}")
+
+            content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+            if content_type not in allowed_types:
+                raise URLIngestError(415, f"Unsupported content type: {content_type or 'missing'}")
+            declared = response.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                raise URLIngestError(413, f"Image exceeds the {max_bytes} byte limit")
+
+            chunks = response.aiter_bytes()
+            head = b""
+            async for chunk in chunks:
+                head += chunk
+                if len(head) >= SNIFF_BYTES:
+                    break
+            if not head:
+                raise URLIngestError(400, "Source URL returned an empty body")
+            sniffed = sniff_mime(head)
+            if sniffed not in allowed_types:
+                raise URLIngestError(415, f"Body is not a supported image (declared {content_type})")
+
+            key = make_key(sniffed)
+            writer = _MultipartWriter(s3, bucket, key, sniffed, part_size)
+            size = 0
+            try:
+                async for chunk in _prepend(head, chunks):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise URLIngestError(413, f"Image exceeds the {max_bytes} byte limit")
+                    await writer.write(chunk)
+                etag = await writer.complete()
+            except BaseException:
+                await writer.abort()
+                raise
+        finally:
+            await response.aclose()
+    except httpx.HTTPError:
+        # One message for every network failure (blocked address, refused,
+        # timeout, bad TLS), so responses can't be used to map internal hosts
+        raise URLIngestError(502, FETCH_FAILED)
+
+    return {"Key": key, "ContentType": sniffed, "ContentLength": size, "ETag": etag}
+
+async def _open(http: httpx.AsyncClient, url: str, max_redirects: int) -> httpx.Response:
+    """Send the GET, following up to ``max_redirects`` redirects with each hop validated."""
+    for _ in range(max_redirects + 1):
+        validate_source_url(url)
+        response = await http.send(http.build_request("GET", url), stream=True, follow_redirects=False)
+        if not response.is_redirect:
+            return response
+        await response.aclose()
+        url = str(response.url.join(response.headers["location"]))
+    raise URLIngestError(502, FETCH_FAILED)
+
+async def _prepend(head: bytes, chunks: Any) -> Any:
+    yield head
+    async for chunk in chunks:
+        yield chunk
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from .cache import TERMINAL_STATUSES
+from .models import JobStatus
+
+logger = logging.getLogger(__name__)
+
+FetchStatus = Callable[[str], Awaitable[JobStatus]]
+
+class JobWatcher:
+    """
+    Polls a single workflow and fans state changes out to every waiter.
+    ``version`` increases on each observed change; waiters block until it moves.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.latest: Optional[JobStatus] = None
+        self.error: Optional[str] = None
+        self.version = 0
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.error is not None or (self.latest is not None and self.latest.status in TERMINAL_STATUSES)
+
+    def _publish(self) -> None:
+        self.version += 1
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_change(self, version: int, timeout: Optional[float] = None) -> bool:
+        """Wait until the watcher has moved past ``version``. Returns False on timeout."""
+        while self.version <= version and not self.done:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+class JobWatchRegistry:
+    """
+    One watcher task per job, shared by every long-poll and SSE connection on it.
+    The task is started by the first subscriber and cancelled with the last.
+    """
+
+    def __init__(self, fetch: FetchStatus, interval: float):
+        self._fetch = fetch
+        self.interval = interval
+        self._watchers: Dict[str, JobWatcher] = {}
+
+    async def _run(self, watcher: JobWatcher) -> None:
+        while True:
+            try:
+                job = await self._fetch(watcher.job_id)
+            except Exception as e:
+                logger.info(f"Watch on {watcher.job_id} stopped: {e}")
+                watcher.error = str(e)
+                watcher._publish()
+                return
+
+            if watcher.latest is None or job.status != watcher.latest.status:
+                watcher.latest = job
+                watcher._publish()
+            if watcher.done:
+                return
+            await asyncio.sleep(self.interval)
+
+    @asynccontextmanager
+    async def subscribe(self, job_id: str) -> AsyncIterator[JobWatcher]:
+        watcher = self._watchers.get(job_id)
+        if watcher is None:
+            watcher = JobWatcher(job_id)
+            watcher.task = asyncio.create_task(self._run(watcher))
+            self._watchers[job_id] = watcher
+        watcher.subscribers += 1
+        try:
+            yield watcher
+        finally:
+            watcher.subscribers -= 1
+            if watcher.subscribers == 0:
+                self._watchers.pop(job_id, None)
+                watcher.task.cancel()
+
+    def __len__(self) -> int:
+        return len(self._watchers)
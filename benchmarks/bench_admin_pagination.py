@@ -0,0 +1,98 @@
+"""
+Deep-page latency of GET /admin/jobs: OFFSET vs keyset cursor.
+
+Seeds job_logs with N rows (default 1,000,000) and times fetching the page at
+a given depth both ways. Uses a throwaway SQLite file unless BENCH_DATABASE_URL
+points at a PostgreSQL database (the table must not exist yet there).
+
+Usage: python -m benchmarks.bench_admin_pagination [rows] [depth]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import desc, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.main import app
+from app.settings import get_settings
+from app.database import Base, JobLog, get_db
+from app.routers.admin import _encode_cursor
+
+AUTH = {"Authorization": f"Bearer {get_settings().api_key}"}
+SEED_CHUNK = 10_000
+
+async def seed(engine, rows: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    start = datetime(2024, 1, 1)
+    statuses = ["completed", "failed", "running", "started"]
+    async with engine.begin() as conn:
+        for offset in range(0, rows, SEED_CHUNK):
+            chunk = [
+                {
+                    "id": str(uuid.uuid4()), "job_id": f"img-{i}", "job_type": "upload",
+                    "temporal_workflow_id": f"img-{i}", "temporal_task_queue": "bench",
+                    "status": statuses[i % len(statuses)], "created_at": start + timedelta(seconds=i),
+                }
+                for i in range(offset, min(offset + SEED_CHUNK, rows))
+            ]
+            await conn.execute(insert(JobLog), chunk)
+
+async def run(rows: int, depth: int) -> None:
+    url = os.environ.get("BENCH_DATABASE_URL")
+    tmp = None
+    if not url:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        url = f"sqlite+aiosqlite:///{tmp.name}"
+    engine = create_async_engine(url)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    seed_start = time.perf_counter()
+    await seed(engine, rows)
+    print(f"seeded {rows:,} rows in {time.perf_counter() - seed_start:.1f}s ({engine.dialect.name})")
+
+    async def override_get_db():
+        async with sessions() as session:
+            yield session
+    app.dependency_overrides[get_db] = override_get_db
+
+    limit = 100
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def timed(params):
+            start = time.perf_counter()
+            r = await client.get("/admin/jobs", params={"limit": limit, "include_total": False, **params}, headers=AUTH)
+            assert r.status_code == 200, r.text
+            return (time.perf_counter() - start) * 1000, r.json()
+
+        # Cursor for the same page: the last row of the page before it (setup, untimed)
+        async with sessions() as db:
+            query = select(JobLog).order_by(desc(JobLog.created_at), desc(JobLog.id)).offset(depth - 1).limit(1)
+            cursor = _encode_cursor((await db.execute(query)).scalar_one())
+
+        for label, params in (("offset", {"offset": depth}), ("cursor", {"cursor": cursor})):
+            samples = sorted([(await timed(params))[0] for _ in range(5)])
+            print(f"{label:<7} page at depth {depth:>9,}: median {samples[2]:8.2f} ms")
+
+        for label, params in (("exact total", {"include_total": True}),
+                              ("estimated total", {"include_total": True, "estimate_total": True})):
+            samples = sorted([(await timed(params))[0] for _ in range(3)])
+            print(f"{label:<16}: median {samples[1]:8.2f} ms")
+
+    await engine.dispose()
+    if tmp:
+        os.unlink(tmp.name)
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else rows - 1000
+    asyncio.run(run(rows, depth))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Cold start: time from spawning ``uvicorn app.main:app`` to the first served
+request (GET /healthz answering 200). The database is a fresh SQLite file and
+Temporal is either refusing connections ("down") or accepting TCP but never
+answering ("hung", like a blackholed load balancer).
+
+Usage: python -m benchmarks.bench_cold_start [runs] [down|hung] [timeout_s]
+"""
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _hung_server() -> int:
+    """Accept connections and never reply."""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(64)
+    held = []
+
+    def accept() -> None:
+        while True:
+            held.append(server.accept()[0])
+
+    threading.Thread(target=accept, daemon=True).start()
+    return server.getsockname()[1]
+
+def cold_start(temporal_port: int, timeout: float) -> float:
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite+aiosqlite:///{tmp}/cold.db",
+            "TEMPORAL_TARGET": f"127.0.0.1:{temporal_port}",
+            "AWS_ACCESS_KEY_ID": "bench",
+            "AWS_SECRET_ACCESS_KEY": "bench",
+        }
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            with httpx.Client(timeout=0.5) as client:
+                while time.perf_counter() - start < timeout:
+                    try:
+                        if client.get(f"http://127.0.0.1:{port}/healthz").status_code == 200:
+                            return time.perf_counter() - start
+                    except httpx.HTTPError:
+                        pass
+                    time.sleep(0.01)
+            return float("inf")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    mode = sys.argv[2] if len(sys.argv) > 2 else "down"
+    timeout = float(sys.argv[3]) if len(sys.argv) > 3 else 60.0
+    temporal_port = _hung_server() if mode == "hung" else _free_port()
+
+    samples = [cold_start(temporal_port, timeout) for _ in range(runs)]
+    served = [s for s in samples if s != float("inf")]
+    print(f"temporal {mode}: {len(served)}/{runs} started within {timeout:.0f}s")
+    if served:
+        print(f"  first request after  min {min(served) * 1000:7.0f} ms  median {statistics.median(served) * 1000:7.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Per-presign cost: boto3 generate_presigned_post vs the cached-key SigV4Signer.
+
+Usage: python -m benchmarks.bench_presign [iterations]
+"""
+import sys
+import time
+
+import boto3
+from botocore.config import Config
+from botocore.credentials import Credentials
+
+from app.signing import SigV4Signer
+from app.routers.uploads import _new_s3_key, _post_policy
+from app.models import InitUploadRequest
+
+def _bench(label: str, fn, n: int) -> float:
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    per_call_us = (time.perf_counter() - start) / n * 1e6
+    print(f"{label:<28} {per_call_us:8.1f} us/presign")
+    return per_call_us
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    creds = Credentials("AKIDEXAMPLE", "secret")
+    s3 = boto3.client(
+        "s3", region_name="us-west-2", config=Config(signature_version="s3v4"),
+        aws_access_key_id=creds.access_key, aws_secret_access_key=creds.secret_key,
+    )
+    signer = SigV4Signer(creds, region="us-west-2")
+    req = InitUploadRequest(content_type="image/jpeg")
+
+    def boto_presign():
+        fields, conditions = _post_policy(req)
+        s3.generate_presigned_post(
+            Bucket="bench-bucket", Key=_new_s3_key(None, ".jpg"),
+            Fields=fields, Conditions=conditions, ExpiresIn=300,
+        )
+
+    def signer_presign():
+        fields, conditions = _post_policy(req)
+        signer.presigned_post(
+            "bench-bucket", _new_s3_key(None, ".jpg"),
+            fields=fields, conditions=conditions, expires_in=300,
+        )
+
+    boto_us = _bench("boto3 generate_presigned_post", boto_presign, n)
+    signer_us = _bench("SigV4Signer (cached key)", signer_presign, n)
+    print(f"speedup: {boto_us / signer_us:.1f}x")
+
+if __name__ == "__main__":
+    main()
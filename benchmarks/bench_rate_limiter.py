@@ -0,0 +1,54 @@
+"""
+Per-request cost of API key verification and token-bucket rate limiting
+with many distinct keys.
+
+Usage: python -m benchmarks.bench_rate_limiter [keys] [requests]
+"""
+import random
+import secrets
+import sys
+import time
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app import auth
+from app.auth import ApiClient, hash_api_key, verify_api_key
+from app.deps import get_rate_limiter
+from app.ratelimit import InMemoryRateLimiter
+
+def _bench(label: str, fn, args: list) -> float:
+    for arg in args[:1000]:
+        fn(arg)  # warm up
+    start = time.perf_counter()
+    for arg in args:
+        fn(arg)
+    per_call_us = (time.perf_counter() - start) / len(args) * 1e6
+    print(f"{label:<40} {per_call_us:8.2f} us/request")
+    return per_call_us
+
+def main() -> None:
+    n_keys = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    n_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+
+    keys = [secrets.token_urlsafe(32) for _ in range(n_keys)]
+    clients = {}
+    for i, key in enumerate(keys):
+        digest = hash_api_key(key)
+        clients[digest] = ApiClient(f"client-{i}", digest, rate_per_second=1e9, burst=1_000_000, max_concurrent_jobs=100)
+    # Bypass settings: serve the generated clients from the lru_cache'd index
+    auth.get_api_clients = lambda: clients
+
+    rng = random.Random(0)
+    sample = [rng.choice(keys) for _ in range(n_requests)]
+
+    limiter = InMemoryRateLimiter(job_ttl=3600)
+    client_names = [f"client-{rng.randrange(n_keys)}" for _ in range(n_requests)]
+    print(f"{n_keys} keys, {n_requests} requests")
+    _bench("token bucket acquire", lambda name: limiter.acquire(name, 1e9, 1_000_000), client_names)
+
+    get_rate_limiter.cache_clear()
+    credentials = [HTTPAuthorizationCredentials(scheme="Bearer", credentials=key) for key in sample]
+    _bench("verify_api_key (hash + lookup + bucket)", verify_api_key, credentials)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Response serialization: encode time and size of a GET /admin/jobs page and of a
+large JobStatus (a multi-page OCR result), per encoder, plus end-to-end latency
+of /admin/jobs through the app with each Accept / Accept-Encoding combination.
+
+"before" is the previous /admin/jobs path: isoformat() per timestamp, then
+FastAPI's dump of the inferred Dict[str, Any] response model.
+
+Usage: python -m benchmarks.bench_serialization [rows_per_page] [result_blocks]
+"""
+import asyncio
+import gzip
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict
+
+import brotli
+import httpx
+import msgpack
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.main import app
+from app.settings import get_settings
+from app.database import Base, JobLog, get_db
+from app.deps import get_rate_limiter
+from app.models import JobStatus
+
+AUTH = {"Authorization": f"Bearer {get_settings().api_key}"}
+TIMESTAMPS = ("created_at", "started_at", "completed_at")
+
+def timed(fn: Callable[[], bytes], seconds: float = 0.5) -> float:
+    """Median microseconds per call."""
+    fn()
+    samples = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline or len(samples) < 5:
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return sorted(samples)[len(samples) // 2]
+
+def report(label: str, fn: Callable[[], bytes]) -> None:
+    print(f"  {label:<34} {timed(fn):10.1f} us  {len(fn()):>10,} B")
+
+def job_rows(rows: int) -> list:
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            "job_id": f"img-{i}", "job_type": "upload", "filename": f"scan-{i}.jpg", "s3_key": f"uploads/{uuid.uuid4()}.jpg",
+            "source_url": None, "content_type": "image/jpeg", "status": "completed",
+            "created_at": start + timedelta(seconds=i), "started_at": start + timedelta(seconds=i, milliseconds=40),
+            "completed_at": start + timedelta(seconds=i + 3), "error_message": None,
+        }
+        for i in range(rows)
+    ]
+
+def encoders(rows: int, blocks: int) -> None:
+    page_adapter = TypeAdapter(Dict[str, Any])
+    jobs = job_rows(rows)
+    page = {"jobs": jobs, "total": None, "offset": 0, "limit": rows, "next_cursor": "x" * 60}
+
+    def before() -> bytes:
+        iso = [{**job, **{k: job[k].isoformat() for k in TIMESTAMPS}} for job in jobs]
+        return page_adapter.dump_json({**page, "jobs": iso})
+
+    print(f"/admin/jobs page ({rows} rows)")
+    report("before: isoformat + pydantic", before)
+    report("orjson (native datetimes)", lambda: orjson.dumps(page))
+    report("msgpack", lambda: msgpack.packb(orjson.loads(orjson.dumps(page))))
+    body = orjson.dumps(page)
+    report("gzip level 5", lambda: gzip.compress(body, compresslevel=5, mtime=0))
+    report("brotli quality 4", lambda: brotli.compress(body, quality=4))
+
+    job = JobStatus(job_id="img-large", status="completed", result={
+        "text": "lorem ipsum dolor sit amet " * (blocks // 4),
+        "blocks": [{"page": i // 100, "bbox": [i, i + 1, i + 40, i + 12], "text": f"word{i}", "confidence": 0.97} for i in range(blocks)],
+    })
+    status_adapter = TypeAdapter(JobStatus)
+    print(f"JobStatus ({blocks} OCR blocks)")
+    report("pydantic dump_json (route default)", lambda: status_adapter.dump_json(job))
+    report("model_dump + orjson", lambda: orjson.dumps(job.model_dump()))
+    report("model_dump_json", lambda: job.model_dump_json().encode())
+    body = status_adapter.dump_json(job)
+    report("msgpack (transcoded)", lambda: msgpack.packb(orjson.loads(body)))
+    report("gzip level 5", lambda: gzip.compress(body, compresslevel=5, mtime=0))
+    report("brotli quality 4", lambda: brotli.compress(body, quality=4))
+
+async def end_to_end(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(JobLog), [
+                {**job, "id": str(uuid.uuid4()), "temporal_workflow_id": job["job_id"], "temporal_task_queue": "bench"}
+                for job in job_rows(rows)
+            ])
+        sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async def override_get_db():
+            async with sessions() as session:
+                yield session
+        app.dependency_overrides[get_db] = override_get_db
+        # Measure serialization, not the per-key token bucket
+        s = get_settings()
+        s.rate_limit_per_second, s.rate_limit_burst = 1e9, 10**9
+        get_rate_limiter.cache_clear()
+
+        print(f"GET /admin/jobs?limit={rows} end to end (median of 50)")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for label, headers in (
+                ("json", {"Accept-Encoding": "identity"}),
+                ("json + gzip", {"Accept-Encoding": "gzip"}),
+                ("json + br", {"Accept-Encoding": "br"}),
+                ("msgpack", {"Accept": "application/msgpack", "Accept-Encoding": "identity"}),
+            ):
+                samples = []
+                for _ in range(50):
+                    start = time.perf_counter()
+                    r = await client.get("/admin/jobs", params={"limit": rows, "include_total": False}, headers={**AUTH, **headers})
+                    samples.append((time.perf_counter() - start) * 1000)
+                    assert r.status_code == 200, r.text
+                wire = int(r.headers["content-length"])
+                print(f"  {label:<34} {sorted(samples)[25]:10.2f} ms  {wire:>10,} B on the wire")
+        app.dependency_overrides.pop(get_db, None)
+        await engine.dispose()
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    blocks = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    encoders(rows, blocks)
+    asyncio.run(end_to_end(rows))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Dashboard status lookups: N x GET /jobs/{id} vs one POST /jobs/status:batch.
+Runs the app in-process against a fake Temporal client with fixed RPC latency
+and reports wall time and RPC counts for each path.
+
+Usage: python -m benchmarks.bench_status_batch [jobs] [rpc_latency_ms]
+"""
+import asyncio
+import sys
+import time
+
+import httpx
+
+from app.main import app
+from app.settings import get_settings
+from app.deps import get_result_cache
+from app.routers import jobs
+from benchmarks.fakes import FakeTemporalClient
+
+AUTH = {"Authorization": f"Bearer {get_settings().api_key}"}
+
+async def run(n: int, latency: float) -> None:
+    job_ids = [f"img-bench-{i}" for i in range(n)]
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label in ("per-id GET", "status:batch"):
+            temporal = FakeTemporalClient(latency=latency, completes_after=10**9)
+            for job_id in job_ids:
+                temporal.add_workflow(job_id)
+            jobs.set_temporal_client(temporal)
+            get_result_cache.cache_clear()
+
+            start = time.perf_counter()
+            if label == "per-id GET":
+                responses = await asyncio.gather(*(client.get(f"/jobs/{j}", headers=AUTH) for j in job_ids))
+                assert all(r.status_code == 200 for r in responses)
+            else:
+                r = await client.post("/jobs/status:batch", json={"job_ids": job_ids}, headers=AUTH)
+                assert r.status_code == 200 and len(r.json()["jobs"]) == n
+            elapsed = time.perf_counter() - start
+
+            rpcs = sum(temporal.rpcs.values())
+            print(f"{label:<14} {elapsed * 1000:8.1f} ms  {rpcs:5d} RPCs  {dict(temporal.rpcs)}")
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.005
+    asyncio.run(run(n, latency))
+
+if __name__ == "__main__":
+    main()
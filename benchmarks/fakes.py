@@ -0,0 +1,80 @@
+"""
+In-process stand-ins for external services, shared by the benchmarks.
+"""
+import asyncio
+import random
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+from temporalio.client import WorkflowExecutionStatus
+from temporalio.exceptions import WorkflowAlreadyStartedError
+
+class FakeTemporalClient:
+    """
+    Mimics the parts of temporalio.client.Client the API uses.
+    Every RPC sleeps for ``latency`` seconds and fails with probability
+    ``failure_rate``; ``rpcs`` counts calls per method. Workflows complete
+    after ``completes_after`` describe() calls.
+    """
+
+    def __init__(self, latency: float = 0.005, failure_rate: float = 0.0, completes_after: int = 3):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.completes_after = completes_after
+        self.rpcs: Counter = Counter()
+        self.workflows: Dict[str, Dict[str, Any]] = {}
+
+    async def _rpc(self, method: str) -> None:
+        self.rpcs[method] += 1
+        await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise RuntimeError(f"injected {method} failure")
+
+    def _status(self, job_id: str) -> Optional[WorkflowExecutionStatus]:
+        wf = self.workflows.get(job_id)
+        if wf is None:
+            return None
+        if wf["polls"] >= self.completes_after:
+            return WorkflowExecutionStatus.COMPLETED
+        return WorkflowExecutionStatus.RUNNING
+
+    def add_workflow(self, job_id: str, arg: Any = None) -> None:
+        self.workflows[job_id] = {"arg": arg, "polls": 0, "start_time": datetime.now(timezone.utc)}
+
+    async def start_workflow(self, workflow: str, arg: Any, id: str, task_queue: str, **kwargs: Any) -> "FakeHandle":
+        await self._rpc("start_workflow")
+        if id in self.workflows:
+            raise WorkflowAlreadyStartedError(id, workflow)
+        self.add_workflow(id, arg)
+        return FakeHandle(self, id)
+
+    def get_workflow_handle(self, job_id: str) -> "FakeHandle":
+        return FakeHandle(self, job_id)
+
+    async def list_workflows(self, query: str, page_size: int = 1000, **kwargs: Any):
+        await self._rpc("list_workflows")
+        for job_id in re.findall(r"'([^']+)'", query):
+            status = self._status(job_id)
+            if status is not None:
+                self.workflows[job_id]["polls"] += 1
+                yield SimpleNamespace(id=job_id, status=status, start_time=self.workflows[job_id]["start_time"])
+
+class FakeHandle:
+    def __init__(self, client: FakeTemporalClient, job_id: str):
+        self.client = client
+        self.id = job_id
+
+    async def describe(self) -> Any:
+        await self.client._rpc("describe")
+        status = self.client._status(self.id)
+        if status is None:
+            raise RuntimeError(f"workflow not found: {self.id}")
+        self.client.workflows[self.id]["polls"] += 1
+        return SimpleNamespace(status=status)
+
+    async def result(self) -> Dict[str, Any]:
+        await self.client._rpc("result")
+        return {"job_id": self.id, "labels": ["recipe"], "text": "..."}
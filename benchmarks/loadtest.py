@@ -0,0 +1,296 @@
+"""
+End-to-end load test: drives app.main:app in-process (httpx ASGI transport, no
+sockets) against moto S3, the fake Temporal client from benchmarks.fakes and
+SQLite (or PostgreSQL via --database-url), and reports RPS and p50/p95/p99 per
+endpoint.
+
+Virtual users run closed loops picking a weighted action per iteration:
+
+  init    POST /uploads/init
+  submit  POST /jobs/from-upload for an object already in the raw bucket
+  poll    GET /jobs/{job_id} for a job this run submitted
+
+The load generator shares the event loop and CPU with the app, so numbers are
+for comparing builds on the same machine, not for capacity planning.
+
+Results are written as JSON (--output). With --baseline, the run fails (exit
+code 1) if any endpoint's RPS dropped, or its p95/p99 or error rate rose, by
+more than --max-regression compared to that file:
+
+  python -m benchmarks.loadtest --duration 30 --output baseline.json
+  python -m benchmarks.loadtest --duration 30 --output current.json --baseline baseline.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+import boto3
+import httpx
+from moto import mock_aws
+from PIL import Image
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.main import app
+from app.settings import get_settings
+from app.database import Base, get_db, get_session_factory
+from app.deps import get_boto_session, get_s3_client, get_s3_signer, get_async_s3_client, get_rate_limiter, get_result_cache
+from app.routers import jobs
+from benchmarks.fakes import FakeTemporalClient
+
+AUTH = {"Authorization": f"Bearer {get_settings().api_key}"}
+ENDPOINTS = {
+    "init": "POST /uploads/init",
+    "submit": "POST /jobs/from-upload",
+    "poll": "GET /jobs/{job_id}",
+}
+# Compared against the baseline; higher is worse except for rps
+REGRESSION_METRICS = ("rps", "p95_ms", "p99_ms", "error_rate")
+
+@dataclass
+class LoadConfig:
+    duration: float = 30.0
+    warmup: float = 2.0
+    concurrency: int = 32
+    mix: Dict[str, float] = field(default_factory=lambda: {"init": 2, "submit": 1, "poll": 6})
+    objects: int = 50
+    temporal_latency_ms: float = 5.0
+    temporal_failure_rate: float = 0.0
+    completes_after: int = 5
+    database_url: Optional[str] = None
+    seed: int = 0
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """``init=2,submit=1,poll=6`` -> weights per action."""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r} (known: {', '.join(ENDPOINTS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def percentile(sorted_samples: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, round(p / 100 * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+def summarize(latencies: Dict[str, List[float]], statuses: Dict[str, Counter], elapsed: float) -> Dict[str, Dict[str, Any]]:
+    report = {}
+    for endpoint in sorted(statuses):
+        samples = sorted(latencies[endpoint])
+        counts = statuses[endpoint]
+        requests = sum(counts.values())
+        errors = sum(n for code, n in counts.items() if not 200 <= int(code) < 300)
+        report[endpoint] = {
+            "requests": requests,
+            "rps": round(requests / elapsed, 1),
+            "p50_ms": round(percentile(samples, 50), 2),
+            "p95_ms": round(percentile(samples, 95), 2),
+            "p99_ms": round(percentile(samples, 99), 2),
+            "error_rate": round(errors / requests, 4) if requests else 0.0,
+            "statuses": dict(sorted(counts.items())),
+        }
+    return report
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Regressions of ``current`` vs ``baseline`` beyond ``max_regression`` (a fraction), as messages."""
+    regressions = []
+    for endpoint, base in baseline["endpoints"].items():
+        now = current["endpoints"].get(endpoint)
+        if now is None:
+            regressions.append(f"{endpoint}: missing from this run")
+            continue
+        for metric in REGRESSION_METRICS:
+            before, after = base[metric], now[metric]
+            if metric == "rps":
+                worse = after < before * (1 - max_regression)
+            elif metric == "error_rate":
+                # Absolute: going from 0 to 0.1% errors is not a 'regression of infinity'
+                worse = after > before + max_regression / 10
+            else:
+                worse = after > before * (1 + max_regression)
+            if worse:
+                regressions.append(f"{endpoint}: {metric} {before} -> {after}")
+    return regressions
+
+def _jpeg() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (640, 480), (200, 120, 40)).save(buf, "JPEG")
+    return buf.getvalue()
+
+async def _drive(client: httpx.AsyncClient, config: LoadConfig, keys: List[str]) -> Dict[str, Any]:
+    rng = random.Random(config.seed)
+    actions, weights = zip(*config.mix.items())
+    job_ids: List[str] = []
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Counter] = defaultdict(Counter)
+    start = time.perf_counter()
+    measure_from = start + config.warmup
+    deadline = measure_from + config.duration
+
+    async def request(action: str) -> None:
+        if action == "poll" and not job_ids:
+            action = "submit"
+        t0 = time.perf_counter()
+        if action == "init":
+            r = await client.post("/uploads/init", json={"content_type": "image/jpeg", "key_prefix": "load"}, headers=AUTH)
+        elif action == "submit":
+            r = await client.post("/jobs/from-upload", json={"key": rng.choice(keys)}, headers=AUTH)
+            if r.status_code == 202:
+                job_ids.append(r.json()["job_id"])
+        else:
+            r = await client.get(f"/jobs/{rng.choice(job_ids)}", headers=AUTH)
+        t1 = time.perf_counter()
+        if t0 >= measure_from:
+            latencies[ENDPOINTS[action]].append((t1 - t0) * 1000)
+            statuses[ENDPOINTS[action]][str(r.status_code)] += 1
+
+    async def user() -> None:
+        while time.perf_counter() < deadline:
+            await request(rng.choices(actions, weights)[0])
+
+    await asyncio.gather(*(user() for _ in range(config.concurrency)))
+    elapsed = time.perf_counter() - measure_from
+    return {"elapsed_s": round(elapsed, 2), "endpoints": summarize(latencies, statuses, elapsed)}
+
+async def run_load(config: LoadConfig) -> Dict[str, Any]:
+    """
+    Run one load test and return the report. Settings, dependency overrides and
+    the Temporal client are restored afterwards, so this can run inside tests.
+    """
+    s = get_settings()
+    saved = {
+        name: getattr(s, name)
+        for name in ("rate_limit_per_second", "rate_limit_burst", "max_concurrent_jobs")
+    }
+    saved_env = {name: os.environ.get(name) for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY")}
+    saved_temporal = jobs.temporal_client
+    # Load comes from one API key: keep its rate limit and quota out of the way
+    s.rate_limit_per_second, s.rate_limit_burst, s.max_concurrent_jobs = 1e9, 10**9, 10**9
+    os.environ.update({"AWS_ACCESS_KEY_ID": "loadtest", "AWS_SECRET_ACCESS_KEY": "loadtest"})
+    aws_caches = (get_boto_session, get_s3_client, get_s3_signer, get_async_s3_client)
+    caches = aws_caches + (get_rate_limiter, get_result_cache)
+    for cached in caches:
+        cached.cache_clear()
+
+    tmp = None
+    url = config.database_url
+    if not url:
+        tmp = tempfile.TemporaryDirectory()
+        url = f"sqlite+aiosqlite:///{tmp.name}/loadtest.db"
+    engine = create_async_engine(url)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with sessions() as session:
+            yield session
+
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_session_factory] = lambda: sessions
+
+        temporal = FakeTemporalClient(
+            latency=config.temporal_latency_ms / 1000,
+            failure_rate=config.temporal_failure_rate,
+            completes_after=config.completes_after,
+        )
+        jobs.set_temporal_client(temporal)
+
+        with mock_aws():
+            s3 = boto3.client("s3", region_name=s.aws_region)
+            s3.create_bucket(Bucket=s.s3_bucket_raw, CreateBucketConfiguration={"LocationConstraint": s.aws_region})
+            body = _jpeg()
+            keys = [f"load/{i}.jpg" for i in range(config.objects)]
+            for key in keys:
+                s3.put_object(Bucket=s.s3_bucket_raw, Key=key, Body=body, ContentType="image/jpeg")
+
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+                report = await _drive(client, config, keys)
+            if get_async_s3_client.cache_info().currsize:
+                get_async_s3_client().shutdown()
+        report["temporal_rpcs"] = dict(temporal.rpcs)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_session_factory, None)
+        jobs.temporal_client = saved_temporal
+        for name, value in saved.items():
+            setattr(s, name, value)
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        for cached in caches:
+            cached.cache_clear()
+        await engine.dispose()
+        if tmp:
+            tmp.cleanup()
+
+    config_report = asdict(config)
+    config_report["database"] = engine.dialect.name
+    config_report.pop("database_url")
+    return {"config": config_report, **report}
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{report['elapsed_s']}s, {report['config']['concurrency']} users, {report['config']['database']}")
+    print(f"  {'endpoint':<24} {'requests':>9} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for endpoint, r in report["endpoints"].items():
+        print(
+            f"  {endpoint:<24} {r['requests']:>9} {r['rps']:>8.1f} {r['p50_ms']:>8.2f} "
+            f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['error_rate']:>7.2%}"
+        )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0], formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds (after warm-up)")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--concurrency", type=int, default=32, help="virtual users")
+    parser.add_argument("--mix", type=parse_mix, default="init=2,submit=1,poll=6", help="action weights")
+    parser.add_argument("--objects", type=int, default=50, help="images seeded in the raw bucket")
+    parser.add_argument("--temporal-latency-ms", type=float, default=5.0)
+    parser.add_argument("--temporal-failure-rate", type=float, default=0.0)
+    parser.add_argument("--completes-after", type=int, default=5, help="describe() calls until a workflow completes")
+    parser.add_argument("--database-url", default=os.environ.get("LOADTEST_DATABASE_URL"), help="default: throwaway SQLite file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--baseline", help="report JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.15, help="allowed fractional regression")
+    args = parser.parse_args()
+
+    config = LoadConfig(
+        duration=args.duration, warmup=args.warmup, concurrency=args.concurrency, mix=args.mix,
+        objects=args.objects, temporal_latency_ms=args.temporal_latency_ms,
+        temporal_failure_rate=args.temporal_failure_rate, completes_after=args.completes_after,
+        database_url=args.database_url, seed=args.seed,
+    )
+    report = asyncio.run(run_load(config))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.max_regression:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ Generate a secure API key for the photo-api.
 Run this script to generate a new API key for production use Only one client (self) so this is fine fo rnow.
 """
 
+import hashlib
 import secrets
 
 def generate_api_key() -> str:
@@ -14,5 +15,7 @@ if __name__ == "__main__":
     api_key = generate_api_key()
     print("Generated secure API key:")
     print(f"API_KEY={api_key}")
+    print("\nTo register it as an additional client instead, add its digest to API_KEYS:")
+    print(f'API_KEYS={{"<client-name>": {{"key_sha256": "{hashlib.sha256(api_key.encode()).hexdigest()}"}}}}')
     print("\nAdd this to your .env file or environment variables.")
     print("Keep this key secure and don't commit it to version control!")
\ No newline at end of file
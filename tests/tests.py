@@ -1,8 +1,1415 @@
+import asyncio
+import base64
+import hashlib
+import http.server
+import io
+import threading
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+import boto3
+import botocore.auth
+import botocore.signers
+from botocore.config import Config
+from botocore.credentials import Credentials
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+from moto import mock_aws
+from PIL import Image
 from fastapi.testclient import TestClient
+import httpx
+import pytest
+from sqlalchemy import event, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
 from app.main import app
+from app.settings import get_settings
+from app.deps import get_boto_session, get_s3_client, get_s3_signer, get_result_cache, get_rate_limiter, get_async_s3_client, get_http_client, get_idempotency_store, AsyncS3Client
+from app.auth import get_api_clients, hash_api_key
+from app.settings import ApiKeyConfig
+from app.cache import InMemoryResultCache
+from app.models import JobStatus
+from app.signing import SigV4Signer
+from app.metrics import REGISTRY, instrument_engine
+from app.admission import AdaptiveLimiter, AdmissionControlMiddleware
+from app.routers import jobs
+from app import joblog_writer, url_ingest
+from app.database import Base, JobLog, JobStatsRollup, get_db, get_session_factory
+
+AUTH = {"Authorization": f"Bearer {get_settings().api_key}"}
+
+def _reset_aws(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
+    for cached in (get_boto_session, get_s3_client, get_s3_signer):
+        cached.cache_clear()
+
+def _image_bytes(fmt, size=(64, 48)):
+    buf = io.BytesIO()
+    Image.new("RGB", size).save(buf, fmt)
+    return buf.getvalue()
+
+JPEG = _image_bytes("JPEG")
+
+class SlowS3:
+    """
+    Stub boto3 client whose calls block like a slow S3 endpoint. Objects are
+    small JPEGs, except keys starting with "missing" (404) and those in ``bodies``.
+    """
+    def __init__(self, delay: float, bodies=None):
+        self.delay = delay
+        self.bodies = bodies or {}
+        self.ranges = []
+
+    def head_object(self, Bucket, Key):
+        time.sleep(self.delay)
+        if Key.startswith("missing"):
+            raise ClientError({"Error": {"Code": "404"}, "ResponseMetadata": {"HTTPStatusCode": 404}}, "HeadObject")
+        content_type, body = self.bodies.get(Key, ("image/jpeg", JPEG))
+        return {"ContentType": content_type, "ContentLength": len(body), "ETag": '"abc"'}
+
+    def get_object(self, Bucket, Key, Range=None):
+        self.ranges.append((Key, Range))
+        _, body = self.bodies.get(Key, ("image/jpeg", JPEG))
+        if Range:
+            start, end = Range.removeprefix("bytes=").split("-")
+            body = body[int(start):int(end) + 1]
+        return {"Body": StreamingBody(io.BytesIO(body), len(body))}
+
+class FakeHandle:
+    def __init__(self, client, job_id):
+        self.client = client
+        self.id = job_id
+
+    async def describe(self):
+        self.client.calls += 1
+        if self.id in self.client.missing:
+            raise RuntimeError("workflow not found")
+        status = self.client.statuses.get(self.id, "RUNNING")
+        return SimpleNamespace(status=SimpleNamespace(name=status))
+
+    async def result(self):
+        self.client.calls += 1
+        return self.client.results.get(self.id, {"ok": True})
+
+class FakeTemporal:
+    """In-process stand-in for temporalio.client.Client."""
+    def __init__(self):
+        self.calls = 0
+        self.started = []
+        self.statuses = {}
+        self.results = {}
+        self.fail_keys = set()
+        self.missing = set()
+        self.queries = []
+
+    async def start_workflow(self, workflow, arg, id, task_queue, **kwargs):
+        self.calls += 1
+        if arg.get("key") in self.fail_keys:
+            raise RuntimeError("temporal unavailable")
+        self.started.append(id)
+        return FakeHandle(self, id)
+
+    def get_workflow_handle(self, job_id):
+        return FakeHandle(self, job_id)
+
+    async def list_workflows(self, query, page_size=1000):
+        """Visibility only knows about jobs with an explicit status."""
+        self.calls += 1
+        self.queries.append(query)
+        for job_id, status in self.statuses.items():
+            if f"'{job_id}'" in query:
+                yield SimpleNamespace(id=job_id, status=SimpleNamespace(name=status), start_time=None)
+
+@pytest.fixture(autouse=True)
+def fresh_result_cache():
+    for cached in (get_result_cache, get_rate_limiter, get_api_clients, get_idempotency_store):
+        cached.cache_clear()
+    yield
+    for cached in (get_result_cache, get_rate_limiter, get_api_clients, get_idempotency_store):
+        cached.cache_clear()
+
+@pytest.fixture
+def sqlite_db():
+    """Point get_db at an in-memory SQLite database; yields (engine, statements)."""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    asyncio.run(create())
+
+    async def override_get_db():
+        async with sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: sessions
+    statements.clear()
+    yield engine, statements, sessions
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_session_factory, None)
+
+def _run_db(sessions, fn):
+    async def run():
+        async with sessions() as session:
+            return await fn(session)
+    return asyncio.run(run())
+
+def _p99(samples):
+    return sorted(samples)[max(0, int(len(samples) * 0.99) - 1)]
 
 def test_health():
     client = TestClient(app)
     r = client.get('/healthz')
     assert r.status_code == 200
-    assert r.json().get('ok') is True
\ No newline at end of file
+    assert r.json().get('ok') is True
+
+def test_signer_matches_botocore_presigned_post():
+    now = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    creds = Credentials("AKIDEXAMPLE", "secret", "session-token")
+    s3 = boto3.client(
+        "s3", region_name="us-west-2", config=Config(signature_version="s3v4"),
+        aws_access_key_id=creds.access_key, aws_secret_access_key=creds.secret_key,
+        aws_session_token=creds.token,
+    )
+    conditions = [{"content-type": "image/jpeg"}]
+    with mock.patch.object(botocore.signers, "get_current_datetime", return_value=now.replace(tzinfo=None)), \
+         mock.patch.object(botocore.auth, "get_current_datetime", return_value=now.replace(tzinfo=None)):
+        expected = s3.generate_presigned_post(
+            "bkt", "a/b.jpg", Fields={"Content-Type": "image/jpeg"}, Conditions=list(conditions), ExpiresIn=300
+        )
+
+    signer = SigV4Signer(creds, region="us-west-2")
+    actual = signer.presigned_post(
+        "bkt", "a/b.jpg", fields={"Content-Type": "image/jpeg"}, conditions=conditions, expires_in=300, now=now
+    )
+    assert actual["fields"] == expected["fields"]
+
+def test_signer_matches_botocore_presigned_url():
+    now = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    creds = Credentials("AKIDEXAMPLE", "secret", "session-token")
+    s3 = boto3.client(
+        "s3", region_name="us-west-2", endpoint_url="https://s3.us-west-2.amazonaws.com",
+        config=Config(signature_version="s3v4", s3={"addressing_style": "virtual"}),
+        aws_access_key_id=creds.access_key, aws_secret_access_key=creds.secret_key,
+        aws_session_token=creds.token,
+    )
+    params = {"Bucket": "bkt", "Key": "a/b c+d.jpg", "UploadId": "up/1=", "PartNumber": 7}
+    with mock.patch.object(botocore.auth, "get_current_datetime", return_value=now.replace(tzinfo=None)):
+        expected = s3.generate_presigned_url("upload_part", Params=params, ExpiresIn=300)
+
+    signer = SigV4Signer(creds, region="us-west-2")
+    actual = signer.presigned_url("PUT", "bkt", "a/b c+d.jpg", {"partNumber": 7, "uploadId": "up/1="}, 300, now)
+    expected_parts, actual_parts = httpx.URL(expected), httpx.URL(actual)
+    assert actual_parts.raw_path.split(b"?")[0] == expected_parts.raw_path.split(b"?")[0]
+    assert dict(actual_parts.params) == dict(expected_parts.params)
+
+def test_init_upload_batch(monkeypatch):
+    _reset_aws(monkeypatch)
+    client = TestClient(app)
+    files = [{"content_type": "image/jpeg"}, {"content_type": "image/png", "key_prefix": "m"}]
+    r = client.post("/uploads/init-batch", json={"files": files}, headers=AUTH)
+    assert r.status_code == 200
+    uploads = r.json()["uploads"]
+    assert len(uploads) == 2
+    assert len({u["key"] for u in uploads}) == 2
+    assert uploads[1]["key"].startswith("m/") and uploads[1]["key"].endswith(".png")
+    policy = json.loads(base64.b64decode(uploads[0]["fields"]["policy"]))
+    assert {"key": uploads[0]["key"]} in policy["conditions"]
+
+
+def test_slow_s3_does_not_stall_event_loop(monkeypatch):
+    s3 = AsyncS3Client(SlowS3(delay=0.3), max_workers=4)
+    monkeypatch.setattr(jobs, "get_async_s3_client", lambda: s3)
+    monkeypatch.setattr(jobs, "temporal_client", FakeTemporal())
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def timed(path):
+                start = time.perf_counter()
+                r = await client.get(path, headers=AUTH)
+                assert r.status_code == 200
+                return time.perf_counter() - start
+
+            async def probe(path):
+                samples = []
+                for _ in range(20):
+                    samples.append(await timed(path))
+                    await asyncio.sleep(0.01)
+                return samples
+
+            uploads = [client.post("/jobs/from-upload", json={"key": f"k{i}"}, headers=AUTH) for i in range(8)]
+            results = await asyncio.gather(probe("/healthz"), probe("/jobs/img-1"), *uploads)
+            assert all(r.status_code == 202 for r in results[2:])
+            return results[0], results[1]
+
+    health, job = asyncio.run(run())
+    s3.shutdown()
+    # Each HEAD takes 300ms; if they ran on the loop, probes would see that.
+    assert _p99(health) < 0.1
+    assert _p99(job) < 0.1
+
+def test_batch_from_upload_reports_per_item(monkeypatch, sqlite_db):
+    _, statements, sessions = sqlite_db
+    temporal = FakeTemporal()
+    temporal.fail_keys = {"bad.jpg"}
+    monkeypatch.setattr(jobs, "get_async_s3_client", lambda: AsyncS3Client(SlowS3(delay=0), max_workers=2))
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+
+    client = TestClient(app)
+    items = [{"key": "a.jpg"}, {"key": "missing.jpg"}, {"key": "bad.jpg"}, {"key": "b.jpg"}]
+    r = client.post("/jobs/from-upload/batch", json={"items": items}, headers=AUTH)
+    assert r.status_code == 202
+    results = r.json()["results"]
+    assert [x["status"] for x in results] == ["started", "rejected", "failed", "started"]
+    assert results[1]["job_id"] is None
+
+    inserts = [st for st in statements if st.lstrip().upper().startswith("INSERT INTO JOB_LOGS")]
+    assert len(inserts) == 1
+
+    rows = _run_db(sessions, lambda db: db.execute(select(JobLog.s3_key, JobLog.status)))
+    assert dict(rows.all()) == {"a.jpg": "started", "bad.jpg": "failed", "b.jpg": "started"}
+
+def test_terminal_job_status_served_from_cache(monkeypatch):
+    temporal = FakeTemporal()
+    temporal.statuses["img-done"] = "COMPLETED"
+    temporal.results["img-done"] = {"text": "hello"}
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+
+    client = TestClient(app)
+    first = client.get("/jobs/img-done", headers=AUTH).json()
+    calls = temporal.calls
+    second = client.get("/jobs/img-done", headers=AUTH).json()
+    assert first == second == {"job_id": "img-done", "status": "completed", "result": {"text": "hello"}}
+    assert temporal.calls == calls
+
+    client.get("/jobs/img-running", headers=AUTH)
+    client.get("/jobs/img-running", headers=AUTH)
+    stats = client.get("/admin/cache", headers=AUTH).json()
+    assert stats["hits"] == 1 and stats["misses"] == 3 and stats["entries"] == 1
+
+def test_result_cache_lru_eviction_by_bytes():
+    job = lambda i: JobStatus(job_id=f"j{i}", status="completed", result={"pad": "x" * 100})
+    size = len(job(0).model_dump_json())
+    cache = InMemoryResultCache(max_entries=10, max_bytes=size * 2)
+    cache.put(job(0))
+    cache.put(job(1))
+    cache.get("j0")  # j1 becomes least recently used
+    cache.put(job(2))
+    assert cache.get("j1") is None
+    assert cache.get("j0") is not None and cache.get("j2") is not None
+    cache.put(JobStatus(job_id="r", status="running"))
+    assert cache.get("r") is None
+
+def test_long_poll_waiters_share_one_watcher(monkeypatch):
+    temporal = FakeTemporal()
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+    monkeypatch.setattr(jobs.watchers, "interval", 0.05)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def finish():
+                await asyncio.sleep(0.3)
+                temporal.statuses["img-w"] = "COMPLETED"
+
+            waits = [
+                client.get("/jobs/img-w/wait", params={"timeout": 5, "status": "running"}, headers=AUTH)
+                for _ in range(10)
+            ]
+            return await asyncio.gather(finish(), *waits)
+
+    _, *responses = asyncio.run(run())
+    assert all(r.json()["status"] == "completed" for r in responses)
+    # ~6 polls of a single watcher plus one result() call, not one loop per waiter
+    assert temporal.calls < 15
+    assert len(jobs.watchers) == 0
+
+def test_long_poll_timeout_before_first_poll_is_not_a_404(monkeypatch):
+    class SlowDescribeTemporal(FakeTemporal):
+        def get_workflow_handle(self, job_id):
+            handle = FakeHandle(self, job_id)
+            describe = handle.describe
+
+            async def slow_describe():
+                await asyncio.sleep(0.5)
+                return await describe()
+            handle.describe = slow_describe
+            return handle
+
+    temporal = SlowDescribeTemporal()
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/jobs/img-slow/wait", params={"timeout": 0.1}, headers=AUTH)
+
+    r = asyncio.run(run())
+    assert r.status_code == 200 and r.json()["status"] == "running"
+    assert len(jobs.watchers) == 0
+
+def test_job_events_stream_until_terminal(monkeypatch):
+    temporal = FakeTemporal()
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+    monkeypatch.setattr(jobs.watchers, "interval", 0.05)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def fail():
+                await asyncio.sleep(0.2)
+                temporal.statuses["img-e"] = "FAILED"
+
+            _, r = await asyncio.gather(fail(), client.get("/jobs/img-e/events", headers=AUTH))
+            return r
+
+    r = asyncio.run(run())
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = [json.loads(line[len("data: "):]) for line in r.text.splitlines() if line.startswith("data: ")]
+    assert [e["status"] for e in events] == ["running", "failed"]
+
+def test_batch_status_uses_visibility_with_describe_fallback(monkeypatch):
+    temporal = FakeTemporal()
+    temporal.statuses = {"img-a": "RUNNING", "img-b": "COMPLETED"}
+    temporal.missing = {"img-gone"}
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+    get_result_cache().put(JobStatus(job_id="img-c", status="failed"))
+
+    client = TestClient(app)
+    ids = ["img-a", "img-b", "img-c", "img-new", "img-gone"]
+    r = client.post("/jobs/status:batch", json={"job_ids": ids}, headers=AUTH)
+    assert r.status_code == 200
+    assert [j["status"] for j in r.json()["jobs"]] == ["running", "completed", "failed", "running", "not_found"]
+    assert len(temporal.queries) == 1 and "img-c" not in temporal.queries[0]
+    # one visibility query + describe for img-new and img-gone
+    assert temporal.calls == 3
+
+    bad = client.post("/jobs/status:batch", json={"job_ids": ["x') OR ('1"]}, headers=AUTH)
+    assert bad.status_code == 422
+
+def test_write_behind_batches_job_log_writes(monkeypatch, sqlite_db):
+    _, statements, sessions = sqlite_db
+    monkeypatch.setattr(jobs, "get_async_s3_client", lambda: AsyncS3Client(SlowS3(delay=0), max_workers=2))
+    monkeypatch.setattr(jobs, "temporal_client", FakeTemporal())
+
+    async def run():
+        joblog_writer.start_writer(sessions, batch_size=100, flush_interval=60, max_queue=100)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(
+                client.post("/jobs/from-upload", json={"key": f"k{i}.jpg"}, headers=AUTH) for i in range(20)
+            ))
+            assert all(r.status_code == 202 for r in responses)
+            # Nothing has touched the database on the request path
+            statements_before_flush = list(statements)
+            await joblog_writer.stop_writer()
+
+        async with sessions() as db:
+            rollups = dict((await db.execute(select(JobStatsRollup.status, JobStatsRollup.count))).all())
+            return statements_before_flush, (await db.execute(select(JobLog.status))).scalars().all(), rollups
+
+    before_flush, statuses, rollups = asyncio.run(run())
+    assert before_flush == []
+    assert statuses == ["started"] * 20
+    assert rollups == {"submitted": 20, "started": 20}
+    # insert + started update folded into one multi-row INSERT
+    job_log_writes = [st for st in statements if st.startswith(("INSERT INTO job_logs", "UPDATE job_logs"))]
+    assert len(job_log_writes) == 1
+
+def test_write_behind_retries_failed_flush_then_drops_explicitly(sqlite_db):
+    _, _, sessions = sqlite_db
+    failures = {"left": 2}
+
+    def flaky_sessions():
+        if failures["left"]:
+            failures["left"] -= 1
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        return sessions()
+
+    job = {"job_id": "img-1", "job_type": "upload", "temporal_workflow_id": "img-1", "temporal_task_queue": "q", "status": "submitted"}
+
+    async def run():
+        writer = joblog_writer.JobLogWriter(flaky_sessions, 10, 0.01, 10, max_retries=5, initial_backoff=0.01)
+        writer.start()
+        await writer.insert(job)
+        await writer.close()
+        async with sessions() as db:
+            statuses = (await db.execute(select(JobLog.status))).scalars().all()
+
+        # A database that never recovers: the batch is dropped and its jobs forgotten
+        failures["left"] = 10**6
+        writer = joblog_writer.JobLogWriter(flaky_sessions, 10, 0.01, 10, max_retries=1, initial_backoff=0.01)
+        writer.start()
+        await writer.update("img-1", {"status": "started"})
+        while writer.dropped == 0:
+            await asyncio.sleep(0.01)
+        await writer.update("img-1", {"status": "started"})
+        pending_after_drop = writer.pending
+        await writer.close()
+        return statuses, writer.dropped, pending_after_drop
+
+    statuses, dropped, pending_after_drop = asyncio.run(run())
+    assert statuses == ["submitted"]
+    assert dropped == 2
+    # The same status is enqueued again instead of being skipped as already written
+    assert pending_after_drop == 1
+
+def _seed_jobs(sessions, n, **overrides):
+    base = datetime(2025, 1, 1)
+    rows = [
+        {
+            "job_id": f"img-{i}", "job_type": "upload", "temporal_workflow_id": f"img-{i}",
+            "temporal_task_queue": "q", "status": "completed" if i % 2 else "failed",
+            # pairs of rows share a timestamp so the id tie-breaker matters
+            "created_at": base + timedelta(minutes=i // 2), **overrides,
+        }
+        for i in range(n)
+    ]
+
+    async def insert_rows(db):
+        await db.execute(insert(JobLog), rows)
+        await db.commit()
+    _run_db(sessions, insert_rows)
+
+def test_admin_jobs_keyset_pagination(sqlite_db):
+    _, _, sessions = sqlite_db
+    _seed_jobs(sessions, 25)
+    client = TestClient(app)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/admin/jobs", params=params, headers=AUTH).json()
+        assert page["total"] == 25
+        seen += [job["job_id"] for job in page["jobs"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 25
+
+    filtered = client.get("/admin/jobs", params={"status": "failed", "limit": 100}, headers=AUTH).json()
+    assert filtered["total"] == 13 and filtered["next_cursor"] is None
+    assert client.get("/admin/jobs", params={"cursor": "nope"}, headers=AUTH).status_code == 400
+
+def test_admin_jobs_export_streams_ndjson_and_csv(sqlite_db):
+    _, _, sessions = sqlite_db
+    _seed_jobs(sessions, 2500)
+    client = TestClient(app)
+
+    params = {"status": "failed", "since": "2025-01-01T01:00:00", "until": "2025-01-01T02:00:00"}
+    r = client.get("/admin/jobs/export", params=params, headers=AUTH)
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    # 60 minutes x 2 rows per minute, half of them failed
+    assert len(rows) == 60
+    assert all(row["status"] == "failed" for row in rows)
+    assert rows[0]["created_at"] == "2025-01-01T01:00:00"
+    # Offset-aware bounds are compared as UTC
+    aware = {**params, "since": "2025-01-01T02:00:00+01:00", "until": "2025-01-01T02:00:00Z"}
+    assert client.get("/admin/jobs/export", params=aware, headers=AUTH).text == r.text
+
+    r = client.get("/admin/jobs/export", params={"format": "csv"}, headers=AUTH)
+    lines = r.text.splitlines()
+    assert lines[0].startswith("job_id,job_type,")
+    assert len(lines) == 2501
+
+def test_responses_compressed_and_negotiated_as_msgpack(sqlite_db):
+    import msgpack
+    _, _, sessions = sqlite_db
+    _seed_jobs(sessions, 50)
+    client = TestClient(app)
+    params = {"limit": 50}
+
+    plain = client.get("/admin/jobs", params=params, headers={**AUTH, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    page = plain.json()
+    assert page["jobs"][-1]["created_at"] == "2025-01-01T00:00:00"
+    for encoding in ("gzip", "br"):
+        r = client.get("/admin/jobs", params=params, headers={**AUTH, "Accept-Encoding": encoding})
+        assert r.headers["content-encoding"] == encoding and "Accept-Encoding" in r.headers["vary"]
+        assert int(r.headers["content-length"]) < len(plain.content) / 4
+        assert r.json() == page
+    assert "content-encoding" not in client.get("/healthz", headers={"Accept-Encoding": "gzip"}).headers
+
+    packed = client.get("/admin/jobs", params=params, headers={**AUTH, "Accept": "application/msgpack"})
+    assert packed.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(packed.content) == page
+    error = client.get("/admin/jobs", params={"cursor": "nope"}, headers={**AUTH, "Accept": "application/msgpack"})
+    assert msgpack.unpackb(error.content) == {"detail": "Invalid cursor"}
+    prefers_json = client.get("/healthz", headers={"Accept": "application/json, application/msgpack;q=0.5"})
+    assert prefers_json.headers["content-type"] == "application/json"
+
+    # Streams are left alone so they keep flushing per chunk
+    export = client.get("/admin/jobs/export", headers={**AUTH, "Accept-Encoding": "gzip"})
+    assert "content-encoding" not in export.headers and len(export.text.splitlines()) == 50
+
+def test_admin_stats_from_incremental_rollups(monkeypatch, sqlite_db):
+    _, statements, sessions = sqlite_db
+    temporal = FakeTemporal()
+    monkeypatch.setattr(jobs, "get_async_s3_client", lambda: AsyncS3Client(SlowS3(delay=0), max_workers=2))
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+    client = TestClient(app)
+
+    items = [{"key": f"k{i}.jpg"} for i in range(4)]
+    job_ids = [r["job_id"] for r in client.post("/jobs/from-upload/batch", json={"items": items}, headers=AUTH).json()["results"]]
+    for job_id in job_ids[:3]:
+        temporal.statuses[job_id] = "COMPLETED"
+    temporal.statuses[job_ids[3]] = "FAILED"
+    for job_id in job_ids:
+        client.get(f"/jobs/{job_id}", headers=AUTH)
+
+    statements.clear()
+    stats = client.get("/admin/stats", headers=AUTH).json()
+    assert not any("job_logs" in st for st in statements)
+    assert stats["totals"]["counts"] == {"submitted": 4, "started": 4, "completed": 3, "failed": 1}
+    assert stats["totals"]["by_job_type"]["upload"]["completed"] == 3
+    latency = stats["totals"]["latency_seconds"]["completed"]
+    assert latency["count"] == 3 and latency["p50"] <= 1.0
+    assert len(stats["buckets"]) == 1
+
+    day = client.get("/admin/stats", params={"bucket": "day"}, headers=AUTH).json()
+    assert day["totals"] == stats["totals"]
+    until = (datetime.utcnow() + timedelta(minutes=5)).isoformat() + "Z"
+    aware = client.get("/admin/stats", params={"until": until}, headers=AUTH)
+    assert aware.status_code == 200 and aware.json()["totals"] == stats["totals"]
+
+def test_metrics_endpoint_reports_routes_and_dependencies(monkeypatch, sqlite_db):
+    engine, _, _ = sqlite_db
+    instrument_engine(engine)
+    temporal = FakeTemporal()
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+    monkeypatch.setattr(jobs, "get_async_s3_client", lambda: AsyncS3Client(SlowS3(delay=0), max_workers=1))
+
+    s3_errors = {"dependency": "s3", "operation": "head_object"}
+    errors_before = REGISTRY.get_sample_value("dependency_errors_total", s3_errors) or 0
+
+    client = TestClient(app)
+    client.get("/jobs/img-m1", headers=AUTH)
+    client.post("/jobs/from-upload", json={"key": "missing.jpg"}, headers=AUTH)
+    client.get("/admin/jobs", headers=AUTH)
+
+    body = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/jobs/{job_id}",status="404"}' in body
+    assert 'dependency_call_duration_seconds_count{dependency="temporal",operation="describe"}' in body
+    assert REGISTRY.get_sample_value("dependency_errors_total", s3_errors) == errors_before + 1
+    assert 'dependency_call_duration_seconds_count{dependency="db",operation="select"}' in body
+    assert "db_pool_acquire_seconds_count" in body
+
+def test_admission_control_sheds_before_dependencies():
+    from fastapi import Depends, FastAPI
+
+    sessions_opened = 0
+    release = asyncio.Event()
+
+    async def fake_db():
+        nonlocal sessions_opened
+        sessions_opened += 1
+        yield None
+
+    mini = FastAPI()
+    mini.add_middleware(
+        AdmissionControlMiddleware, initial_limit=1, max_limit=1, max_queue=1,
+        queue_timeout=5.0, retry_after=3, exempt_routes=["/healthz"],
+    )
+
+    @mini.post("/jobs/from-upload")
+    async def slow(db=Depends(fake_db)):
+        await release.wait()
+        return {"ok": True}
+
+    @mini.get("/healthz")
+    async def healthz():
+        return {"status": "ok"}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=mini)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            running = asyncio.create_task(client.post("/jobs/from-upload"))
+            queued = asyncio.create_task(client.post("/jobs/from-upload"))
+            await asyncio.sleep(0.05)
+
+            shed = await client.post("/jobs/from-upload")
+            health = await client.get("/healthz")
+            release.set()
+            return shed, health, await running, await queued
+
+    shed, health, running, queued = asyncio.run(scenario())
+    assert shed.status_code == 503 and shed.headers["retry-after"] == "3"
+    assert health.status_code == 200
+    assert running.status_code == 200 and queued.status_code == 200
+    # The shed request never reached the DB dependency
+    assert sessions_opened == 2
+
+def test_adaptive_limiter_aimd():
+    limiter = AdaptiveLimiter(initial_limit=10, min_limit=2, max_limit=20, max_queue=0)
+    for _ in range(50):
+        limiter._adjust(0.01, saturated=True)
+    grown = limiter.limit
+    assert 12 < grown <= 20
+
+    limiter._adjust(1.0, saturated=True)
+    assert limiter.limit == pytest.approx(grown * 0.9)
+    # At most one decrease per round trip
+    limiter._adjust(1.0, saturated=True)
+    assert limiter.limit == pytest.approx(grown * 0.9)
+    # Unsaturated fast samples don't inflate the limit
+    limiter._adjust(0.01, saturated=False)
+    assert limiter.limit == pytest.approx(grown * 0.9)
+
+    # One unusually fast success doesn't become the baseline
+    limiter = AdaptiveLimiter(initial_limit=10, min_limit=2, max_limit=20, max_queue=0)
+    for latency in [0.001] + [0.2] * 100:
+        limiter._adjust(latency, saturated=False)
+    limiter._adjust(0.3, saturated=False)
+    assert limiter.limit == 10
+
+def test_adaptive_limit_ignores_fast_error_responses():
+    from fastapi import FastAPI, HTTPException
+
+    mini = FastAPI()
+    mini.add_middleware(AdmissionControlMiddleware, initial_limit=16, max_limit=64)
+
+    @mini.get("/jobs/{job_id}")
+    async def get_job(job_id: str):
+        if job_id.startswith("missing"):
+            raise HTTPException(404, "Job not found")
+        await asyncio.sleep(0.06)
+        return {"job_id": job_id}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=mini)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for i in range(30):
+                await client.get(f"/jobs/{'missing' if i % 10 == 0 else 'img'}-{i}")
+
+    asyncio.run(scenario())
+    # Fast 404s used to become the baseline, so every 60 ms success looked congested
+    assert REGISTRY.get_sample_value("admission_concurrency_limit", {"route": "/jobs/{job_id}"}) == 16
+
+def test_api_keys_have_independent_rate_limits(monkeypatch):
+    monkeypatch.setattr(get_settings(), "api_keys", {
+        "noisy": ApiKeyConfig(key_sha256=hash_api_key("noisy-key"), rate_per_second=0.01, burst=2),
+        "quiet": ApiKeyConfig(key_sha256=hash_api_key("quiet-key")),
+    })
+    client = TestClient(app)
+    noisy = {"Authorization": "Bearer noisy-key"}
+    quiet = {"Authorization": "Bearer quiet-key"}
+
+    for _ in range(2):
+        assert client.post("/uploads/init", json={"content_type": "image/jpeg"}, headers=noisy).status_code != 429
+    limited = client.post("/uploads/init", json={"content_type": "image/jpeg"}, headers=noisy)
+    assert limited.status_code == 429 and int(limited.headers["retry-after"]) >= 1
+    assert client.get("/jobs/img-x", headers=quiet).status_code != 429
+    assert client.get("/jobs/img-x", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+def test_admin_routes_reject_non_admin_clients(monkeypatch):
+    monkeypatch.setattr(get_settings(), "api_keys", {"acme": ApiKeyConfig(key_sha256=hash_api_key("acme-key"))})
+    client = TestClient(app)
+    acme = {"Authorization": "Bearer acme-key"}
+
+    for path in ("/admin/jobs", "/admin/jobs/export", "/admin/stats", "/admin/cache", "/admin/profiles"):
+        r = client.get(path, headers=acme)
+        assert r.status_code == 403, path
+        assert r.json() == {"detail": "Admin API key required"}
+    assert client.get("/admin/cache", headers=AUTH).status_code == 200
+
+def test_concurrent_job_quota(monkeypatch):
+    monkeypatch.setattr(get_settings(), "api_keys", {
+        "small": ApiKeyConfig(key_sha256=hash_api_key("small-key"), max_concurrent_jobs=1),
+    })
+    temporal = FakeTemporal()
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+    monkeypatch.setattr(jobs, "get_async_s3_client", lambda: AsyncS3Client(SlowS3(delay=0), max_workers=1))
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer small-key"}
+
+    first = client.post("/jobs/from-upload", json={"key": "a.jpg"}, headers=headers)
+    assert first.status_code == 202
+    assert client.post("/jobs/from-upload", json={"key": "b.jpg"}, headers=headers).status_code == 429
+    # Other clients are unaffected
+    assert client.post("/jobs/from-upload", json={"key": "c.jpg"}, headers=AUTH).status_code == 202
+
+    # Observing the terminal state frees the slot
+    temporal.statuses[first.json()["job_id"]] = "COMPLETED"
+    assert client.get(f"/jobs/{first.json()['job_id']}", headers=headers).status_code == 200
+    assert client.post("/jobs/from-upload", json={"key": "b.jpg"}, headers=headers).status_code == 202
+
+def test_job_slot_released_when_submit_fails_before_start(monkeypatch, sqlite_db):
+    monkeypatch.setattr(get_settings(), "api_keys", {
+        "small": ApiKeyConfig(key_sha256=hash_api_key("small-key"), max_concurrent_jobs=1),
+    })
+    monkeypatch.setattr(jobs, "temporal_client", FakeTemporal())
+    monkeypatch.setattr(jobs, "get_async_s3_client", lambda: AsyncS3Client(SlowS3(delay=0), max_workers=1))
+    client = TestClient(app, raise_server_exceptions=False)
+    headers = {"Authorization": "Bearer small-key"}
+
+    async def broken_rollups(db, keys):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+    with monkeypatch.context() as m:
+        m.setattr(jobs, "apply_rollups", broken_rollups)
+        assert client.post("/jobs/from-upload", json={"key": "a.jpg"}, headers=headers).status_code == 500
+    assert get_rate_limiter().active_jobs("small") == 0
+    assert client.post("/jobs/from-upload", json={"key": "a.jpg"}, headers=headers).status_code == 202
+
+def test_job_status_reads_are_scoped_to_the_submitting_client(monkeypatch, sqlite_db):
+    monkeypatch.setattr(get_settings(), "api_keys", {
+        "acme": ApiKeyConfig(key_sha256=hash_api_key("acme-key")),
+        "other": ApiKeyConfig(key_sha256=hash_api_key("other-key")),
+    })
+    temporal = FakeTemporal()
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+    monkeypatch.setattr(jobs, "get_async_s3_client", lambda: AsyncS3Client(SlowS3(delay=0), max_workers=1))
+    client = TestClient(app)
+    acme = {"Authorization": "Bearer acme-key"}
+    other = {"Authorization": "Bearer other-key"}
+
+    job_id = client.post("/jobs/from-upload", json={"key": "a.jpg"}, headers=acme).json()["job_id"]
+    temporal.statuses[job_id] = "COMPLETED"
+    # Now also in the result cache, which must not bypass the check
+    assert client.get(f"/jobs/{job_id}", headers=acme).json()["status"] == "completed"
+    assert client.get(f"/jobs/{job_id}", headers=AUTH).status_code == 200
+
+    for path in (f"/jobs/{job_id}", f"/jobs/{job_id}/wait", f"/jobs/{job_id}/events"):
+        assert client.get(path, headers=other).status_code == 404, path
+    batch = client.post("/jobs/status:batch", json={"job_ids": [job_id]}, headers=other).json()
+    assert batch["jobs"] == [{"job_id": job_id, "status": "not_found", "result": None}]
+    mine = client.post("/jobs/status:batch", json={"job_ids": [job_id]}, headers=acme).json()
+    assert mine["jobs"][0]["status"] == "completed"
+
+class _ImageHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves /big.jpg (11 MB), /stream.jpg (no Content-Length), /doc.txt,
+    /fake.jpg (text labelled image/jpeg) and redirects: /hop -> /doc.txt, /loop -> /loop.
+    """
+    BIG = b"\xff\xd8\xff\xe0" + bytes(range(256)) * (11 * 4096)
+    REDIRECTS = {"/hop": "/doc.txt", "/loop": "/loop"}
+
+    def do_GET(self):
+        if self.path in self.REDIRECTS:
+            self.send_response(302)
+            self.send_header("Location", self.REDIRECTS[self.path])
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = b"not an image" * 10 if self.path == "/fake.jpg" else self.BIG
+        content_type = "text/plain" if self.path == "/doc.txt" else "image/jpeg; charset=binary"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        if self.path != "/stream.jpg":
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        for i in range(0, len(body), 65536):
+            self.wfile.write(body[i:i + 65536])
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def image_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+def test_from_url_streams_into_s3_multipart(monkeypatch, sqlite_db, image_server):
+    _, _, sessions = sqlite_db
+    _reset_aws(monkeypatch)
+    s = get_settings()
+    monkeypatch.setattr(s, "url_ingest_part_size", 5 * 1024 * 1024)
+    # Treat the loopback test server as public so requests still go through the pinned transport
+    monkeypatch.setattr(url_ingest, "is_public_address", lambda address: True)
+    temporal = FakeTemporal()
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            ok = await client.post("/jobs/from-url", json={"url": f"{image_server}/big.jpg"}, headers=AUTH)
+            wrong_type = await client.post("/jobs/from-url", json={"url": f"{image_server}/doc.txt"}, headers=AUTH)
+            fake = await client.post("/jobs/from-url", json={"url": f"{image_server}/fake.jpg"}, headers=AUTH)
+            redirected = await client.post("/jobs/from-url", json={"url": f"{image_server}/hop"}, headers=AUTH)
+            loop = await client.post("/jobs/from-url", json={"url": f"{image_server}/loop"}, headers=AUTH)
+            monkeypatch.setattr(s, "max_upload_size", 6 * 1024 * 1024)
+            too_big = await client.post("/jobs/from-url", json={"url": f"{image_server}/stream.jpg"}, headers=AUTH)
+            bad_scheme = await client.post("/jobs/from-url", json={"url": "file:///etc/passwd"}, headers=AUTH)
+        await get_http_client().aclose()
+        return ok, wrong_type, too_big, bad_scheme, fake, redirected, loop
+
+    get_async_s3_client.cache_clear()
+    get_http_client.cache_clear()
+    with mock_aws():
+        s3 = boto3.client("s3", region_name=s.aws_region)
+        s3.create_bucket(Bucket=s.s3_bucket_raw, CreateBucketConfiguration={"LocationConstraint": s.aws_region})
+        ok, wrong_type, too_big, bad_scheme, fake, redirected, loop = asyncio.run(scenario())
+
+        assert ok.status_code == 202, ok.text
+        job_log = _run_db(sessions, lambda db: jobs._get_job_log(db, ok.json()["job_id"]))
+        assert job_log.job_type == "url" and job_log.source_url.endswith("/big.jpg")
+        stored = s3.get_object(Bucket=s.s3_bucket_raw, Key=job_log.s3_key)
+        assert stored["Body"].read() == _ImageHandler.BIG
+        assert stored["ContentType"] == "image/jpeg"
+        assert stored["ETag"].endswith('-3"')  # 5 MB + 5 MB + 1 MB parts
+
+        assert wrong_type.status_code == 415
+        assert too_big.status_code == 413
+        assert bad_scheme.status_code == 400
+        # Magic bytes are checked before anything is stored
+        assert fake.status_code == 415
+        # Redirects are followed hop by hop, up to the limit
+        assert redirected.status_code == 415
+        assert loop.status_code == 502
+        # The aborted stream left nothing behind
+        assert len(s3.list_objects_v2(Bucket=s.s3_bucket_raw)["Contents"]) == 1
+        assert not s3.list_multipart_uploads(Bucket=s.s3_bucket_raw).get("Uploads")
+        assert temporal.started == [ok.json()["job_id"]]
+    get_async_s3_client.cache_clear()
+    get_http_client.cache_clear()
+
+def test_from_url_refuses_internal_addresses(monkeypatch):
+    monkeypatch.setattr(jobs, "temporal_client", FakeTemporal())
+    get_http_client.cache_clear()
+    client = TestClient(app)
+
+    for url in (
+        "http://169.254.169.254/latest/meta-data/",
+        "http://127.0.0.1:5432/",
+        "http://localhost/",
+        "http://10.0.0.1/x.jpg",
+        "http://[::ffff:127.0.0.1]/",
+    ):
+        r = client.post("/jobs/from-url", json={"url": url}, headers=AUTH)
+        assert r.status_code == 502, url
+        # The same message whatever went wrong, so it can't be used to probe the network
+        assert r.json() == {"detail": "Could not fetch source URL"}
+    get_http_client.cache_clear()
+
+    # The transport surfaces blocked connects as httpx errors, like httpx's own transport
+    from app.url_ingest import BlockedAddressError, PublicOnlyTransport
+
+    async def blocked():
+        async with httpx.AsyncClient(transport=PublicOnlyTransport(max_connections=1)) as http:
+            with pytest.raises(httpx.ConnectError) as e:
+                await http.get("http://127.0.0.1:9/")
+        return e.value
+
+    assert isinstance(asyncio.run(blocked()).__cause__, BlockedAddressError)
+
+def test_preflight_rejects_bad_images_before_starting_workflows(monkeypatch):
+    # A JPEG whose size marker sits behind 64 KB of APP1 data, past the first ranged GET
+    padded = JPEG[:2] + (b"\xff\xe1" + (65533).to_bytes(2, "big") + b"\0" * 65531) + JPEG[2:]
+    s3 = SlowS3(delay=0, bodies={
+        "png-as-jpeg.jpg": ("image/jpeg", _image_bytes("PNG")),
+        "corrupt.jpg": ("image/jpeg", b"\xff\xd8\xff" + b"\x00" * 5000),
+        "text.jpg": ("image/jpeg", b"hello world"),
+        "exif.jpg": ("image/jpeg", padded),
+        "photo.png": ("image/png", _image_bytes("PNG", (800, 600))),
+    })
+    temporal = FakeTemporal()
+    inputs = {}
+    start_workflow = temporal.start_workflow
+
+    async def record(workflow, arg, id, task_queue, **kwargs):
+        inputs[arg["key"]] = arg
+        return await start_workflow(workflow, arg, id, task_queue, **kwargs)
+
+    monkeypatch.setattr(temporal, "start_workflow", record)
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+    monkeypatch.setattr(jobs, "get_async_s3_client", lambda: AsyncS3Client(s3, max_workers=2))
+    client = TestClient(app)
+
+    assert client.post("/jobs/from-upload", json={"key": "png-as-jpeg.jpg"}, headers=AUTH).status_code == 415
+    assert client.post("/jobs/from-upload", json={"key": "text.jpg"}, headers=AUTH).status_code == 415
+    assert client.post("/jobs/from-upload", json={"key": "corrupt.jpg"}, headers=AUTH).status_code == 422
+    assert client.post("/jobs/from-upload", json={"key": "exif.jpg"}, headers=AUTH).status_code == 202
+    assert inputs["exif.jpg"]["image"] == {"mime": "image/jpeg", "format": "JPEG", "width": 64, "height": 48}
+
+    r = client.post("/jobs/from-upload/batch", json={"items": [{"key": "photo.png"}, {"key": "corrupt.jpg"}]}, headers=AUTH)
+    assert [item["status"] for item in r.json()["results"]] == ["started", "rejected"]
+    assert inputs["photo.png"]["image"]["width"] == 800
+    assert temporal.calls == 2  # nothing invalid reached Temporal
+    # Only small ranged reads, with a second, larger one for the padded JPEG
+    assert all(rng in ("bytes=0-16383", "bytes=0-262143") for _, rng in s3.ranges)
+    assert [key for key, rng in s3.ranges if rng == "bytes=0-262143"] == ["exif.jpg"]
+
+def test_dedup_reuses_jobs_for_identical_content(monkeypatch, sqlite_db):
+    _, _, sessions = sqlite_db
+    s3 = SlowS3(delay=0, bodies={"other.png": ("image/png", _image_bytes("PNG"))})
+    temporal = FakeTemporal()
+    monkeypatch.setattr(get_settings(), "dedup_enabled", True)
+    monkeypatch.setattr(get_settings(), "api_keys", {"acme": ApiKeyConfig(key_sha256=hash_api_key("acme-key"))})
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+    monkeypatch.setattr(jobs, "get_async_s3_client", lambda: AsyncS3Client(s3, max_workers=2))
+    client = TestClient(app)
+
+    first = client.post("/jobs/from-upload", json={"key": "a.jpg"}, headers=AUTH).json()
+    # Same ETag while the first job runs: attach to it
+    again = client.post("/jobs/from-upload", json={"key": "copy-of-a.jpg"}, headers=AUTH).json()
+    assert again == {"job_id": first["job_id"], "status": "started", "result": None}
+
+    # Once it completed, duplicates get its result
+    temporal.statuses[first["job_id"]] = "COMPLETED"
+    temporal.results[first["job_id"]] = {"text": "hello"}
+    assert client.get(f"/jobs/{first['job_id']}", headers=AUTH).json()["status"] == "completed"
+    done = client.post("/jobs/from-upload", json={"key": "a.jpg"}, headers=AUTH).json()
+    assert done == {"job_id": first["job_id"], "status": "completed", "result": {"text": "hello"}}
+    assert temporal.started == [first["job_id"]]
+
+    # Other clients never see this client's jobs or results
+    theirs = client.post("/jobs/from-upload", json={"key": "a.jpg"}, headers={"Authorization": "Bearer acme-key"}).json()
+    assert theirs["job_id"] != first["job_id"] and theirs["result"] is None
+
+    # sha256 mode hashes the bytes themselves: different content, new job
+    monkeypatch.setattr(get_settings(), "dedup_hash_source", "sha256")
+    other = client.post("/jobs/from-upload", json={"key": "other.png"}, headers=AUTH).json()
+    assert other["job_id"] != first["job_id"]
+    job_log = _run_db(sessions, lambda db: jobs._get_job_log(db, other["job_id"]))
+    assert job_log.content_hash == "admin:sha256:" + hashlib.sha256(_image_bytes("PNG")).hexdigest()
+
+def test_idempotency_key_replays_original_job(monkeypatch, sqlite_db):
+    _, _, sessions = sqlite_db
+    s3 = SlowS3(delay=0.05)
+    temporal = FakeTemporal()
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+    monkeypatch.setattr(jobs, "get_async_s3_client", lambda: AsyncS3Client(s3, max_workers=4))
+    headers = {**AUTH, "Idempotency-Key": "retry-123"}
+    body = {"key": "a.jpg"}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Concurrent duplicates collapse onto one job
+            concurrent = await asyncio.gather(*(
+                client.post("/jobs/from-upload", json=body, headers=headers) for _ in range(3)
+            ))
+            conflict = await client.post("/jobs/from-upload", json={"key": "b.jpg"}, headers=headers)
+            # The job log still answers once the in-memory front cache is gone
+            get_idempotency_store.cache_clear()
+            replay = await client.post("/jobs/from-upload", json=body, headers=headers)
+            fresh = await client.post("/jobs/from-upload", json=body, headers=AUTH)
+            return concurrent, conflict, replay, fresh
+
+    concurrent, conflict, replay, fresh = asyncio.run(scenario())
+    job_ids = {r.json()["job_id"] for r in concurrent}
+    assert len(job_ids) == 1 and all(r.status_code == 202 for r in concurrent)
+    job_id = job_ids.pop()
+    assert conflict.status_code == 422
+    assert replay.json() == {"job_id": job_id, "status": "started", "result": None}
+    assert fresh.json()["job_id"] != job_id
+    # Only the first attempt and the un-keyed request touched S3 and Temporal
+    assert temporal.started == [job_id, fresh.json()["job_id"]]
+    assert len(s3.ranges) == 2
+    job_log = _run_db(sessions, lambda db: jobs._get_job_log(db, job_id))
+    assert job_log.idempotency_key == "admin:retry-123"
+
+    # Another instance misses the lookup: the unique key turns its insert into a replay
+    async def missed_lookup(*args):
+        return None
+
+    monkeypatch.setattr(jobs, "_replay_idempotent", missed_lookup)
+    client = TestClient(app)
+    raced = client.post("/jobs/from-upload", json=body, headers=headers)
+    assert raced.status_code == 202 and raced.json()["job_id"] == job_id
+    assert client.post("/jobs/from-upload", json={"key": "b.jpg"}, headers=headers).status_code == 422
+    assert temporal.started == [job_id, fresh.json()["job_id"]]
+
+    # A failed attempt gives the key up for a new job
+    async def fail_job(db):
+        (await jobs._get_job_log(db, job_id)).status = "failed"
+        await db.commit()
+
+    _run_db(sessions, fail_job)
+    retried = client.post("/jobs/from-upload", json=body, headers=headers).json()
+    assert retried["job_id"] not in (job_id, fresh.json()["job_id"])
+    assert _run_db(sessions, lambda db: jobs._get_job_log(db, job_id)).idempotency_key is None
+
+def _s3_notification(*keys, bucket=None, event="ObjectCreated:Put"):
+    bucket = bucket or get_settings().s3_bucket_raw
+    return json.dumps({"Records": [
+        {"eventName": event, "s3": {"bucket": {"name": bucket}, "object": {"key": key, "eTag": "abc"}}}
+        for key in keys
+    ]})
+
+def test_ingest_worker_dedupes_and_redelivers_failures(monkeypatch, sqlite_db):
+    from temporalio.common import WorkflowIDReusePolicy
+    from temporalio.exceptions import WorkflowAlreadyStartedError
+    from app.ingest import IngestWorker, InMemoryEventQueue, event_job_id, parse_notification
+
+    class StrictTemporal(FakeTemporal):
+        """Rejects restarting a running workflow ID, like the real server."""
+        async def start_workflow(self, workflow, arg, id, task_queue, **kwargs):
+            if id in self.started and kwargs.get("id_reuse_policy") == WorkflowIDReusePolicy.ALLOW_DUPLICATE_FAILED_ONLY:
+                raise WorkflowAlreadyStartedError(id, workflow)
+            return await super().start_workflow(workflow, arg, id, task_queue, **kwargs)
+
+    _, _, sessions = sqlite_db
+    temporal = StrictTemporal()
+    temporal.fail_keys = {"b.jpg"}
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+    monkeypatch.setattr(jobs, "get_async_s3_client", lambda: AsyncS3Client(SlowS3(delay=0.01), max_workers=4))
+
+    queue = InMemoryEventQueue(visibility_timeout=0.1)
+    queue.put(_s3_notification("a.jpg", "my+photo.jpg"))
+    queue.put(_s3_notification("a.jpg"))  # duplicate delivery
+    queue.put(_s3_notification("b.jpg"))
+    queue.put(_s3_notification("url-ingest/2025/01/x.jpg"))  # written (and started) by /jobs/from-url
+    queue.put(_s3_notification("other.jpg", bucket="someone-elses-bucket"))
+    queue.put(json.dumps({"Service": "Amazon S3", "Event": "s3:TestEvent"}))
+
+    async def scenario():
+        worker = IngestWorker(
+            queue, get_settings().s3_bucket_raw, batch_size=10, wait_seconds=0, session_factory=sessions,
+            skip_prefixes=(get_settings().url_ingest_key_prefix,),
+        )
+        first = await worker.run_once()
+        pending_after_first = len(queue)
+        # b.jpg's message comes back after the visibility timeout and now succeeds
+        temporal.fail_keys.clear()
+        await asyncio.sleep(0.15)
+        second = await worker.run_once()
+        # A restarted worker (no in-process dedup) seeing a late duplicate
+        queue.put(_s3_notification("a.jpg"))
+        third = await IngestWorker(queue, get_settings().s3_bucket_raw, 10, 0, sessions).run_once()
+        return first, pending_after_first, second, third
+
+    first, pending_after_first, second, third = asyncio.run(scenario())
+    assert (first, pending_after_first, second, third) == (2, 1, 1, 1)
+    assert len(queue) == 0
+
+    events = {e.key: e for e in parse_notification(_s3_notification("a.jpg", "my+photo.jpg", "b.jpg"))}
+    assert set(events) == {"a.jpg", "my photo.jpg", "b.jpg"}
+    assert sorted(temporal.started) == sorted(event_job_id(e) for e in events.values())
+
+    rows = _run_db(sessions, lambda db: db.execute(select(JobLog.job_id, JobLog.status)))
+    assert sorted(rows.all()) == sorted((event_job_id(e), "started") for e in events.values())
+
+def test_ingest_worker_retries_transient_s3_errors(monkeypatch):
+    from app.ingest import IngestWorker, InMemoryEventQueue
+
+    class ThrottledS3(SlowS3):
+        """HEAD of throttled.jpg and the pre-flight GET of slow-get.jpg fail with SlowDown until ``throttling`` is cleared."""
+        throttling = True
+
+        def _throttle(self, operation):
+            if self.throttling:
+                raise ClientError({"Error": {"Code": "SlowDown"}, "ResponseMetadata": {"HTTPStatusCode": 503}}, operation)
+
+        def head_object(self, Bucket, Key):
+            if Key == "throttled.jpg":
+                self._throttle("HeadObject")
+            return super().head_object(Bucket, Key)
+
+        def get_object(self, Bucket, Key, Range=None):
+            if Key == "slow-get.jpg":
+                self._throttle("GetObject")
+            return super().get_object(Bucket, Key, Range)
+
+    s3 = ThrottledS3(delay=0)
+    temporal = FakeTemporal()
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+    monkeypatch.setattr(jobs, "get_async_s3_client", lambda: AsyncS3Client(s3, max_workers=2))
+
+    queue = InMemoryEventQueue(visibility_timeout=0.1)
+    queue.put(_s3_notification("ok.jpg", "missing.jpg"))
+    queue.put(_s3_notification("throttled.jpg"))
+    queue.put(_s3_notification("slow-get.jpg"))
+
+    async def scenario():
+        worker = IngestWorker(queue, get_settings().s3_bucket_raw, batch_size=10, wait_seconds=0)
+        first = await worker.run_once()
+        pending_after_first = len(queue)
+        s3.throttling = False
+        await asyncio.sleep(0.15)
+        return first, pending_after_first, await worker.run_once()
+
+    first, pending_after_first, second = asyncio.run(scenario())
+    # missing.jpg is rejected for good (acked, not counted); throttled objects stay queued
+    assert (first, pending_after_first, second) == (1, 2, 2)
+    assert len(queue) == 0 and len(temporal.started) == 3
+
+    client = TestClient(app)
+    s3.throttling = True
+    r = client.post("/jobs/from-upload/batch", json={"items": [{"key": "throttled.jpg"}, {"key": "missing.jpg"}]}, headers=AUTH)
+    assert [item["status"] for item in r.json()["results"]] == ["failed", "rejected"]
+
+def test_presigned_multipart_upload_lifecycle(monkeypatch):
+    from app.multipart import MAX_PART_SIZE, MAX_PARTS, abort_stale_uploads, plan_parts
+    _reset_aws(monkeypatch)
+    s = get_settings()
+    part = 5 * 1024 * 1024
+
+    async def scenario(s3):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            bad_type = await client.post("/uploads/multipart/init", json={"content_type": "text/plain", "size": 10}, headers=AUTH)
+            too_big = await client.post(
+                "/uploads/multipart/init", json={"content_type": "image/heic", "size": s.multipart_max_upload_size + 1}, headers=AUTH
+            )
+            huge_part = await client.post(
+                "/uploads/multipart/init", json={"content_type": "image/heic", "size": 10, "part_size": MAX_PART_SIZE + 1}, headers=AUTH
+            )
+            init = (await client.post(
+                "/uploads/multipart/init", json={"content_type": "image/heic", "size": part + 100, "key_prefix": "big"}, headers=AUTH
+            )).json()
+            upload = {"key": init["key"], "upload_id": init["upload_id"]}
+            urls = (await client.post("/uploads/multipart/parts", json={**upload, "part_numbers": [1, 2]}, headers=AUTH)).json()
+            out_of_range = await client.post("/uploads/multipart/parts", json={**upload, "part_numbers": [0]}, headers=AUTH)
+
+            # Upload parts out of order, as parallel clients would
+            etags = {}
+            for number, body in ((2, b"y" * 100), (1, b"x" * part)):
+                etags[number] = s3.upload_part(
+                    Bucket=s.s3_bucket_raw, Key=init["key"], UploadId=init["upload_id"], PartNumber=number, Body=body
+                )["ETag"]
+            parts = [{"part_number": n, "etag": e} for n, e in etags.items()]
+            complete = await client.post("/uploads/multipart/complete", json={**upload, "parts": parts}, headers=AUTH)
+
+            other = (await client.post("/uploads/multipart/init", json={"content_type": "image/jpeg", "size": 1}, headers=AUTH)).json()
+            other = {"key": other["key"], "upload_id": other["upload_id"]}
+            abort = await client.post("/uploads/multipart/abort", json=other, headers=AUTH)
+            unknown = await client.post("/uploads/multipart/abort", json=other, headers=AUTH)
+
+            # The janitor only touches uploads older than the max age
+            s3.create_multipart_upload(Bucket=s.s3_bucket_raw, Key="stale.jpg")
+            initiated = s3.list_multipart_uploads(Bucket=s.s3_bucket_raw)["Uploads"][0]["Initiated"]
+            fresh = await abort_stale_uploads(
+                get_async_s3_client(), s.s3_bucket_raw, max_age=3600, now=initiated + timedelta(minutes=1)
+            )
+            stale = await abort_stale_uploads(
+                get_async_s3_client(), s.s3_bucket_raw, max_age=3600, now=initiated + timedelta(hours=2)
+            )
+        return bad_type, too_big, huge_part, init, urls, out_of_range, complete, unknown, abort, fresh, stale
+
+    get_async_s3_client.cache_clear()
+    with mock_aws():
+        s3 = boto3.client("s3", region_name=s.aws_region)
+        s3.create_bucket(Bucket=s.s3_bucket_raw, CreateBucketConfiguration={"LocationConstraint": s.aws_region})
+        bad_type, too_big, huge_part, init, urls, out_of_range, complete, unknown, abort, fresh, stale = asyncio.run(scenario(s3))
+
+        assert bad_type.status_code == 415
+        assert too_big.status_code == 413
+        assert huge_part.status_code == 422
+        # Part sizes grow to fit the part limit, but never past S3's 5 GiB part cap
+        assert plan_parts(MAX_PARTS * MAX_PART_SIZE, 1) == (MAX_PART_SIZE, MAX_PARTS)
+        with pytest.raises(ValueError):
+            plan_parts(MAX_PARTS * MAX_PART_SIZE + 1, MAX_PART_SIZE)
+        assert init["key"].startswith("big/") and init["key"].endswith(".heic")
+        assert (init["part_size"], init["part_count"]) == (s.multipart_part_size, 1)
+        assert [p["part_number"] for p in urls["parts"]] == [1, 2]
+        assert "partNumber=2" in urls["parts"][1]["url"] and "X-Amz-Signature=" in urls["parts"][1]["url"]
+        assert out_of_range.status_code == 422
+
+        assert complete.status_code == 200, complete.text
+        assert complete.json()["size"] == part + 100
+        stored = s3.head_object(Bucket=s.s3_bucket_raw, Key=init["key"])
+        assert stored["ContentType"] == "image/heic" and stored["Metadata"] == {"origin": "presigned"}
+        assert unknown.status_code == 404
+
+        assert abort.status_code == 204
+        assert (fresh, stale) == (0, 1)
+        assert not s3.list_multipart_uploads(Bucket=s.s3_bucket_raw).get("Uploads")
+    get_async_s3_client.cache_clear()
+
+def test_large_results_offloaded_to_s3_with_presigned_url(monkeypatch):
+    _reset_aws(monkeypatch)
+    s = get_settings()
+    monkeypatch.setattr(s, "result_offload_enabled", True)
+    monkeypatch.setattr(s, "result_offload_min_bytes", 1024)
+    big = {"text": "word " * 500, "labels": [{"name": f"l{i}"} for i in range(50)], "pages": 3}
+    temporal = FakeTemporal()
+    temporal.statuses.update({"img-big": "COMPLETED", "img-small": "COMPLETED"})
+    temporal.results.update({"img-big": big, "img-small": {"text": "hello"}})
+    monkeypatch.setattr(jobs, "temporal_client", temporal)
+
+    get_async_s3_client.cache_clear()
+    with mock_aws():
+        s3 = boto3.client("s3", region_name=s.aws_region)
+        s3.create_bucket(Bucket=s.s3_bucket_processed, CreateBucketConfiguration={"LocationConstraint": s.aws_region})
+        client = TestClient(app)
+        first = client.get("/jobs/img-big", headers=AUTH).json()
+        calls = temporal.calls
+        second = client.get("/jobs/img-big", headers=AUTH).json()
+        cached = temporal.calls == calls
+        small = client.get("/jobs/img-small", headers=AUTH).json()
+
+        assert first["result"] is None
+        assert first["result_url"].startswith(f"https://{s.s3_bucket_processed}.s3.")
+        assert "/job-results/img-big.json?" in first["result_url"]
+        assert f"X-Amz-Expires={s.result_url_expires_seconds}" in first["result_url"]
+        assert first["result_summary"] == {"text": ("word " * 40)[:200] + "…", "labels": {"items": 50}, "pages": 3}
+        stored = s3.get_object(Bucket=s.s3_bucket_processed, Key="job-results/img-big.json")
+        assert stored["ContentType"] == "application/json"
+        assert json.loads(stored["Body"].read()) == big
+        assert first["result_size"] == stored["ContentLength"]
+        # Served from the result cache, still with a URL
+        assert cached
+        assert second["result_url"] and second["result_summary"] == first["result_summary"]
+        assert small == {"job_id": "img-small", "status": "completed", "result": {"text": "hello"}}
+        # A status parsed back from a response keeps its URL as-is
+        assert JobStatus.model_validate(first).model_dump(mode="json") == first
+    get_async_s3_client.cache_clear()
+
+def test_loadtest_reports_per_endpoint_and_flags_regressions():
+    from benchmarks.loadtest import LoadConfig, compare, run_load
+    config = LoadConfig(duration=1.0, warmup=0.2, concurrency=4, objects=3, temporal_latency_ms=1, completes_after=2)
+    report = asyncio.run(run_load(config))
+
+    assert set(report["endpoints"]) == {"POST /uploads/init", "POST /jobs/from-upload", "GET /jobs/{job_id}"}
+    for stats in report["endpoints"].values():
+        assert stats["requests"] > 0 and stats["error_rate"] == 0
+        assert 0 < stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+    assert report["config"]["database"] == "sqlite" and report["temporal_rpcs"]["start_workflow"] > 0
+    assert jobs.temporal_client is None and app.dependency_overrides == {}
+
+    assert compare(report, report, 0.1) == []
+    slower = json.loads(json.dumps(report))
+    slower["endpoints"]["POST /uploads/init"]["p95_ms"] *= 1.5
+    slower["endpoints"]["GET /jobs/{job_id}"]["rps"] /= 2
+    regressions = compare(slower, report, 0.2)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("GET /jobs/{job_id}: rps") and regressions[1].startswith("POST /uploads/init: p95_ms")
+
+def test_profiling_collects_stacks_for_admin_requests(monkeypatch):
+    from fastapi import FastAPI
+    from app.auth import is_admin_key
+    from app.deps import get_profile_store
+    from app.profiling import ProfilingMiddleware
+    monkeypatch.setattr(get_settings(), "api_keys", {"acme": ApiKeyConfig(key_sha256=hash_api_key("acme-key"))})
+    get_profile_store.cache_clear()
+
+    def busy_loop():
+        end = time.perf_counter() + 0.1
+        while time.perf_counter() < end:
+            pass
+
+    async def wait_on_dependency():
+        await asyncio.sleep(0.05)
+
+    inner = FastAPI()
+
+    @inner.get("/slow")
+    async def slow():
+        busy_loop()
+        await wait_on_dependency()
+        return {"ok": True}
+
+    @inner.get("/sampled")
+    async def sampled():
+        return {"ok": True}
+
+    inner.add_middleware(
+        ProfilingMiddleware,
+        get_store=get_profile_store, is_admin_key=is_admin_key, interval=0.001, route_sample_rates={"/sampled": 1.0},
+    )
+    profiled = TestClient(inner)
+    assert "x-profile-id" not in profiled.get("/slow", headers=AUTH).headers
+    assert "x-profile-id" not in profiled.get("/slow", headers={"Authorization": "Bearer acme-key", "X-Profile": "1"}).headers
+    profile_id = profiled.get("/slow", headers={**AUTH, "X-Profile": "1"}).headers["x-profile-id"]
+    assert "x-profile-id" in profiled.get("/sampled").headers
+
+    client = TestClient(app)
+    listing = client.get("/admin/profiles", headers=AUTH).json()
+    assert [(p["route"], p["trigger"]) for p in listing["profiles"]] == [("/sampled", "sampled"), ("/slow", "header")]
+    assert listing["profiles"][1]["id"] == profile_id and listing["profiles"][1]["duration_ms"] >= 150
+
+    stacks = [line.rsplit(" ", 1) for line in client.get(f"/admin/profiles/{profile_id}", headers=AUTH).text.splitlines()]
+    micros = {"cpu": 0, "wait": 0}
+    for stack, count in stacks:
+        if "busy_loop" in stack:
+            micros["cpu"] += int(count)
+        if "wait_on_dependency" in stack and stack.endswith("<await>"):
+            micros["wait"] += int(count)
+    # 100 ms busy and 50 ms waiting: compare shares, since absolute timings vary on slow CI machines
+    assert micros["cpu"] > micros["wait"] > 0
+    assert listing["profiles"][1]["samples"] >= 20
+    assert client.get("/admin/profiles", headers={"Authorization": "Bearer acme-key"}).status_code == 403
+    assert client.get("/admin/profiles/p999", headers=AUTH).status_code == 404
+    get_profile_store.cache_clear()
+
+def test_temporal_connection_retries_in_background():
+    from app.temporal import TemporalConnection
+    attempts = []
+    connected = []
+
+    async def flaky_connect(target_host, namespace):
+        attempts.append(target_host)
+        if len(attempts) < 3:
+            raise ConnectionError("temporal down")
+        return FakeTemporal()
+
+    async def scenario():
+        conn = TemporalConnection(
+            "temporal:7233", "default", on_connect=connected.append,
+            connect_timeout=1.0, initial_backoff=0.01, max_backoff=0.02, connect=flaky_connect,
+        )
+        conn.start()
+        # Boot doesn't wait past the first (failed) attempt
+        first = await conn.wait_first_attempt(timeout=1.0)
+        state = (first, conn.connected, conn.last_error)
+        client = await asyncio.wait_for(conn.wait_connected(), timeout=1.0)
+        await conn.close()
+        return state, client
+
+    (first, was_connected, error), client = asyncio.run(scenario())
+    assert (first, was_connected, error) == (False, False, "temporal down")
+    assert len(attempts) == 3 and connected == [client]
+
+def test_readyz_serves_background_check_results(monkeypatch):
+    from app import readiness
+    calls = {"database": 0, "s3": 0, "temporal": 0}
+    never = asyncio.Event()
+
+    async def database_ok():
+        calls["database"] += 1
+
+    async def s3_down():
+        calls["s3"] += 1
+        raise ConnectionError("bucket unreachable")
+
+    async def temporal_hung():
+        calls["temporal"] += 1
+        await never.wait()
+
+    checks = {"database": database_ok, "s3": s3_down, "temporal": temporal_hung}
+
+    async def scenario():
+        strict = readiness.ReadinessChecker(checks, ["database", "temporal"], interval=60, timeout=0.05)
+        degraded = readiness.ReadinessChecker(checks, ["database"], interval=60, timeout=0.05)
+        for _ in range(3):
+            await strict.check_all()
+        await degraded.check_all()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            monkeypatch.setattr(readiness, "checker", strict)
+            before = dict(calls)
+            not_ready = [await client.get("/readyz") for _ in range(20)]
+            after = dict(calls)
+            monkeypatch.setattr(readiness, "checker", degraded)
+            ready = await client.get("/readyz")
+        await strict.close()
+        await degraded.close()
+        return before, after, not_ready, ready
+
+    before, after, not_ready, ready = asyncio.run(scenario())
+    # Polling /readyz never reaches a dependency
+    assert before == after
+    # A hung dependency holds one probe, not one per round
+    assert after["temporal"] == 2 and after["s3"] == 4
+
+    body = not_ready[0].json()
+    assert all(r.status_code == 503 for r in not_ready)
+    assert body["dependencies"]["temporal"]["error"] == "timed out after 0.05s"
+    assert body["dependencies"]["s3"] == {**body["dependencies"]["s3"], "ok": False, "required": False, "error": "bucket unreachable"}
+    assert ready.status_code == 200 and ready.json()["ready"] is True
+    assert ready.json()["dependencies"]["database"]["ok"] is True